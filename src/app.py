@@ -1,15 +1,67 @@
+import os
 import time
 import json
+import signal
+import threading
 from requests.exceptions import ConnectionError, SSLError
 
 from messenger import Messenger
 from trader import Trader
-from logger import logger
+from sharding import ShardCoordinator
+from cache import Cache
+from circuit_breaker import get_backoff
+from clock import wall_clock
+from metrics import metrics
+from tracing import tracer
+from logger import logger, configure_logger, set_log_context
+import json_codec
 from directory_utilities import get_json_from_file
+from warm_state import save_warm_state, load_warm_state
 
+warm_state_file_directory = "../database/warm-state.pickle"
 
-def get_secrets():
-    secrets_file_directory = "../database/secrets.json"
+# Main loop error types, subclasses before their base classes
+LOOP_ERROR_TYPES = [
+    (SSLError, "SSL"),
+    (ConnectionError, "connection"),
+    (json.decoder.JSONDecodeError, "JSONDecode"),
+    (TypeError, "typeError"),
+    (KeyError, "keyError"),
+    (ValueError, "valueError")
+]
+
+
+def get_strategy_names():
+    """
+    Gets the names of the strategies listed in the `strategies.json` file.
+    Without the file, the single strategy in the `database` directory is used.
+
+    :return: The strategy names (None for the default strategy)
+    :rtype: list
+    """
+    strategies_file_directory = "../database/strategies.json"
+    if not os.path.exists(strategies_file_directory):
+        return [None]
+    return get_json_from_file(strategies_file_directory, {"strategies": []})["strategies"]
+
+
+def get_database_directory(strategy_name=None):
+    """
+    Gets the directory of a strategy's settings, secrets and trade database
+
+    :param strategy_name: The strategy's name (None for the default strategy)
+    :type strategy_name: str
+
+    :return: The strategy's database directory
+    :rtype: str
+    """
+    if strategy_name is None:
+        return "../database/"
+    return "../database/{}/".format(strategy_name)
+
+
+def get_secrets(database_directory="../database/"):
+    secrets_file_directory = database_directory + "secrets.json"
     secrets_template = {
         "bittrex": {
             "bittrexKey": "BITTREX_API_KEY",
@@ -32,14 +84,14 @@ def get_secrets():
     }
     secrets_content = get_json_from_file(secrets_file_directory, secrets_template)
     if secrets_content == secrets_template:
-        print("Please completed the `secrets.json` file in your `database` directory")
+        print("Please completed the `secrets.json` file in your `{}` directory".format(database_directory))
         exit()
 
     return secrets_content
 
 
-def get_settings():
-    settings_file_directory = "../database/settings.json"
+def get_settings(database_directory="../database/"):
+    settings_file_directory = database_directory + "settings.json"
     settings_template = {
         "sound": False,
         "tradeParameters": {
@@ -70,57 +122,169 @@ def get_settings():
             "balance": {
                 "pauseTime": 0
             }
+        },
+        "scheduleParameters": {
+            "priceCheckInterval": 10,
+            "indicatorJitter": 30,
+            "buyScanBudget": 60,
+            "marketRefreshInterval": 3600
         }
     }
     settings_content = get_json_from_file(settings_file_directory, settings_template)
     if settings_content == settings_template:
-        print("Please completed the `settings.json` file in your `database` directory")
+        print("Please completed the `settings.json` file in your `{}` directory".format(database_directory))
         exit()
 
     return settings_content
 
 
+def run_loop(messenger, cycle, wait, stop_event, clock=wall_clock):
+    """
+    Runs a trading cycle repeatedly until the stop event is set.
+    A failed cycle is retried after a backoff that doubles with every consecutive failure.
+
+    :param messenger: The messenger used to print errors
+    :type messenger: Messenger
+    :param cycle: The trading cycle to run
+    :type cycle: function
+    :param wait: Function that waits until the next cycle is due
+    :type wait: function
+    :param stop_event: The event used to stop all the loops
+    :type stop_event: threading.Event
+    :param clock: The clock the backoff is waited on
+        Not required. If not passed in the real time is used
+    :type clock: WallClock
+    """
+    cycle_count = 0
+    consecutive_errors = 0
+    while not stop_event.is_set():
+        cycle_count += 1
+        set_log_context(cycle=cycle_count, coinPair=None)
+        try:
+            with tracer.span("cycle", "cycle"):
+                cycle()
+            tracer.flush()
+            consecutive_errors = 0
+            wait()
+            continue
+
+        except Exception as exception:
+            logger.exception(exception)
+            error_type = "unknown"
+            for exception_type, loop_error_type in LOOP_ERROR_TYPES:
+                if isinstance(exception, exception_type):
+                    error_type = loop_error_type
+                    break
+
+        consecutive_errors += 1
+        backoff = get_backoff(consecutive_errors)
+        messenger.print_error(error_type, [backoff])
+        clock.wait(stop_event, backoff)
+
+
+def coordinate_shards(trader, coordinator):
+    """
+    Runs the pause analysis and applies the buy signals found by the shard workers
+
+    :param trader: The trader that owns the database and places orders
+    :type trader: Trader
+    :param coordinator: The shard coordinator
+    :type coordinator: ShardCoordinator
+    """
+    trader.analyse_pauses()
+    coordinator.sync_shards()
+    coordinator.process_signals(trader.Scheduler.price_check_interval)
+
+
+def analyse_pauses_and_buys(trader):
+    """
+    Runs the pause and buy analysis, the open trades are analysed on their own loop
+
+    :param trader: The trader to analyse with
+    :type trader: Trader
+    """
+    trader.analyse_pauses()
+    trader.analyse_buys()
+
+
+def start_loop(messenger, cycle, wait, stop_event):
+    """
+    Starts a trading loop on a daemon thread
+
+    :param messenger: The messenger used to print errors
+    :type messenger: Messenger
+    :param cycle: The trading cycle to run
+    :type cycle: function
+    :param wait: Function that waits until the next cycle is due
+    :type wait: function
+    :param stop_event: The event used to stop all the loops
+    :type stop_event: threading.Event
+
+    :return: The loop's thread
+    :rtype: threading.Thread
+    """
+    loop = threading.Thread(target=run_loop, args=(messenger, cycle, wait, stop_event), daemon=True)
+    loop.start()
+    return loop
+
+
 if __name__ == "__main__":
-    secrets = get_secrets()
-    settings = get_settings()
+    shared_cache = Cache()
+    strategies = []
+    for strategy_name in get_strategy_names():
+        database_directory = get_database_directory(strategy_name)
+        secrets = get_secrets(database_directory)
+        settings = get_settings(database_directory)
+        strategies.append({
+            "name": strategy_name,
+            "secrets": secrets,
+            "settings": settings,
+            "Messenger": Messenger(secrets, settings),
+            "Trader": Trader(secrets, settings, strategy_name, shared_cache)
+        })
 
-    Messenger = Messenger(secrets, settings)
-    Trader = Trader(secrets, settings)
+    traders = {strategy["name"]: strategy["Trader"] for strategy in strategies}
+    load_warm_state(warm_state_file_directory, shared_cache, traders)
 
-    Trader.initialise()
+    # SIGTERM and Ctrl-C stop the loops, then the shard workers are stopped before the warm state is saved
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signal_number, frame: stop_event.set())
+    Coordinator = None
 
-    while True:
-        try:
-            Trader.analyse_pauses()
-            Trader.analyse_buys()
-            Trader.analyse_sells()
-            time.sleep(10)
+    try:
+        configure_logger(strategies[0]["settings"].get("logParameters", {}))
+        json_codec.configure(strategies[0]["settings"].get("jsonParameters", {}))
+        tracer.configure(strategies[0]["settings"].get("traceParameters", {}))
 
-        except SSLError as exception:
-            Messenger.print_error("SSL")
-            logger.exception(exception)
-            time.sleep(10)
-        except ConnectionError as exception:
-            Messenger.print_error("connection")
-            logger.exception(exception)
-            time.sleep(10)
-        except json.decoder.JSONDecodeError as exception:
-            Messenger.print_error("JSONDecode")
-            logger.exception(exception)
-            time.sleep(10)
-        except TypeError as exception:
-            Messenger.print_error("typeError")
-            logger.exception(exception)
-            time.sleep(10)
-        except KeyError as exception:
-            Messenger.print_error("keyError", [], True)
-            logger.exception(exception)
-            exit()
-        except ValueError as exception:
-            Messenger.print_error("valueError", [], True)
-            logger.exception(exception)
-            exit()
-        except Exception:
-            Messenger.print_error("unknown", [], True)
-            logger.exception(Exception)
-            exit()
+        metrics_params = strategies[0]["settings"].get("metricsParameters", {})
+        if "port" in metrics_params:
+            metrics.start_server(metrics_params["port"])
+        if "jsonFile" in metrics_params:
+            start_loop(strategies[0]["Messenger"], lambda: metrics.write_json(metrics_params["jsonFile"]),
+                       lambda: time.sleep(metrics_params.get("jsonInterval", 60)), threading.Event())
+
+        for strategy in strategies:
+            strategy["Trader"].initialise()
+            start_loop(strategy["Messenger"], strategy["Trader"].analyse_sells,
+                       lambda trader=strategy["Trader"]: trader.Scheduler.wait_for_next_tick("sell"), stop_event)
+
+        worker_count = strategies[0]["settings"].get("shardParameters", {}).get("workerCount", 0)
+        if len(strategies) == 1 and worker_count > 1:
+            Trader = strategies[0]["Trader"]
+            Coordinator = ShardCoordinator(Trader, strategies[0]["secrets"], strategies[0]["settings"], worker_count)
+            Coordinator.start()
+            run_loop(strategies[0]["Messenger"], lambda: coordinate_shards(Trader, Coordinator), lambda: None,
+                     stop_event)
+        else:
+            for strategy in strategies:
+                start_loop(strategy["Messenger"], lambda trader=strategy["Trader"]: analyse_pauses_and_buys(trader),
+                           lambda trader=strategy["Trader"]: trader.wait_for_market_data("buy"), stop_event)
+            stop_event.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        if Coordinator is not None:
+            Coordinator.stop()
+        save_warm_state(warm_state_file_directory, shared_cache, traders)
+    exit()
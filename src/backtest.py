@@ -0,0 +1,310 @@
+"""
+   Offline backtests of trade and pause parameters over the candle stores, and parameter sweeps that run them on a
+   process pool. The candle and indicator arrays of every ticker interval are calculated once and shared with the
+   worker processes through shared memory, without copying them.
+"""
+import copy
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy
+
+from candle_store import get_candle_store
+from scheduler import TICKER_INTERVAL_SECONDS
+from trade_checks import (check_buy_parameters, check_buy_volume_and_price, check_sell_parameters,
+                          calculate_profit_margin)
+
+# Trader.get_rsi calculates a 14 period RSI over the latest 42 closing prices
+RSI_PERIOD = 14
+RSI_CANDLE_COUNT = RSI_PERIOD * 3
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# The shared arrays of every ticker interval, attached once per worker process
+worker_arrays = {}
+
+
+def get_rsi_weights(period=RSI_PERIOD, candle_count=RSI_CANDLE_COUNT):
+    """
+    Used to get the weight of every price change in the average gain and loss of
+    Trader.calculate_rsi_from_closing_prices. The first period changes are averaged and the rest are smoothed in,
+    so both averages are a fixed weighted sum of the changes.
+
+    :return: The weights, oldest change first
+    :rtype: numpy.ndarray
+    """
+    decay = (period - 1) / period
+    smoothed_count = candle_count - 1 - period
+    weights = numpy.empty(candle_count - 1)
+    weights[:period] = decay ** smoothed_count / period
+    weights[period:] = decay ** numpy.arange(smoothed_count - 1, -1, -1) / period
+    return weights
+
+
+def calculate_rsi_array(closes):
+    """
+    Used to calculate the RSI at every candle, the same way Trader.get_rsi does from the candle's latest 42 closes
+
+    :param closes: The closing prices, oldest first
+    :type closes: numpy.ndarray
+
+    :return: The RSI at every candle, NaN without 42 closes or price declines
+    :rtype: numpy.ndarray
+    """
+    rsi = numpy.full(len(closes), numpy.nan)
+    if len(closes) < RSI_CANDLE_COUNT:
+        return rsi
+    changes = numpy.diff(closes)
+    weights = get_rsi_weights()[::-1]
+    average_gains = numpy.convolve(numpy.maximum(changes, 0), weights, "valid")
+    average_losses = numpy.convolve(numpy.maximum(-changes, 0), weights, "valid")
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        rsi[RSI_CANDLE_COUNT - 1:] = numpy.where(
+            average_losses > 0, 100 - 100 / (1 + average_gains / average_losses), numpy.nan
+        )
+    return rsi
+
+
+def load_market_arrays(market_names, interval, directory="../database/candles/"):
+    """
+    Used to align the stored candles of the markets on one timeline, with the indicators the checks need
+
+    :param market_names: The markets to load (ex: BTC-LTC)
+    :type market_names: list
+    :param interval: Ticker interval (one of: 'oneMin', 'fiveMin', 'thirtyMin', 'hour', 'week', 'day', and 'month')
+    :type interval: str
+    :param directory: The directory the candle stores are kept in
+    :type directory: str
+
+    :return: The candle times (T), closing prices (C), RSI values (rsi) and 24 hour BTC volumes (dayVolume), with
+        one row per market and NaN for missing candles
+    :rtype: dict
+    """
+    interval_length = TICKER_INTERVAL_SECONDS[interval]
+    stores = [get_candle_store(market_name, interval, directory) for market_name in market_names]
+    stored_times = [store.get_array("T") for store in stores if len(store) > 0]
+    if len(stored_times) < 1:
+        raise ValueError("No {} candles are stored in {}".format(interval, directory))
+    start = min(times[0] for times in stored_times)
+    length = int((max(times[-1] for times in stored_times) - start) // interval_length) + 1
+
+    arrays = {
+        "T": start + numpy.arange(length) * interval_length,
+        "C": numpy.full((len(stores), length), numpy.nan),
+        "rsi": numpy.full((len(stores), length), numpy.nan),
+        "dayVolume": numpy.zeros((len(stores), length))
+    }
+    day_length = max(SECONDS_PER_DAY // interval_length, 1)
+    for row, store in enumerate(stores):
+        if len(store) < 1:
+            continue
+        indexes = ((store.get_array("T") - start) // interval_length).astype(numpy.int64)
+        arrays["C"][row, indexes] = store.get_array("C")
+        arrays["rsi"][row] = calculate_rsi_array(arrays["C"][row])
+        btc_volumes = numpy.zeros(length)
+        btc_volumes[indexes] = store.get_array("V") * store.get_array("C")
+        volume_sums = numpy.cumsum(btc_volumes)
+        arrays["dayVolume"][row] = volume_sums
+        arrays["dayVolume"][row, day_length:] -= volume_sums[:-day_length]
+    return arrays
+
+
+class SharedArrays(object):
+    """
+    Used for sharing NumPy arrays with the worker processes. The process that creates them must close them with unlink.
+    Workers share the creator's resource tracker, so attaching doesn't register the memory a second time.
+    """
+
+    def __init__(self, arrays=None, descriptors=None):
+        self.shared_memories = {}
+        self.arrays = {}
+        if arrays is not None:
+            self.descriptors = {}
+            for key, values in arrays.items():
+                shared = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+                self.arrays[key] = numpy.ndarray(values.shape, values.dtype, buffer=shared.buf)
+                self.arrays[key][...] = values
+                self.shared_memories[key] = shared
+                self.descriptors[key] = (shared.name, values.shape, values.dtype.str)
+        else:
+            self.descriptors = descriptors
+            for key, (name, shape, dtype) in descriptors.items():
+                shared = shared_memory.SharedMemory(name=name)
+                self.arrays[key] = numpy.ndarray(shape, numpy.dtype(dtype), buffer=shared.buf)
+                self.shared_memories[key] = shared
+
+    def close(self, unlink=False):
+        self.arrays = {}
+        for shared in self.shared_memories.values():
+            shared.close()
+            if unlink:
+                shared.unlink()
+
+
+def run_backtest(arrays, trade_params, pause_params, interval_length):
+    """
+    Used to simulate the trade and pause parameters candle by candle, with the Trader's checks.
+    Orders fill at the closing price, paused coin pairs are resumed after their own pause time.
+    Like Trader.analyse_buys, markets are only scanned for buys and buy pauses while no trade is open or every open
+    trade is sell paused, and only the markets that pass the volume and unit price checks are buy paused.
+
+    :param arrays: The market arrays returned by load_market_arrays
+    :type arrays: dict
+    :param trade_params: The `tradeParameters` settings
+    :type trade_params: dict
+    :param pause_params: The `pauseParameters` settings
+    :type pause_params: dict
+    :param interval_length: The length of a candle in seconds
+    :type interval_length: int
+
+    :return: The realised profit in BTC, the value of the trades still open, the amount of closed trades, their win
+        rate and average profit margin, and the largest drop of the realised profit
+    :rtype: dict
+    """
+    closes = arrays["C"]
+    rsi = arrays["rsi"]
+    day_volumes = arrays["dayVolume"]
+    btc_amount = trade_params["buy"]["btcAmount"]
+    buy_pause = pause_params.get("buy")
+    sell_pause = pause_params.get("sell")
+
+    open_trades = {}
+    buys_paused_until = numpy.zeros(closes.shape[0])
+    sells_paused_until = {}
+    profit_margins = []
+    profit = peak_profit = max_drawdown = 0
+
+    for step in range(RSI_CANDLE_COUNT - 1, closes.shape[1]):
+        for market, (buy_price, quantity) in list(open_trades.items()):
+            current_price = closes[market, step]
+            if numpy.isnan(current_price) or numpy.isnan(rsi[market, step]):
+                continue
+            if sells_paused_until.get(market, 0) > step:
+                continue
+            profit_margin = calculate_profit_margin(buy_price, quantity, current_price)
+            if check_sell_parameters(trade_params, rsi[market, step], profit_margin):
+                del open_trades[market]
+                profit_margins.append(profit_margin)
+                profit += profit_margin / 100 * btc_amount
+                peak_profit = max(peak_profit, profit)
+                max_drawdown = max(max_drawdown, peak_profit - profit)
+            elif sell_pause is not None and profit_margin <= sell_pause["profitMarginThreshold"] < 0:
+                sells_paused_until[market] = step + sell_pause["pauseTime"] * 60 / interval_length
+
+        # The same gate as Trader.is_buy_budget_available
+        sell_paused_count = sum(sells_paused_until.get(market, 0) > step for market in open_trades)
+        open_trade_budget = trade_params["buy"]["maxOpenTrades"] - len(open_trades)
+        if sell_paused_count < len(open_trades) or open_trade_budget < 1:
+            continue
+
+        with numpy.errstate(invalid="ignore"):
+            screened = buys_paused_until <= step
+            screened[list(open_trades)] = False
+            screened &= check_buy_volume_and_price(trade_params, day_volumes[:, step], closes[:, step])
+            buy_checks = screened & check_buy_parameters(trade_params, rsi[:, step], day_volumes[:, step],
+                                                         closes[:, step])
+            if buy_pause is not None and buy_pause["rsiThreshold"] > 0:
+                pauses = screened & ~buy_checks & (rsi[:, step] >= buy_pause["rsiThreshold"])
+                buys_paused_until[pauses] = step + buy_pause["pauseTime"] * 60 / interval_length
+
+        candidates = numpy.flatnonzero(buy_checks)
+        # The same order as Trader.scan_buys, highest 24 hour volume first
+        for market in candidates[numpy.argsort(-day_volumes[candidates, step])]:
+            if open_trade_budget < 1:
+                break
+            if market not in open_trades:
+                open_trades[market] = (btc_amount, btc_amount / closes[market, step])
+                open_trade_budget -= 1
+
+    open_profit = 0
+    for market, (buy_price, quantity) in open_trades.items():
+        last_prices = closes[market][~numpy.isnan(closes[market])]
+        open_profit += calculate_profit_margin(buy_price, quantity, last_prices[-1]) / 100 * btc_amount
+
+    return {
+        "profit": float(profit),
+        "openProfit": float(open_profit),
+        "trades": len(profit_margins),
+        "winRate": float(sum(margin > 0 for margin in profit_margins) / len(profit_margins)) if profit_margins else 0,
+        "averageMargin": float(sum(profit_margins) / len(profit_margins)) if profit_margins else 0,
+        "maxDrawdown": float(max_drawdown)
+    }
+
+
+def set_setting(settings, path, value):
+    """
+    Used to set a nested setting by its dotted path (ex: tradeParameters.buy.rsiThreshold)
+    """
+    keys = path.split(".")
+    for key in keys[:-1]:
+        settings = settings.setdefault(key, {})
+    settings[keys[-1]] = value
+
+
+def get_configurations(settings, sweep):
+    """
+    Used to get every combination of the swept settings
+
+    :param settings: The settings the swept values are applied to
+    :type settings: dict
+    :param sweep: The values to try, keyed by their settings' dotted paths (ex: tradeParameters.buy.rsiThreshold)
+    :type sweep: dict
+
+    :return: The swept values and the full settings of every combination
+    :rtype: list
+    """
+    paths = list(sweep)
+    configurations = []
+    for values in itertools.product(*(sweep[path] for path in paths)):
+        configuration = copy.deepcopy(settings)
+        for path, value in zip(paths, values):
+            set_setting(configuration, path, value)
+        configurations.append((dict(zip(paths, values)), configuration))
+    return configurations
+
+
+def attach_worker_arrays(descriptors):
+    for interval, interval_descriptors in descriptors.items():
+        worker_arrays[interval] = SharedArrays(descriptors=interval_descriptors)
+
+
+def run_configuration(settings):
+    interval = settings["tradeParameters"]["tickerInterval"]
+    return run_backtest(worker_arrays[interval].arrays, settings["tradeParameters"],
+                        settings.get("pauseParameters", {}), TICKER_INTERVAL_SECONDS[interval])
+
+
+def run_sweep(settings, sweep, market_names, directory="../database/candles/", worker_count=None):
+    """
+    Used to backtest every combination of the swept settings on a process pool
+
+    :param settings: The settings the swept values are applied to
+    :type settings: dict
+    :param sweep: The values to try, keyed by their settings' dotted paths (ex: tradeParameters.buy.rsiThreshold)
+    :type sweep: dict
+    :param market_names: The markets to backtest on (ex: BTC-LTC)
+    :type market_names: list
+    :param directory: The directory the candle stores are kept in
+    :type directory: str
+    :param worker_count: The amount of worker processes
+        Not required. If not passed in one worker per CPU is used
+    :type worker_count: int
+
+    :return: The swept values and backtest results of every combination, highest realised profit first
+    :rtype: list
+    """
+    configurations = get_configurations(settings, sweep)
+    intervals = {configuration["tradeParameters"]["tickerInterval"] for _, configuration in configurations}
+    shared_arrays = {}
+    try:
+        for interval in intervals:
+            shared_arrays[interval] = SharedArrays(load_market_arrays(market_names, interval, directory))
+        descriptors = {interval: shared.descriptors for interval, shared in shared_arrays.items()}
+        with ProcessPoolExecutor(worker_count, initializer=attach_worker_arrays, initargs=(descriptors,)) as pool:
+            results = list(pool.map(run_configuration, [configuration for _, configuration in configurations]))
+    finally:
+        for shared in shared_arrays.values():
+            shared.close(unlink=True)
+
+    rows = [dict(values, **result) for (values, _), result in zip(configurations, results)]
+    return sorted(rows, key=lambda row: row["profit"], reverse=True)
@@ -5,7 +5,8 @@ import time
 import hmac
 import hashlib
 import requests
-import json
+import getpass
+import ast
 
 try:
     from urllib import urlencode
@@ -14,15 +15,14 @@ except ImportError:
     from urllib.parse import urlencode
     from urllib.parse import urljoin
 
-try:
-    from Crypto.Cipher import AES
-    import getpass, ast
-    encrypted = True
-except ImportError:
-    encrypted = False
-
+import json_codec
 from logger import logger
 from directory_utilities import write_json_to_file
+from cache import Cache
+from circuit_breaker import CircuitBreaker
+from clock import wall_clock
+from metrics import metrics
+from tracing import tracer
 
 BUY_ORDER_BOOK = "buy"
 SELL_ORDER_BOOK = "sell"
@@ -50,22 +50,70 @@ ACCOUNT_SET = {
     "getwithdrawalhistory"
 }
 
+# Amount of seconds responses of cacheable public methods stay valid for.
+# Market and account methods are never cached.
+PUBLIC_CACHE_TTL = {
+    "getmarkets": 300,
+    "getcurrencies": 300,
+    "getticker": 5,
+    "getmarketsummaries": 5,
+    "getmarketsummary": 5,
+    "getorderbook": 2
+}
+
+
+def get_cipher(prompt):
+    """
+    Used to create an AES cipher from a password. pycrypto is only imported when secrets are encrypted or decrypted
+
+    :param prompt: The password prompt
+    :type prompt: str
+
+    :return: The AES cipher
+    :rtype: Crypto.Cipher.AES.AESCipher
+    """
+    try:
+        from Crypto.Cipher import AES
+    except ImportError:
+        raise ImportError("`pycrypto` module has to be installed")
+    return AES.new(getpass.getpass(prompt))
+
 
 def encrypt(api_key, api_secret, export=True, export_fn="../database/secrets.json"):
-    cipher = AES.new(getpass.getpass("Input encryption password (string will not show)"))
+    cipher = get_cipher("Input encryption password (string will not show)")
     api_key_n = cipher.encrypt(api_key)
     api_secret_n = cipher.encrypt(api_secret)
     api = {"key": str(api_key_n), "secret": str(api_secret_n)}
     if export:
-        write_json_to_file(export_fn, api)
+        write_json_to_file(export_fn, api, pretty=True)
     return api
 
 
-def using_requests(request_url, api_sign):
-    return requests.get(
-        request_url,
-        headers={"api_sign": api_sign}
-    ).json()
+def using_requests(request_url, api_sign, max_result_items=None):
+    """
+    Used to send a request to Bittrex and decode its JSON response
+
+    :param request_url: The request's URL
+    :type request_url: str
+    :param api_sign: The request's signature
+    :type api_sign: str
+    :param max_result_items: Only decode and keep the last max_result_items items of the response's result
+        Not required. If not passed in the whole response is decoded
+    :type max_result_items: int
+
+    :return: JSON response from Bittrex
+    :rtype: dict
+    """
+    if max_result_items is None:
+        return json_codec.loads(requests.get(
+            request_url,
+            headers={"api_sign": api_sign}
+        ).content)
+
+    with requests.get(request_url, headers={"api_sign": api_sign}, stream=True) as response:
+        # Large responses (ex: GetTicks) are decoded as a stream, only keeping the items that are used
+        response.raw.decode_content = True
+        return {"success": True, "result": json_codec.load_stream_items(response.raw, "result", max_result_items)}
 
 
 class Bittrex(object):
@@ -73,26 +121,25 @@ class Bittrex(object):
     Used for requesting Bittrex with API key and API secret
     """
 
-    def __init__(self, secrets, dispatch=using_requests):
+    def __init__(self, secrets, dispatch=using_requests, cache=None, breaker_params=None, clock=wall_clock):
         api_key = secrets["bittrex"]["bittrexKey"]
         api_secret = secrets["bittrex"]["bittrexSecret"]
         self.api_key = str(api_key) if api_key is not None else ""
         self.api_secret = str(api_secret) if api_secret is not None else ""
         self.dispatch = dispatch
+        self.cache = cache if cache is not None else Cache()
+        self.endpoint_breaker = CircuitBreaker("endpoint", breaker_params, clock)
 
     def decrypt(self):
-        if encrypted:
-            cipher = AES.new(getpass.getpass("Input decryption password (string will not show)"))
-            try:
-                self.api_key = ast.literal_eval(self.api_key) if type(self.api_key) == str else self.api_key
-                self.api_secret = ast.literal_eval(self.api_secret) if type(self.api_secret) == str else self.api_secret
-            except Exception:
-                logger.exception(Exception)
-                pass
-            self.api_key = cipher.decrypt(self.api_key).decode()
-            self.api_secret = cipher.decrypt(self.api_secret).decode()
-        else:
-            raise ImportError("`pycrypto` module has to be installed")
+        cipher = get_cipher("Input decryption password (string will not show)")
+        try:
+            self.api_key = ast.literal_eval(self.api_key) if type(self.api_key) == str else self.api_key
+            self.api_secret = ast.literal_eval(self.api_secret) if type(self.api_secret) == str else self.api_secret
+        except Exception:
+            logger.exception(Exception)
+            pass
+        self.api_key = cipher.decrypt(self.api_key).decode()
+        self.api_secret = cipher.decrypt(self.api_secret).decode()
 
     def api_query(self, method, options=None):
         """
@@ -126,7 +173,52 @@ class Bittrex(object):
         apisign = hmac.new(self.api_secret.encode(),
                            request_url.encode(),
                            hashlib.sha512).hexdigest()
-        return self.dispatch(request_url, apisign)
+
+        if method_set == "public" and method in PUBLIC_CACHE_TTL:
+            return self.cache.get_or_fetch(
+                request_url, PUBLIC_CACHE_TTL[method], lambda: self.timed_dispatch(method, request_url, apisign, True),
+                lambda response: isinstance(response, dict) and response.get("success", False)
+            )
+        return self.timed_dispatch(method, request_url, apisign, method_set == "public")
+
+    def timed_dispatch(self, endpoint, request_url, api_sign, can_back_off=False, max_result_items=None):
+        """
+        Dispatches a request and records its latency and errors per endpoint.
+        Requests that raise count towards backing off the endpoint.
+
+        :param endpoint: The endpoint's name (ex: getmarketsummary)
+        :type endpoint: str
+        :param request_url: The request's URL
+        :type request_url: str
+        :param api_sign: The request's signature
+        :type api_sign: str
+        :param can_back_off: Whether the request is skipped while the endpoint is backed off.
+            Orders and balances are always requested
+        :type can_back_off: bool
+        :param max_result_items: Only keep the last max_result_items items of the response's result
+            Not required. If not passed in the whole response is kept
+        :type max_result_items: int
+
+        :return: JSON response from Bittrex
+        :rtype: dict
+        """
+        if can_back_off and not self.endpoint_breaker.allow(endpoint):
+            return {"success": False, "message": "CIRCUIT_OPEN", "result": None}
+        try:
+            with tracer.span("http", "http", endpoint=endpoint):
+                with metrics.timer("bittrex_request_seconds", endpoint=endpoint):
+                    if max_result_items is None:
+                        response = self.dispatch(request_url, api_sign)
+                    else:
+                        response = self.dispatch(request_url, api_sign, max_result_items)
+        except Exception:
+            metrics.increment("bittrex_request_errors_total", endpoint=endpoint)
+            self.endpoint_breaker.record_failure(endpoint)
+            raise
+        self.endpoint_breaker.record_success(endpoint)
+        if isinstance(response, dict) and not response.get("success", True):
+            metrics.increment("bittrex_request_errors_total", endpoint=endpoint)
+        return response
 
     def get_historical_data(self, market, period, unit):
         """
@@ -145,13 +237,12 @@ class Bittrex(object):
         request_url = "https://bittrex.com/Api/v2.0/pub/market/GetTicks?marketName={}&tickInterval={}".format(market,
                                                                                                               unit)
 
+        apisign = hmac.new(self.api_secret.encode(), request_url.encode(), hashlib.sha512).hexdigest()
+
         try:
-            historical_data = requests.get(request_url,
-                                           headers={"apisign": hmac.new(self.api_secret.encode(), request_url.encode(),
-                                                                        hashlib.sha512).hexdigest()}
-                                           ).json()
+            historical_data = self.timed_dispatch("GetTicks", request_url, apisign, max_result_items=period)
             return historical_data["result"][-period:]
-        except (json.decoder.JSONDecodeError, TypeError) as exception:
+        except (json_codec.JSONDecodeError, TypeError) as exception:
             logger.exception(exception)
             return []
 
@@ -0,0 +1,148 @@
+import threading
+from collections import OrderedDict
+
+from clock import wall_clock
+
+# Returned for missing or expired keys, so cached None values (ex: an RSI without enough history) are still hits
+MISSING = object()
+
+
+class Cache(object):
+    """
+    Used for caching values for a limited amount of time
+
+    Entries are evicted least recently used first once max_size is reached, and concurrent
+    requests for the same missing key are coalesced into a single fetch (single-flight).
+    """
+
+    def __init__(self, max_size=1024, clock=wall_clock):
+        self.max_size = max_size
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Used to get a cached value if it hasn't expired yet
+
+        :param key: The cache key
+        :type key: hashable
+        :param default: The value returned for a missing or expired key
+            Not required. If not passed in None is returned
+        :type default: object
+
+        :return: The cached value, or the default if it is missing or expired
+        :rtype: object
+        """
+        with self.lock:
+            value = self._get(key)
+        return default if value is MISSING else value
+
+    def set(self, key, value, ttl):
+        """
+        Used to cache a value for ttl seconds
+
+        :param key: The cache key
+        :type key: hashable
+        :param value: The value to cache
+        :type value: object
+        :param ttl: The amount of seconds the value stays valid for
+        :type ttl: float
+        """
+        with self.lock:
+            self._set(key, value, ttl)
+
+    def get_or_fetch(self, key, ttl, fetch, is_cacheable=None):
+        """
+        Used to get a cached value, or fetch and cache it if it is missing or expired.
+        If another thread is already fetching the same key, wait for its result instead.
+
+        :param key: The cache key
+        :type key: hashable
+        :param ttl: The amount of seconds a fetched value stays valid for
+        :type ttl: float
+        :param fetch: Function used to fetch the value
+        :type fetch: function
+        :param is_cacheable: Function used to check if a fetched value may be cached
+            Not required. If not passed in all fetched values will be cached
+        :type is_cacheable: function
+
+        :return: The cached or fetched value
+        :rtype: object
+        """
+        with self.lock:
+            value = self._get(key)
+            if value is not MISSING:
+                return value
+            flight = self.in_flight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self.in_flight[key] = {"done": threading.Event(), "value": None, "exception": None}
+
+        if not is_leader:
+            flight["done"].wait()
+            if flight["exception"] is not None:
+                raise flight["exception"]
+            return flight["value"]
+
+        try:
+            flight["value"] = fetch()
+            if is_cacheable is None or is_cacheable(flight["value"]):
+                self.set(key, flight["value"], ttl)
+            return flight["value"]
+        except Exception as exception:
+            flight["exception"] = exception
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+            flight["done"].set()
+
+    def clear(self):
+        """
+        Used to remove all cached values
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def get_snapshot(self):
+        """
+        Used to get all the unexpired entries, so they can be restored after a restart
+
+        :return: The entries as (key, expiry, value) tuples, least recently used first
+        :rtype: list
+        """
+        now = self.clock.time()
+        with self.lock:
+            return [(key, expiry, value) for key, (expiry, value) in self.entries.items() if expiry > now]
+
+    def load_snapshot(self, snapshot):
+        """
+        Used to restore the entries of a snapshot that haven't expired yet
+
+        :param snapshot: The entries as (key, expiry, value) tuples, least recently used first
+        :type snapshot: list
+        """
+        now = self.clock.time()
+        with self.lock:
+            for key, expiry, value in snapshot:
+                if expiry > now:
+                    self._set(key, value, expiry - now)
+
+    def _get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return MISSING
+        expiry, value = entry
+        if self.clock.time() >= expiry:
+            del self.entries[key]
+            return MISSING
+        self.entries.move_to_end(key)
+        return value
+
+    def _set(self, key, value, ttl):
+        self.entries[key] = (self.clock.time() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
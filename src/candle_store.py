@@ -0,0 +1,293 @@
+import os
+import mmap
+import gzip
+import json
+import array
+import datetime
+import threading
+
+from clock import wall_clock
+from scheduler import TICKER_INTERVAL_SECONDS
+
+# GetTicks keys of the stored columns: time, open, high, low, close and volume
+COLUMNS = ("T", "O", "H", "L", "C", "V")
+COLUMN_WIDTH = array.array("d").itemsize
+
+candle_stores = {}
+candle_stores_lock = threading.Lock()
+
+
+def to_timestamp(bittrex_time):
+    """
+    Used to convert a Bittrex time string (ex: 2018-01-01T00:00:00.53) to a UTC timestamp
+    """
+    if bittrex_time is None:
+        return 0
+    return datetime.datetime.strptime(bittrex_time[:19], "%Y-%m-%dT%H:%M:%S").replace(
+        tzinfo=datetime.timezone.utc
+    ).timestamp()
+
+
+def to_bittrex_time(timestamp):
+    """
+    Used to convert a UTC timestamp to a Bittrex time string (ex: 2018-01-01T00:00:00)
+    """
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def get_candle_store(market, interval, directory="../database/candles/", clock=None):
+    """
+    Used to get the process wide candle store of a market's ticker interval, so strategies share one writer per store
+
+    :param market: String literal for the market (ex: BTC-LTC)
+    :type market: str
+    :param interval: Ticker interval (one of: 'oneMin', 'fiveMin', 'thirtyMin', 'hour', 'week', 'day', and 'month')
+    :type interval: str
+    :param directory: The directory the candle stores are kept in
+    :type directory: str
+    :param clock: The clock that decides which candles have closed
+        Not required. If not passed in the store keeps its current clock (the real time by default)
+    :type clock: WallClock
+
+    :return: The candle store
+    :rtype: CandleStore
+    """
+    key = (market, interval, directory)
+    with candle_stores_lock:
+        if key not in candle_stores:
+            candle_stores[key] = CandleStore(market, interval, directory)
+        if clock is not None:
+            candle_stores[key].clock = clock
+        return candle_stores[key]
+
+
+class CandleStore(object):
+    """
+    Used for persisting a market's candles of one ticker interval on disk.
+
+    Every column is a file of fixed-width native floats that is only ever appended to and is memory-mapped for reading,
+    so indicators can read the columns without copying them. Timestamps are stored as UTC epoch seconds.
+    """
+
+    def __init__(self, market, interval, directory="../database/candles/", clock=wall_clock):
+        self.market = market
+        self.interval = interval
+        self.interval_length = TICKER_INTERVAL_SECONDS[interval]
+        self.directory = os.path.join(directory, market, interval)
+        self.clock = clock
+        self.lock = threading.RLock()
+        self.maps = {}
+        self.length = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        # A crash between column appends leaves the columns uneven, only the candles every column has are kept
+        self.length = min(self.get_file_size(column) for column in COLUMNS) // COLUMN_WIDTH
+        for column in COLUMNS:
+            if self.get_file_size(column) != self.length * COLUMN_WIDTH:
+                with open(self.get_file_string(column), "r+b") as file:
+                    file.truncate(self.length * COLUMN_WIDTH)
+        self.remap(self.length)
+
+    def __len__(self):
+        return self.length
+
+    def get_file_string(self, column):
+        return os.path.join(self.directory, "{}.f64".format(column))
+
+    def get_file_size(self, column):
+        file_string = self.get_file_string(column)
+        if not os.path.exists(file_string):
+            open(file_string, "wb").close()
+        return os.path.getsize(file_string)
+
+    def remap(self, length):
+        """
+        Used to map the first length candles of the columns again after they grew.
+        Views of the previous maps stay valid until they are released.
+        """
+        maps = {}
+        if length > 0:
+            for column in COLUMNS:
+                with open(self.get_file_string(column), "rb") as file:
+                    maps[column] = mmap.mmap(file.fileno(), length * COLUMN_WIDTH, access=mmap.ACCESS_READ)
+        self.maps = maps
+
+    def get_last_timestamp(self):
+        """
+        Used to get the time of the newest stored candle
+
+        :return: The newest candle's timestamp, or None if the store is empty
+        :rtype: float
+        """
+        if self.length < 1:
+            return None
+        return self.get_column("T")[self.length - 1]
+
+    def append(self, candles):
+        """
+        Used to append candles newer than the newest stored candle. Candles that haven't closed yet are skipped.
+
+        :param candles: Candles in the GetTicks shape (ex: {"T": "2018-01-01T00:00:00", "O": 1, ... "V": 1})
+        :type candles: list
+
+        :return: The amount of candles appended
+        :rtype: int
+        """
+        with self.lock:
+            last_timestamp = self.get_last_timestamp()
+            closed_before = self.clock.time() - self.interval_length
+            rows = []
+            for candle in candles:
+                timestamp = to_timestamp(candle["T"])
+                if timestamp > closed_before or (last_timestamp is not None and timestamp <= last_timestamp):
+                    continue
+                rows.append((timestamp, candle["O"], candle["H"], candle["L"], candle["C"], candle["V"]))
+                last_timestamp = timestamp
+            self.append_rows(rows)
+            return len(rows)
+
+    def append_rows(self, rows):
+        self.append_columns({
+            column: array.array("d", (row[index] for row in rows)) for index, column in enumerate(COLUMNS)
+        })
+
+    def append_columns(self, columns):
+        """
+        Used to append candles column by column, without checking their times. Every column must hold the same amount
+        of candles.
+
+        :param columns: Buffers of native floats keyed by their GetTicks key (ex: array.array("d") or float64 NumPy
+            arrays)
+        :type columns: dict
+        """
+        count = memoryview(columns["T"]).nbytes // COLUMN_WIDTH
+        if count < 1:
+            return
+        with self.lock:
+            for column in COLUMNS:
+                with open(self.get_file_string(column), "ab") as file:
+                    file.write(columns[column])
+            self.remap(self.length + count)
+            self.length += count
+
+    def get_column(self, column):
+        """
+        Used to get a zero-copy view of a column
+
+        :param column: The column's GetTicks key (one of: 'T', 'O', 'H', 'L', 'C', 'V')
+        :type column: str
+
+        :return: The column's values
+        :rtype: memoryview
+        """
+        if self.length < 1:
+            return memoryview(array.array("d"))
+        return memoryview(self.maps[column]).cast("d")
+
+    def get_array(self, column):
+        """
+        Used to get a zero-copy, read-only NumPy view of a column. NumPy is only imported when this is used.
+
+        :param column: The column's GetTicks key (one of: 'T', 'O', 'H', 'L', 'C', 'V')
+        :type column: str
+
+        :return: The column's values
+        :rtype: numpy.ndarray
+        """
+        import numpy
+
+        return numpy.frombuffer(self.get_column(column), dtype=numpy.float64)
+
+    def get_candles(self, count=None):
+        """
+        Used to get the newest candles in the GetTicks shape
+
+        :param count: The amount of candles to get
+            Not required. If not passed in all candles are returned
+        :type count: int
+
+        :return: The candles, oldest first
+        :rtype: list
+        """
+        start = 0 if count is None else max(self.length - count, 0)
+        columns = {column: self.get_column(column)[start:self.length] for column in COLUMNS}
+        return [
+            {
+                "T": to_bittrex_time(columns["T"][index]), "O": columns["O"][index], "H": columns["H"][index],
+                "L": columns["L"][index], "C": columns["C"][index], "V": columns["V"][index]
+            }
+            for index in range(self.length - start)
+        ]
+
+    def get_gaps(self):
+        """
+        Used to find missing candles between the stored candles
+
+        :return: The (first missing, last missing) candle timestamps of every gap
+        :rtype: list
+        """
+        timestamps = self.get_column("T")
+        gaps = []
+        for index in range(1, self.length):
+            if timestamps[index] - timestamps[index - 1] > self.interval_length:
+                gaps.append((timestamps[index - 1] + self.interval_length, timestamps[index] - self.interval_length))
+        return gaps
+
+    def is_up_to_date(self, count):
+        """
+        Used to check if the store holds the newest count closed candles without gaps
+
+        :param count: The amount of candles needed
+        :type count: int
+
+        :return: Boolean indicating if the candles can be read from the store
+        :rtype: bool
+        """
+        if self.length < count:
+            return False
+        now = self.clock.time()
+        last_closed = now - now % self.interval_length - self.interval_length
+        timestamps = self.get_column("T")
+        return (timestamps[self.length - 1] >= last_closed and
+                timestamps[self.length - 1] - timestamps[self.length - count] == (count - 1) * self.interval_length)
+
+    def export_file(self, file_string):
+        """
+        Used to export the candles to a gzip compressed file, to share them with other machines
+
+        :param file_string: The export file's directory string (ex: ../database/BTC-LTC-fiveMin.candles.gz)
+        :type file_string: str
+        """
+        header = {"market": self.market, "interval": self.interval, "columns": COLUMNS, "count": self.length}
+        with gzip.open(file_string, "wb") as file:
+            file.write((json.dumps(header) + "\n").encode())
+            for column in COLUMNS:
+                file.write(self.get_column(column).tobytes())
+
+    def import_file(self, file_string):
+        """
+        Used to append the candles of an exported file that are newer than the newest stored candle
+
+        :param file_string: The export file's directory string (ex: ../database/BTC-LTC-fiveMin.candles.gz)
+        :type file_string: str
+
+        :return: The amount of candles appended
+        :rtype: int
+        """
+        with gzip.open(file_string, "rb") as file:
+            header = json.loads(file.readline().decode())
+            if header["market"] != self.market or header["interval"] != self.interval:
+                raise ValueError("{} holds {} {} candles".format(file_string, header["market"], header["interval"]))
+            columns = {}
+            for column in header["columns"]:
+                columns[column] = array.array("d")
+                columns[column].frombytes(file.read(header["count"] * COLUMN_WIDTH))
+
+        with self.lock:
+            last_timestamp = self.get_last_timestamp()
+            rows = [
+                tuple(columns[column][index] for column in COLUMNS) for index in range(header["count"])
+                if last_timestamp is None or columns["T"][index] > last_timestamp
+            ]
+            self.append_rows(rows)
+            return len(rows)
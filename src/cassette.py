@@ -0,0 +1,134 @@
+"""
+   Record and replay of Bittrex traffic. Cassettes are gzip compressed JSON lines of [URL, response] pairs,
+   indexed by URL when they are loaded for replay.
+"""
+import gzip
+import atexit
+import threading
+from collections import deque, defaultdict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import json_codec
+from bittrex import using_requests
+from directory_utilities import validate_or_make_directory
+
+# Query parameters that change on every request or hold secrets, they are never recorded
+IGNORED_QUERY_PARAMETERS = {"nonce", "apikey"}
+
+# Strategies recording to the same cassette share its recorder
+recorders = {}
+
+
+class CassetteMiss(Exception):
+    """
+    Raised when a replayed request was never recorded
+    """
+
+
+def normalise_url(request_url):
+    """
+    Used to strip the nonce and API key from a request URL, so the same request always has the same URL
+
+    :param request_url: The request's URL
+    :type request_url: str
+
+    :return: The normalised URL
+    :rtype: str
+    """
+    url = urlsplit(request_url)
+    query = [(key, value) for key, value in parse_qsl(url.query) if key.lower() not in IGNORED_QUERY_PARAMETERS]
+    return urlunsplit((url.scheme, url.netloc, url.path, urlencode(query), ""))
+
+
+class CassetteRecorder(object):
+    """
+    Used as a Bittrex dispatch that sends every request and records it with its response
+    """
+
+    def __init__(self, file_string, dispatch=using_requests):
+        validate_or_make_directory(file_string)
+        self.dispatch = dispatch
+        self.lock = threading.Lock()
+        self.file = gzip.open(file_string, "at")
+        atexit.register(self.close)
+
+    def __call__(self, request_url, api_sign, max_result_items=None):
+        if max_result_items is None:
+            response = self.dispatch(request_url, api_sign)
+        else:
+            response = self.dispatch(request_url, api_sign, max_result_items)
+        line = json_codec.dumps([normalise_url(request_url), response]) + "\n"
+        with self.lock:
+            self.file.write(line)
+        return response
+
+    def close(self):
+        """
+        Used to write the buffered recordings and close the cassette
+        """
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+class CassettePlayer(object):
+    """
+    Used as a Bittrex dispatch that answers requests with the responses of a cassette, without sending them.
+    Every URL's responses are replayed in the order they were recorded, after which its last response is repeated,
+    since cached responses may expire at different times during a replay than they did while recording.
+    """
+
+    def __init__(self, file_string):
+        self.lock = threading.Lock()
+        self.responses = defaultdict(deque)
+        self.last_responses = {}
+        self.request_count = 0
+        with gzip.open(file_string, "rt") as file:
+            for line in file:
+                url, response = json_codec.loads(line)
+                self.responses[url].append(response)
+                self.request_count += 1
+
+    def __call__(self, request_url, api_sign, max_result_items=None):
+        url = normalise_url(request_url)
+        with self.lock:
+            if len(self.responses[url]) > 0:
+                self.last_responses[url] = self.responses[url].popleft()
+            elif url not in self.last_responses:
+                raise CassetteMiss("{} was never recorded".format(url))
+            response = self.last_responses[url]
+        if max_result_items is not None and isinstance(response.get("result"), list):
+            response = dict(response, result=response["result"][-max_result_items:])
+        return response
+
+    def get_remaining_count(self):
+        """
+        Used to get the amount of recorded responses that haven't been replayed yet
+
+        :return: The amount of remaining responses
+        :rtype: int
+        """
+        with self.lock:
+            return sum(len(responses) for responses in self.responses.values())
+
+
+def get_dispatch(cassette_params=None):
+    """
+    Used to get the Bittrex dispatch of the `cassetteParameters` settings
+
+    :param cassette_params: The cassette settings (mode, file)
+    :type cassette_params: dict
+
+    :return: A recording or replaying dispatch, or the plain requests dispatch without a mode
+    :rtype: function
+    """
+    if cassette_params is None or cassette_params.get("mode") is None:
+        return using_requests
+    file_string = cassette_params.get("file", "../database/cassettes/session.jsonl.gz")
+    if cassette_params["mode"] == "record":
+        if file_string not in recorders:
+            recorders[file_string] = CassetteRecorder(file_string)
+        return recorders[file_string]
+    if cassette_params["mode"] == "replay":
+        return CassettePlayer(file_string)
+    raise ValueError("Unknown cassette mode {}".format(cassette_params["mode"]))
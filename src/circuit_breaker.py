@@ -0,0 +1,112 @@
+import threading
+
+from clock import wall_clock
+from metrics import metrics
+
+
+def get_backoff(failure_count, base_backoff=10, max_backoff=300):
+    """
+    Used to get an exponential backoff that doubles with every consecutive failure
+
+    :param failure_count: The amount of consecutive failures
+    :type failure_count: int
+    :param base_backoff: The backoff after the first failure in seconds
+    :type base_backoff: float
+    :param max_backoff: The maximum backoff in seconds
+    :type max_backoff: float
+
+    :return: The backoff in seconds
+    :rtype: float
+    """
+    return min(base_backoff * 2 ** max(failure_count - 1, 0), max_backoff)
+
+
+class CircuitBreaker(object):
+    """
+    Used for backing off keys (ex: coin pairs, endpoints) that keep failing, without affecting the other keys.
+
+    A key's circuit opens once it fails failure_threshold times in a row, and stays open for a backoff that doubles
+    with every further failure. Once the backoff has passed a single trial call is let through, which closes the
+    circuit if it succeeds.
+    """
+
+    def __init__(self, name, breaker_params=None, clock=wall_clock):
+        if breaker_params is None:
+            breaker_params = {}
+
+        self.name = name
+        self.clock = clock
+        self.failure_threshold = breaker_params.get("failureThreshold", 3)
+        self.base_backoff = breaker_params.get("baseBackoff", 10)
+        self.max_backoff = breaker_params.get("maxBackoff", 600)
+
+        self.lock = threading.Lock()
+        self.failures = {}
+        self.open_until = {}
+
+    def allow(self, key):
+        """
+        Used to check if a call for the key may go through
+
+        :param key: The key to check (ex: BTC-LTC, getmarketsummary)
+        :type key: str
+
+        :return: Boolean indicating if the key's circuit is closed, or its trial call is due
+        :rtype: bool
+        """
+        with self.lock:
+            open_until = self.open_until.get(key)
+            if open_until is None:
+                return True
+            now = self.clock.time()
+            if now < open_until:
+                return False
+            # Block the other callers while the trial call is running
+            self.open_until[key] = now + self.get_key_backoff(key)
+            return True
+
+    def record_success(self, key):
+        """
+        Used to close the key's circuit after a successful call
+
+        :param key: The key of the call (ex: BTC-LTC, getmarketsummary)
+        :type key: str
+        """
+        if key not in self.failures:
+            return
+        with self.lock:
+            self.failures.pop(key, None)
+            self.open_until.pop(key, None)
+
+    def record_failure(self, key):
+        """
+        Used to count a failed call, opening the key's circuit once it reaches the failure threshold
+
+        :param key: The key of the call (ex: BTC-LTC, getmarketsummary)
+        :type key: str
+
+        :return: The amount of seconds the key is backed off for (0 if its circuit is still closed)
+        :rtype: float
+        """
+        with self.lock:
+            self.failures[key] = self.failures.get(key, 0) + 1
+            if self.failures[key] < self.failure_threshold:
+                return 0
+            backoff = self.get_key_backoff(key)
+            self.open_until[key] = self.clock.time() + backoff
+        metrics.increment("circuit_breaker_trips_total", breaker=self.name)
+        return backoff
+
+    def get_key_backoff(self, key):
+        return get_backoff(self.failures.get(key, 0) - self.failure_threshold + 1, self.base_backoff, self.max_backoff)
+
+    def get_open_keys(self):
+        """
+        Used to get the keys that are currently backed off
+
+        :return: The backed off keys
+        :rtype: list
+        """
+        now = self.clock.time()
+        with self.lock:
+            return [key for key, open_until in self.open_until.items() if open_until > now]
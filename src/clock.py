@@ -0,0 +1,77 @@
+import time
+import threading
+
+
+class WallClock(object):
+    """
+    Used for reading and waiting on the real time
+    """
+
+    def time(self):
+        """
+        Used to get the current time
+
+        :return: The current UTC timestamp in seconds
+        :rtype: float
+        """
+        return time.time()
+
+    def sleep(self, seconds):
+        """
+        Used to wait for an amount of seconds
+
+        :param seconds: The amount of seconds to wait
+        :type seconds: float
+        """
+        time.sleep(seconds)
+
+    def wait(self, event, timeout):
+        """
+        Used to wait for an amount of seconds, or until the event is set
+
+        :param event: The event that ends the wait early
+        :type event: threading.Event
+        :param timeout: The amount of seconds to wait
+        :type timeout: float
+
+        :return: Boolean indicating if the event was set
+        :rtype: bool
+        """
+        return event.wait(timeout)
+
+
+class VirtualClock(WallClock):
+    """
+    Used for simulating time, waiting advances the clock instead of blocking,
+    so simulations of pause windows or order timeouts covering hours finish in milliseconds
+    """
+
+    def __init__(self, start_time=None):
+        self.now = start_time if start_time is not None else time.time()
+        self.lock = threading.Lock()
+
+    def time(self):
+        with self.lock:
+            return self.now
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def wait(self, event, timeout):
+        if not event.is_set():
+            self.advance(timeout)
+        return event.is_set()
+
+    def advance(self, seconds):
+        """
+        Used to move the clock forward
+
+        :param seconds: The amount of seconds to move forward
+        :type seconds: float
+        """
+        with self.lock:
+            self.now += max(seconds, 0)
+
+
+# The clock used when none is passed in
+wall_clock = WallClock()
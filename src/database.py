@@ -1,38 +1,92 @@
+import heapq
 import pydash as py_
-import time
+import threading
 
+from clock import wall_clock
 from directory_utilities import get_json_from_file, write_json_to_file
 from logger import logger
-
-bittrex_trade_commission = 0.0025
+from records import Order, Trade
+from trade_checks import calculate_profit_margin
 
 
 class Database(object):
     """
     Used to store trade history locally
+
+    There is one database per name, every strategy stores its trades in its own named database.
+    Pause times are read from the database's clock, so simulations can use a virtual clock.
+
+    Every paused coin pair is stored with its own expiry time, and the pauses are kept in a min-heap on their expiry,
+    so expired pauses are found without going over all the paused coin pairs.
     """
 
-    instance = None
+    # The app data keys of the paused coin pairs of every pause type, keyed by their coin pair
+    paused_coin_pair_keys = {"buy": "pausedCoinPairs", "sell": "pausedTrackedCoinPairs"}
 
-    def __new__(cls):
-        if not Database.instance:
-            Database.instance = Database.__Database()
-        return Database.instance
+    instances = {}
+
+    def __new__(cls, name=None, clock=None):
+        if name not in Database.instances:
+            Database.instances[name] = Database.__Database(name)
+        if clock is not None:
+            Database.instances[name].clock = clock
+        return Database.instances[name]
 
     class __Database:
-        def __init__(self):
+        def __init__(self, name=None):
             default_trades = {"trackedCoinPairs": [], "trades": []}
             default_app_data = {
-                "coinPairs": [], "pausedTrackedCoinPairs": [],
-                "pauseTime": {"buy": None, "sell": None, "balance": None},
+                "coinPairs": [], "coinPairsTime": None, "pausedCoinPairs": {}, "pausedTrackedCoinPairs": {},
+                "pauseTime": {"balance": None},
                 "previousBalance": None
             }
 
-            self.trades_file_string = "../database/trades.json"
-            self.app_data_file_string = "../database/app-data.json"
+            self.lock = threading.RLock()
+            self.clock = wall_clock
+
+            self.directory = "../database/" if name is None else "../database/{}/".format(name)
+            self.trades_file_string = self.directory + "trades.json"
+            self.app_data_file_string = self.directory + "app-data.json"
 
             self.trades = get_json_from_file(self.trades_file_string, default_trades)
+            self.trades["trades"] = [Trade.from_json(trade) for trade in self.trades["trades"]]
             self.app_data = get_json_from_file(self.app_data_file_string, default_app_data)
+            self.migrate_pauses()
+            self.pause_heap = [
+                (expiry, pause_type, coin_pair)
+                for pause_type, key in Database.paused_coin_pair_keys.items()
+                for coin_pair, expiry in self.app_data[key].items()
+            ]
+            heapq.heapify(self.pause_heap)
+
+        def migrate_pauses(self):
+            """
+            Used to convert the pauses of the old app data format, where buy paused coin pairs were removed from the
+            market list until it was fetched again and sell paused coin pairs shared a single pause time.
+            Old sell pauses expire straight away, so the next sell check decides if they are paused again.
+            """
+            pause_times = self.app_data.setdefault("pauseTime", {"balance": None})
+            if "buy" in pause_times:
+                # Fetch the full market list again, so the old buy paused coin pairs are tracked again
+                self.app_data["coinPairsTime"] = None
+            if isinstance(self.app_data.get("pausedTrackedCoinPairs", {}), list):
+                self.app_data["pausedTrackedCoinPairs"] = {
+                    coin_pair: 0 for coin_pair in self.app_data["pausedTrackedCoinPairs"]
+                }
+            self.app_data.setdefault("coinPairsTime", None)
+            self.app_data.setdefault("pausedCoinPairs", {})
+            self.app_data.setdefault("pausedTrackedCoinPairs", {})
+            pause_times.pop("buy", None)
+            pause_times.pop("sell", None)
+
+        def write_trades(self):
+            """
+            Used to write the tracked coin pairs and trades to the trades file in their JSON shape
+            """
+            write_json_to_file(self.trades_file_string, {
+                "trackedCoinPairs": self.trades["trackedCoinPairs"],
+                "trades": [trade.to_json() for trade in self.trades["trades"]]
+            })
 
         def store_initial_buy(self, coin_pair, buy_order_uuid):
             """
@@ -43,21 +97,16 @@ class Database(object):
             :param buy_order_uuid: The buy order's UUID
             :type buy_order_uuid: str
             """
-            if coin_pair in self.trades["trackedCoinPairs"]:
-                return logger.warning("Trying to buy on the {} market which is already tracked.".format(coin_pair))
+            with self.lock:
+                if coin_pair in self.trades["trackedCoinPairs"]:
+                    return logger.warning("Trying to buy on the {} market which is already tracked.".format(coin_pair))
 
-            new_buy_object = {
-                "coinPair": coin_pair,
-                "quantity": 0,
-                "buy": {
-                    "orderUuid": buy_order_uuid
-                }
-            }
+                new_trade = Trade(coin_pair=coin_pair, quantity=0, buy=Order(order_uuid=buy_order_uuid))
 
-            self.trades["trackedCoinPairs"].append(coin_pair)
-            self.trades["trades"].append(new_buy_object)
+                self.trades["trackedCoinPairs"].append(coin_pair)
+                self.trades["trades"].append(new_trade)
 
-            write_json_to_file(self.trades_file_string, self.trades)
+                self.write_trades()
 
         def store_buy(self, bittrex_order, stats):
             """
@@ -68,18 +117,19 @@ class Database(object):
             :param stats: The buy stats to store
             :type stats: dict
             """
-            if bittrex_order["Exchange"] not in self.trades["trackedCoinPairs"]:
-                return logger.warning(
-                    "Trying to buy on the {} market without an initial buy object.".format(bittrex_order["Exchange"])
-                )
+            with self.lock:
+                if bittrex_order["Exchange"] not in self.trades["trackedCoinPairs"]:
+                    return logger.warning("Trying to buy on the {} market without an initial buy object.".format(
+                        bittrex_order["Exchange"]
+                    ))
 
-            order = self.convert_bittrex_order_object(bittrex_order, stats)
+                order = self.convert_bittrex_order_object(bittrex_order, stats)
 
-            trade = self.get_open_trade(bittrex_order["Exchange"])
-            trade["quantity"] = round(bittrex_order["Quantity"] - bittrex_order["QuantityRemaining"], 8)
-            trade["buy"] = order
+                trade = self.get_open_trade(bittrex_order["Exchange"])
+                trade.quantity = round(bittrex_order["Quantity"] - bittrex_order["QuantityRemaining"], 8)
+                trade.buy = order
 
-            write_json_to_file(self.trades_file_string, self.trades)
+                self.write_trades()
 
         def store_sell(self, bittrex_order, stats):
             """
@@ -90,68 +140,98 @@ class Database(object):
             :param stats: The sell stats to store
             :type stats: dict
             """
-            if bittrex_order["Exchange"] not in self.trades["trackedCoinPairs"]:
-                return logger.warning(
-                    "Trying to sell on the {} market which is not tracked.".format(bittrex_order["Exchange"])
-                )
+            with self.lock:
+                if bittrex_order["Exchange"] not in self.trades["trackedCoinPairs"]:
+                    return logger.warning(
+                        "Trying to sell on the {} market which is not tracked.".format(bittrex_order["Exchange"])
+                    )
 
-            order = self.convert_bittrex_order_object(bittrex_order, stats)
+                order = self.convert_bittrex_order_object(bittrex_order, stats)
 
-            trade = self.get_open_trade(bittrex_order["Exchange"])
-            trade["sell"] = order
-            self.trades["trackedCoinPairs"].remove(bittrex_order["Exchange"])
+                trade = self.get_open_trade(bittrex_order["Exchange"])
+                trade.sell = order
+                self.trades["trackedCoinPairs"].remove(bittrex_order["Exchange"])
 
-            write_json_to_file(self.trades_file_string, self.trades)
+                self.write_trades()
 
-        def pause_buy(self, coin_pair):
+        def pause_buy(self, coin_pair, pause_time):
             """
             Used to pause buy tracking on the coin pair
 
             :param coin_pair: String literal for the market (ex: BTC-LTC)
             :type coin_pair: str
+            :param pause_time: The amount of minutes to pause the coin pair for
+            :type pause_time: float
             """
-            self.app_data["coinPairs"].remove(coin_pair)
+            self.pause(coin_pair, "buy", pause_time)
 
-            write_json_to_file(self.app_data_file_string, self.app_data)
-
-        def pause_sell(self, coin_pair):
+        def pause_sell(self, coin_pair, pause_time):
             """
-            Used to pause sell tracking on the coin pair and set the sell pause time
+            Used to pause sell tracking on the coin pair
 
             :param coin_pair: String literal for the market (ex: BTC-LTC)
             :type coin_pair: str
+            :param pause_time: The amount of minutes to pause the coin pair for
+            :type pause_time: float
             """
-            if coin_pair in self.app_data["pausedTrackedCoinPairs"]:
-                return
-            self.app_data["pausedTrackedCoinPairs"].append(coin_pair)
-            if self.app_data["pauseTime"]["sell"] is None:
-                self.app_data["pauseTime"]["sell"] = time.time()
-
-            write_json_to_file(self.app_data_file_string, self.app_data)
+            self.pause(coin_pair, "sell", pause_time)
 
-        def store_coin_pairs(self, btc_coin_pairs):
+        def pause(self, coin_pair, pause_type, pause_time):
             """
-            Used to store the latest Bittrex available markets and update the buy pause time
+            Used to pause the coin pair until its pause time has passed, unless it's already paused
 
-            :param btc_coin_pairs: String list of market pairs
-            :type btc_coin_pairs: list
+            :param coin_pair: String literal for the market (ex: BTC-LTC)
+            :type coin_pair: str
+            :param pause_type: The pause type (one of: 'buy', 'sell')
+            :type pause_type: str
+            :param pause_time: The amount of minutes to pause the coin pair for
+            :type pause_time: float
             """
-            self.app_data["coinPairs"] = btc_coin_pairs
-            self.app_data["pauseTime"]["buy"] = time.time()
+            with self.lock:
+                paused_coin_pairs = self.app_data[Database.paused_coin_pair_keys[pause_type]]
+                if coin_pair in paused_coin_pairs:
+                    return
+                expiry = self.clock.time() + pause_time * 60
+                paused_coin_pairs[coin_pair] = expiry
+                heapq.heappush(self.pause_heap, (expiry, pause_type, coin_pair))
 
-            write_json_to_file(self.app_data_file_string, self.app_data)
+                write_json_to_file(self.app_data_file_string, self.app_data)
 
-        def resume_sells(self):
+        def resume_expired_pauses(self):
             """
-            Used to resume all paused sells and reset the sell pause time
+            Used to resume the paused coin pairs whose pause time has passed, earliest expiry first
+
+            :return: The resumed coin pairs, as (pause type, coin pair) pairs
+            :rtype: list
+            """
+            resumed = []
+            with self.lock:
+                now = self.clock.time()
+                while len(self.pause_heap) > 0 and self.pause_heap[0][0] <= now:
+                    expiry, pause_type, coin_pair = heapq.heappop(self.pause_heap)
+                    paused_coin_pairs = self.app_data[Database.paused_coin_pair_keys[pause_type]]
+                    # Heap entries of pauses that were already resumed are skipped
+                    if paused_coin_pairs.get(coin_pair) != expiry:
+                        continue
+                    del paused_coin_pairs[coin_pair]
+                    resumed.append((pause_type, coin_pair))
+
+                if len(resumed) > 0:
+                    write_json_to_file(self.app_data_file_string, self.app_data)
+            return resumed
+
+        def store_coin_pairs(self, btc_coin_pairs):
             """
-            if len(self.app_data["pausedTrackedCoinPairs"]) < 1:
-                return
+            Used to store the latest Bittrex available markets and the time they were fetched
 
-            self.app_data["pausedTrackedCoinPairs"] = []
-            self.app_data["pauseTime"]["sell"] = None
+            :param btc_coin_pairs: String list of market pairs
+            :type btc_coin_pairs: list
+            """
+            with self.lock:
+                self.app_data["coinPairs"] = btc_coin_pairs
+                self.app_data["coinPairsTime"] = self.clock.time()
 
-            write_json_to_file(self.app_data_file_string, self.app_data)
+                write_json_to_file(self.app_data_file_string, self.app_data)
 
         def reset_balance_notifier(self, current_balance=None):
             """
@@ -160,11 +240,12 @@ class Database(object):
             :param current_balance: The current total balance's BTC value
             :type current_balance: float
             """
-            if current_balance is not None:
-                self.app_data["previousBalance"] = current_balance
-            self.app_data["pauseTime"]["balance"] = time.time()
+            with self.lock:
+                if current_balance is not None:
+                    self.app_data["previousBalance"] = current_balance
+                self.app_data["pauseTime"]["balance"] = self.clock.time()
 
-            write_json_to_file(self.app_data_file_string, self.app_data)
+                write_json_to_file(self.app_data_file_string, self.app_data)
 
         def check_resume(self, pause_time, pause_type):
             """
@@ -172,15 +253,13 @@ class Database(object):
 
             :param pause_time: The amount of minutes tracking should be paused
             :type pause_time: int
-            :param pause_type: The pause type to check (one of: 'buy', 'sell', 'balance)
+            :param pause_type: The pause type to check (one of: 'balance')
             :type pause_type: str
             """
             if self.app_data["pauseTime"][pause_type] is None:
-                if pause_type == "balance":
-                    self.reset_balance_notifier()
-                    return True
-                return False
-            return time.time() - self.app_data["pauseTime"][pause_type] >= pause_time * 60
+                self.reset_balance_notifier()
+                return True
+            return self.clock.time() - self.app_data["pauseTime"][pause_type] >= pause_time * 60
 
         def get_open_trade(self, coin_pair):
             """
@@ -189,11 +268,11 @@ class Database(object):
             :param coin_pair: String literal for the market (ex: BTC-LTC)
             :type coin_pair: str
 
-            :return: The open trade object
-            :rtype: dict
+            :return: The open trade
+            :rtype: Trade
             """
             trade_index = py_.find_index(self.trades["trades"],
-                                         lambda trade: trade["coinPair"] == coin_pair and "sell" not in trade)
+                                         lambda trade: trade.coin_pair == coin_pair and trade.is_open())
 
             if trade_index == -1:
                 logger.error("Could not find open trade for {} coin pair".format(coin_pair))
@@ -211,20 +290,17 @@ class Database(object):
             :type current_price: float
             :param trade: The trade to calculate the profit margin on
                 Not required. If not passed in the function will go find it
-            :type trade: dict
+            :type trade: Trade
 
-            :return: Profit margin
+            :return: Profit margin, or None if the trade's buy hasn't been filled yet
             :rtype: float
             """
             if trade is None:
                 trade = self.get_open_trade(coin_pair)
+            if trade is None or trade.buy.price is None:
+                return None
 
-            buy_btc_quantity = round(trade["buy"]["price"] / (1 - bittrex_trade_commission), 8)
-            sell_btc_quantity = round(trade["quantity"] * current_price * (1 - bittrex_trade_commission), 8)
-
-            profit_margin = 100 * (sell_btc_quantity - buy_btc_quantity) / buy_btc_quantity
-
-            return profit_margin
+            return calculate_profit_margin(trade.buy.price, trade.quantity, current_price)
 
         def get_previous_total_balance(self):
             """
@@ -240,22 +316,15 @@ class Database(object):
         @staticmethod
         def convert_bittrex_order_object(bittrex_order, stats=None):
             """
-            Used to convert a Bittrex order object to a database buy object
+            Used to convert a Bittrex order object to a database order
             and add stats to it of they are provided.
 
             :param bittrex_order: Bittrex buy order object
             :type bittrex_order: dict
             :param stats: The buy stats to store
             :type stats: dict
+
+            :return: The database order
+            :rtype: Order
             """
-            database_order = {
-                "orderUuid": bittrex_order["OrderUuid"],
-                "dateOpened": bittrex_order["Opened"],
-                "dateClosed": bittrex_order["Closed"],
-                "price": bittrex_order["Price"],
-                "unitPrice": bittrex_order["PricePerUnit"],
-                "commissionPaid": bittrex_order["CommissionPaid"]
-            }
-            if stats is not None:
-                database_order["stats"] = stats
-            return database_order
+            return Order.from_bittrex(bittrex_order, stats)
@@ -1,6 +1,10 @@
 import os
+import time
 import errno
-import json
+
+import json_codec
+from metrics import metrics
+from tracing import tracer
 
 
 def validate_or_make_directory(directory_string):
@@ -32,19 +36,19 @@ def get_json_from_file(directory_string, default_json_content=None):
     validate_or_make_directory(directory_string)
     try:
         with open(directory_string) as file:
-            file_content = json.load(file)
+            file_content = json_codec.loads(file.read())
             file.close()
             return file_content
-    except (IOError, json.decoder.JSONDecodeError):
+    except (IOError, json_codec.JSONDecodeError):
         with open(directory_string, "w") as file:
             if default_json_content is None:
                 default_json_content = {}
-            json.dump(default_json_content, file, indent=4)
+            file.write(json_codec.dumps(default_json_content, pretty=True))
             file.close()
             return default_json_content
 
 
-def write_json_to_file(directory_string, json_content):
+def write_json_to_file(directory_string, json_content, pretty=None):
     """
     Get the contents of a JSON file. If it doesn't exist,
     create and populate it with specified or default JSON content.
@@ -53,7 +57,17 @@ def write_json_to_file(directory_string, json_content):
     :type directory_string: str
     :param json_content: The content to populate a non-existing JSON file with
     :type json_content: dict
+    :param pretty: Whether the file is indented for humans to read or kept compact
+        Not required. If not passed in the `jsonParameters` `prettyPrint` setting is used
+    :type pretty: bool
     """
-    with open(directory_string, "w") as file:
-        json.dump(json_content, file, indent=4)
-        file.close()
+    if pretty is None:
+        pretty = json_codec.pretty_files
+    start_time = time.time()
+    with tracer.span("write_json_to_file", "io", file=os.path.basename(directory_string)):
+        content = json_codec.dumps(json_content, pretty)
+        with open(directory_string, "w") as file:
+            file.write(content)
+            file.close()
+    metrics.observe("database_write_seconds", time.time() - start_time, file=os.path.basename(directory_string))
+    metrics.increment("database_write_bytes_total", len(content.encode()), file=os.path.basename(directory_string))
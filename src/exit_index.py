@@ -0,0 +1,155 @@
+import bisect
+import threading
+
+from trade_checks import bittrex_trade_commission, calculate_trigger_price
+
+
+def get_exit_band(trade_params, pause_params, buy_price, quantity):
+    """
+    Used to get the price band in which none of a trade's sell or pause conditions can be met, whatever the RSI.
+    Below the band the trade can hit its loss or sell pause margin, and above it its min profit or profit margin.
+
+    :param trade_params: The `tradeParameters` settings
+    :type trade_params: dict
+    :param pause_params: The `pauseParameters` settings
+    :type pause_params: dict
+    :param buy_price: The BTC paid for the trade's buy order, without its commission
+    :type buy_price: float
+    :param quantity: The amount of coins bought
+    :type quantity: float
+
+    :return: The band's lower and upper trigger prices, as an open interval
+    :rtype: tuple
+    """
+    sell_params = trade_params["sell"]
+    lower_margins = []
+    if sell_params.get("lossMarginThreshold", 0) < 0:
+        lower_margins.append(sell_params["lossMarginThreshold"])
+    if "sell" in pause_params and pause_params["sell"]["profitMarginThreshold"] < 0:
+        lower_margins.append(pause_params["sell"]["profitMarginThreshold"])
+    upper_margin = min(sell_params["minProfitMarginThreshold"], sell_params["profitMarginThreshold"])
+
+    # The sell BTC quantity is rounded to 8 decimals, so the band is narrowed by one rounding step on both sides
+    rounding_step = 1e-8 / (quantity * (1 - bittrex_trade_commission))
+    lower = 0
+    if len(lower_margins) > 0:
+        lower = calculate_trigger_price(buy_price, quantity, max(lower_margins)) + rounding_step
+    upper = calculate_trigger_price(buy_price, quantity, upper_margin) - rounding_step
+    return lower, upper
+
+
+class TriggerPrices(object):
+    """
+    Used for trigger prices kept in sorted order, with the key of the trade each one belongs to
+    """
+
+    def __init__(self):
+        self.prices = []
+        self.keys = []
+
+    def __len__(self):
+        return len(self.prices)
+
+    def add(self, price, key):
+        index = bisect.bisect_right(self.prices, price)
+        self.prices.insert(index, price)
+        self.keys.insert(index, key)
+
+    def remove(self, price, key):
+        index = bisect.bisect_left(self.prices, price)
+        index += self.keys[index:bisect.bisect_right(self.prices, price)].index(key)
+        del self.prices[index]
+        del self.keys[index]
+
+    def get_keys_from(self, price):
+        """
+        Used to get the keys of the trigger prices at or above the price
+        """
+        return self.keys[bisect.bisect_left(self.prices, price):]
+
+    def get_keys_to(self, price):
+        """
+        Used to get the keys of the trigger prices at or below the price
+        """
+        return self.keys[:bisect.bisect_right(self.prices, price)]
+
+
+class ExitIndex(object):
+    """
+    Used for finding the open trades whose sell conditions need checking at a new price.
+
+    Every trade is indexed by the lower and upper trigger prices of its exit band, in sorted lists per coin pair.
+    The trades that need checking are the ones whose band doesn't contain the price: a suffix of the lower trigger
+    prices and a prefix of the upper trigger prices, found with a binary search each.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bands = {}
+        self.lower_prices = {}
+        self.upper_prices = {}
+
+    def __contains__(self, key):
+        return key in self.bands
+
+    def __len__(self):
+        return len(self.bands)
+
+    def add(self, key, coin_pair, lower, upper):
+        """
+        Used to index a trade's exit band, replacing its previous band
+
+        :param key: The trade's key (ex: its buy order UUID)
+        :type key: str
+        :param coin_pair: String literal for the trade's market (ex: BTC-LTC)
+        :type coin_pair: str
+        :param lower: The band's lower trigger price
+        :type lower: float
+        :param upper: The band's upper trigger price
+        :type upper: float
+        """
+        with self.lock:
+            self.remove_band(key)
+            self.bands[key] = (coin_pair, lower, upper)
+            self.lower_prices.setdefault(coin_pair, TriggerPrices()).add(lower, key)
+            self.upper_prices.setdefault(coin_pair, TriggerPrices()).add(upper, key)
+
+    def remove(self, key):
+        """
+        Used to remove a trade's exit band
+
+        :param key: The trade's key
+        :type key: str
+        """
+        with self.lock:
+            self.remove_band(key)
+
+    def remove_band(self, key):
+        if key not in self.bands:
+            return
+        coin_pair, lower, upper = self.bands.pop(key)
+        self.lower_prices[coin_pair].remove(lower, key)
+        self.upper_prices[coin_pair].remove(upper, key)
+        if len(self.lower_prices[coin_pair]) < 1:
+            del self.lower_prices[coin_pair]
+            del self.upper_prices[coin_pair]
+
+    def get_triggered(self, coin_pair, price):
+        """
+        Used to get the coin pair's trades whose exit band doesn't contain the price
+
+        :param coin_pair: String literal for the market (ex: BTC-LTC)
+        :type coin_pair: str
+        :param price: The coin pair's current price
+        :type price: float
+
+        :return: The keys of the trades to check, or None if no trades of the coin pair are indexed
+        :rtype: list
+        """
+        with self.lock:
+            if coin_pair not in self.lower_prices:
+                return None
+            # Bands are open intervals, so a price on a trigger price is outside the band
+            triggered = self.lower_prices[coin_pair].get_keys_from(price)
+            triggered += self.upper_prices[coin_pair].get_keys_to(price)
+        return list(dict.fromkeys(triggered))
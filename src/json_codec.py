@@ -0,0 +1,120 @@
+"""
+   JSON encoding and decoding using the fastest installed library (orjson, then ujson, then the standard library)
+"""
+import json
+from collections import deque
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+JSONDecodeError = json.decoder.JSONDecodeError
+
+# Whether database files are written indented, set from the `jsonParameters` settings
+pretty_files = True
+
+if orjson is not None:
+    library = "orjson"
+elif ujson is not None:
+    library = "ujson"
+else:
+    library = "json"
+
+
+def configure(json_params):
+    """
+    Used to set whether database files are written indented for humans to read or kept compact
+
+    :param json_params: The JSON settings (prettyPrint)
+    :type json_params: dict
+    """
+    global pretty_files
+    pretty_files = json_params.get("prettyPrint", True)
+
+
+def loads(content):
+    """
+    Used to decode a JSON document
+
+    :param content: The JSON document
+    :type content: str, bytes
+
+    :return: The decoded content
+    :rtype: dict, list
+
+    :raises JSONDecodeError: If the document isn't valid JSON, whichever library is used
+    """
+    if library == "orjson":
+        return orjson.loads(content)
+    if library == "ujson":
+        try:
+            return ujson.loads(content)
+        except ValueError as exception:
+            raise JSONDecodeError(str(exception), content if isinstance(content, str) else "", 0)
+    return json.loads(content)
+
+
+def dumps(content, pretty=False):
+    """
+    Used to encode content as a JSON document
+
+    :param content: The content to encode
+    :type content: dict, list
+    :param pretty: Whether the document is indented for humans to read or kept compact
+    :type pretty: bool
+
+    :return: The JSON document
+    :rtype: str
+    """
+    # Indented documents are only written when asked for in the settings, so they always use the standard library
+    # (orjson can only indent by 2 spaces) to keep the files the same whichever library is installed
+    if pretty:
+        return json.dumps(content, indent=4)
+    if library == "orjson":
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS).decode()
+    if library == "ujson":
+        return ujson.dumps(content)
+    return json.dumps(content, separators=(",", ":"))
+
+
+def load_stream_items(stream, prefix, max_items=None):
+    """
+    Used to decode the items of an array inside a JSON stream (ex: the `result` of a GetTicks response),
+    without holding the whole document in memory when ijson is installed
+
+    :param stream: A binary file-like object with the JSON document
+    :type stream: io.RawIOBase
+    :param prefix: The path of the array (ex: result)
+    :type prefix: str
+    :param max_items: Only keep the last max_items items
+        Not required. If not passed in all the items are kept
+    :type max_items: int
+
+    :return: The array's items, or an empty list if the array is missing or null
+    :rtype: list
+
+    :raises JSONDecodeError: If the document isn't valid JSON
+    """
+    if ijson is None:
+        content = loads(stream.read())
+        for key in prefix.split("."):
+            content = content.get(key) if isinstance(content, dict) else None
+        if content is None:
+            return []
+        return content[-max_items:] if max_items is not None else content
+
+    try:
+        return list(deque(ijson.items(stream, prefix + ".item", use_float=True), maxlen=max_items))
+    except ijson.JSONError as exception:
+        raise JSONDecodeError(str(exception), "", 0)
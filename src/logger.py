@@ -1,14 +1,163 @@
+import os
+import re
+import json
+import queue
+import atexit
 import logging
 import datetime
+import threading
+import logging.handlers
 
 from directory_utilities import validate_or_make_directory
 
-date = "{:%Y-%m-%d}".format(datetime.datetime.now())
-log_file_string = "../logs/{}.log".format(date)
+log_directory = "../logs/"
 
-validate_or_make_directory(log_file_string)
+log_context = threading.local()
 
-logging.basicConfig(filename=log_file_string, level=logging.WARNING, format="%(asctime)s - %(levelname)s: %(message)s",
-                    datefmt="%Y/%m/%d %I:%M:%S %p")
 
-logger = logging
+def set_log_context(**context):
+    """
+    Used to set the context added to the calling thread's log records (ex: coinPair, cycle)
+    """
+    for key, value in context.items():
+        setattr(log_context, key, value)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Used to add the calling thread's log context to its log records
+    """
+
+    def filter(self, record):
+        record.coinPair = getattr(log_context, "coinPair", None)
+        record.cycle = getattr(log_context, "cycle", None)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Used to format log records as JSON lines
+    """
+
+    def format(self, record):
+        return json.dumps({
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "coinPair": getattr(record, "coinPair", None),
+            "cycle": getattr(record, "cycle", None),
+            "thread": record.threadName
+        })
+
+
+class DatedRotatingFileHandler(logging.FileHandler):
+    """
+    Used to write logs to a file named for the current date (ex: 2018-01-01.log).
+    Switches to a new file when the date changes or the file grows past max_bytes (ex: 2018-01-01.1.log),
+    and only keeps the newest backup_count files.
+
+    Processes other than the bot's main process (ex: shard workers) pass a name, which prefixes their files
+    (ex: shard-1.2018-01-01.log), so every process rotates and prunes only its own files.
+    """
+
+    def __init__(self, directory, max_bytes=10 * 1024 * 1024, backup_count=30, name=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.prefix = "" if name is None else name + "."
+        self.file_name_pattern = re.compile(r"^{}\d{{4}}-\d{{2}}-\d{{2}}(\.\d+)?\.log$".format(re.escape(self.prefix)))
+        self.date = self.get_date()
+        self.index = 0
+        validate_or_make_directory(directory)
+        while os.path.exists(self.get_file_string(self.index + 1)):
+            self.index += 1
+        logging.FileHandler.__init__(self, self.get_file_string(self.index), delay=True)
+
+    @staticmethod
+    def get_date():
+        return "{:%Y-%m-%d}".format(datetime.datetime.now())
+
+    def get_file_string(self, index):
+        if index == 0:
+            return os.path.abspath(os.path.join(self.directory, "{}{}.log".format(self.prefix, self.date)))
+        return os.path.abspath(os.path.join(self.directory, "{}{}.{}.log".format(self.prefix, self.date, index)))
+
+    def emit(self, record):
+        if self.get_date() != self.date:
+            self.date = self.get_date()
+            self.rotate(0)
+        elif self.max_bytes > 0 and self.stream is not None and self.stream.tell() >= self.max_bytes:
+            self.rotate(self.index + 1)
+        logging.FileHandler.emit(self, record)
+
+    def rotate(self, index):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        self.index = index
+        self.baseFilename = self.get_file_string(index)
+        self.remove_old_files()
+
+    def remove_old_files(self):
+        if self.backup_count < 1:
+            return
+        log_files = sorted(
+            (os.path.join(self.directory, file_name) for file_name in os.listdir(self.directory)
+             if self.file_name_pattern.match(file_name)),
+            key=os.path.getmtime
+        )
+        for file_string in log_files[:max(len(log_files) - self.backup_count, 0)]:
+            os.remove(file_string)
+
+
+logger = logging.getLogger("crypto_trading_bot")
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+
+log_queue = queue.Queue(-1)
+log_queue_handler = logging.handlers.QueueHandler(log_queue)
+log_queue_handler.addFilter(ContextFilter())
+logger.addHandler(log_queue_handler)
+
+log_listener = None
+
+
+def configure_logger(log_params=None, name=None):
+    """
+    Used to (re)start the background log writer
+
+    :param log_params: The log settings (json, maxBytes, backupCount, level)
+    :type log_params: dict
+    :param name: The name of the process writing the logs (ex: shard-1, market-data)
+        Not required. If not passed in the logs are written to the main process's files
+    :type name: str
+    """
+    global log_listener
+    if log_params is None:
+        log_params = {}
+
+    file_handler = DatedRotatingFileHandler(log_directory, log_params.get("maxBytes", 10 * 1024 * 1024),
+                                            log_params.get("backupCount", 30), name)
+    if log_params.get("json", False):
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s: %(message)s",
+                                                    "%Y/%m/%d %I:%M:%S %p"))
+    logger.setLevel(log_params.get("level", "WARNING"))
+
+    if log_listener is not None:
+        log_listener.stop()
+    log_listener = logging.handlers.QueueListener(log_queue, file_handler)
+    log_listener.start()
+
+
+def stop_logger():
+    """
+    Used to write the queued log records and stop the background log writer
+    """
+    if log_listener is not None:
+        log_listener.stop()
+
+
+configure_logger()
+atexit.register(stop_logger)
@@ -0,0 +1,551 @@
+"""
+   Shared market data service. A single daemon fetches the Bittrex market summaries and candles and publishes
+   them to local strategy processes through a shared memory ring buffer, with notifications on a Unix socket.
+
+   Run it from the `src` directory with `python market_data_service.py`
+"""
+import time
+import select
+import socket
+import struct
+import threading
+from multiprocessing import shared_memory
+
+from logger import logger
+from circuit_breaker import get_backoff
+from scheduler import TICKER_INTERVAL_SECONDS
+from candle_store import to_timestamp, to_bittrex_time
+
+MAGIC = 0x43544244
+
+# magic, market count, candle capacity, sequence, summaries time
+HEADER = struct.Struct("<IIIQd")
+# name, sequence, bid, ask, last, base volume, summary time, candle head, candle count
+MARKET_NAME_SIZE = 16
+MARKET_HEADER = struct.Struct("<{}sQ5dII".format(MARKET_NAME_SIZE))
+# time, open, high, low, close, volume
+CANDLE = struct.Struct("<6d")
+
+MAX_MARKETS = 1024
+# The longest a reader waits for a market block a writer left half written (ex: when it died mid update)
+READ_TIMEOUT = 1
+
+DEFAULT_MARKET_DATA_PARAMS = {
+    "sharedMemoryName": "crypto-trading-bot-market-data",
+    "socketPath": "/tmp/crypto-trading-bot-market-data.sock",
+    "candleCapacity": 100,
+    "summaryInterval": 5,
+    "maxDataAge": 60
+}
+
+
+def get_market_data_params(settings):
+    """
+    Used to get the market data parameters with the defaults filled in
+
+    :param settings: The user's settings
+    :type settings: dict
+
+    :return: The market data parameters
+    :rtype: dict
+    """
+    market_data_params = dict(DEFAULT_MARKET_DATA_PARAMS)
+    market_data_params.update(settings.get("marketDataParameters", {}))
+    return market_data_params
+
+
+class MarketDataBuffer(object):
+    """
+    Used for reading and writing market summaries and candle rings in shared memory
+
+    Every market block is guarded by a sequence number that is odd while the block is being written,
+    so readers retry instead of reading torn values.
+    """
+
+    def __init__(self, name, create=False, candle_capacity=100):
+        if create:
+            try:
+                shared_memory.SharedMemory(name=name).unlink()
+            except FileNotFoundError:
+                pass
+            self.candle_capacity = candle_capacity
+            self.shared_memory = shared_memory.SharedMemory(name=name, create=True, size=self.get_size())
+            HEADER.pack_into(self.shared_memory.buf, 0, MAGIC, 0, candle_capacity, 0, 0)
+        else:
+            self.shared_memory = shared_memory.SharedMemory(name=name)
+            # Readers must not unlink the writer's memory when they exit
+            try:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(self.shared_memory._name, "shared_memory")
+            except (ImportError, AttributeError, KeyError):
+                pass
+            magic, _, self.candle_capacity, _, _ = HEADER.unpack_from(self.shared_memory.buf, 0)
+            if magic != MAGIC:
+                raise ValueError("`{}` is not a market data buffer".format(name))
+        self.buffer = self.shared_memory.buf
+        self.market_indexes = {}
+        self.rejected_markets = set()
+
+    def get_size(self):
+        return HEADER.size + MAX_MARKETS * self.get_market_size()
+
+    def get_market_size(self):
+        return MARKET_HEADER.size + self.candle_capacity * CANDLE.size
+
+    def get_market_offset(self, index):
+        return HEADER.size + index * self.get_market_size()
+
+    def get_header(self):
+        """
+        :return: The market count, buffer sequence and summaries time
+        :rtype: tuple
+        """
+        _, market_count, _, sequence, summaries_time = HEADER.unpack_from(self.buffer, 0)
+        return market_count, sequence, summaries_time
+
+    def set_header(self, market_count, summaries_time):
+        _, _, _, sequence, _ = HEADER.unpack_from(self.buffer, 0)
+        HEADER.pack_into(self.buffer, 0, MAGIC, market_count, self.candle_capacity, sequence + 1, summaries_time)
+
+    def get_market_names(self):
+        """
+        Used to get the names of all the published markets, indexed by their position in the buffer
+
+        :return: The market names
+        :rtype: list
+        """
+        market_count = self.get_header()[0]
+        if len(self.market_indexes) != market_count:
+            for index in range(market_count):
+                name = MARKET_HEADER.unpack_from(self.buffer, self.get_market_offset(index))[0]
+                self.market_indexes[name.rstrip(b"\0").decode()] = index
+        return sorted(self.market_indexes, key=self.market_indexes.get)
+
+    def get_market_index(self, market, create=False):
+        if market not in self.market_indexes:
+            self.get_market_names()
+        if market not in self.market_indexes and create:
+            if len(market.encode()) > MARKET_NAME_SIZE:
+                raise ValueError("The {} market name is longer than {} bytes".format(market, MARKET_NAME_SIZE))
+            index = len(self.market_indexes)
+            if index >= MAX_MARKETS:
+                raise ValueError("The market data buffer is limited to {} markets".format(MAX_MARKETS))
+            MARKET_HEADER.pack_into(self.buffer, self.get_market_offset(index), market.encode(), 0, 0, 0, 0, 0, 0, 0, 0)
+            self.market_indexes[market] = index
+            self.set_header(len(self.market_indexes), self.get_header()[2])
+        return self.market_indexes.get(market)
+
+    def read_market(self, index, read):
+        """
+        Used to read a market block consistently
+
+        :param index: The market's index
+        :type index: int
+        :param read: Function reading the market block given its offset and header values
+        :type read: function
+
+        :raises TimeoutError: If the block is still being written after READ_TIMEOUT seconds
+        """
+        offset = self.get_market_offset(index)
+        deadline = time.time() + READ_TIMEOUT
+        while True:
+            header = MARKET_HEADER.unpack_from(self.buffer, offset)
+            if header[1] % 2 == 1:
+                if time.time() >= deadline:
+                    raise TimeoutError("Market block {} is still being written".format(index))
+                time.sleep(0)
+                continue
+            result = read(offset, header)
+            if MARKET_HEADER.unpack_from(self.buffer, offset)[1] == header[1]:
+                return result
+
+    def write_market(self, index, write):
+        """
+        Used to write a market block, making readers wait until it is complete
+
+        :param index: The market's index
+        :type index: int
+        :param write: Function writing the market block given its offset and header values
+        :type write: function
+        """
+        offset = self.get_market_offset(index)
+        header = list(MARKET_HEADER.unpack_from(self.buffer, offset))
+        header[1] += 1
+        MARKET_HEADER.pack_into(self.buffer, offset, *header)
+        header = write(offset, header)
+        header[1] += 1
+        MARKET_HEADER.pack_into(self.buffer, offset, *header)
+
+    def write_summaries(self, summaries):
+        """
+        Used to publish the Bittrex market summaries
+
+        :param summaries: Bittrex market summary objects
+        :type summaries: list
+        """
+        for summary in summaries:
+            if len(summary["MarketName"].encode()) > MARKET_NAME_SIZE:
+                if summary["MarketName"] not in self.rejected_markets:
+                    logger.warning("Not publishing the {} market, its name is longer than {} bytes.".format(
+                        summary["MarketName"], MARKET_NAME_SIZE
+                    ))
+                    self.rejected_markets.add(summary["MarketName"])
+                continue
+            index = self.get_market_index(summary["MarketName"], True)
+
+            def write(offset, header):
+                header[2:7] = [summary["Bid"] or 0, summary["Ask"] or 0, summary["Last"] or 0,
+                               summary["BaseVolume"] or 0, to_timestamp(summary["TimeStamp"])]
+                return header
+
+            self.write_market(index, write)
+        self.set_header(len(self.market_indexes), time.time())
+
+    def read_summary(self, market):
+        """
+        Used to read a market's summary
+
+        :param market: String literal for the market (ex: BTC-LTC)
+        :type market: str
+
+        :return: Bittrex market summary object, or None if the market isn't published
+        :rtype: dict
+        """
+        index = self.get_market_index(market)
+        if index is None:
+            return None
+        header = self.read_market(index, lambda offset, market_header: market_header)
+        return {
+            "MarketName": market,
+            "Bid": header[2],
+            "Ask": header[3],
+            "Last": header[4],
+            "BaseVolume": header[5],
+            "TimeStamp": to_bittrex_time(header[6])
+        }
+
+    def write_candles(self, market, candles):
+        """
+        Used to append Bittrex candles to a market's candle ring.
+        Candles older than the latest candle are ignored and a candle with the same time replaces it.
+
+        :param market: String literal for the market (ex: BTC-LTC)
+        :type market: str
+        :param candles: Bittrex candle objects, oldest first
+        :type candles: list
+        """
+        index = self.get_market_index(market, True)
+
+        def write(offset, header):
+            head, count = header[7], header[8]
+            candles_offset = offset + MARKET_HEADER.size
+            for candle in candles:
+                candle_time = to_timestamp(candle["T"])
+                if count > 0:
+                    last_position = (head - 1) % self.candle_capacity
+                    last_time = CANDLE.unpack_from(self.buffer, candles_offset + last_position * CANDLE.size)[0]
+                    if candle_time < last_time:
+                        continue
+                    if candle_time == last_time:
+                        CANDLE.pack_into(self.buffer, candles_offset + last_position * CANDLE.size, candle_time,
+                                         candle["O"], candle["H"], candle["L"], candle["C"], candle["V"])
+                        continue
+                CANDLE.pack_into(self.buffer, candles_offset + head * CANDLE.size, candle_time,
+                                 candle["O"], candle["H"], candle["L"], candle["C"], candle["V"])
+                head = (head + 1) % self.candle_capacity
+                count = min(count + 1, self.candle_capacity)
+            header[7], header[8] = head, count
+            return header
+
+        self.write_market(index, write)
+
+    def read_candles(self, market, period):
+        """
+        Used to read a market's latest candles
+
+        :param market: String literal for the market (ex: BTC-LTC)
+        :type market: str
+        :param period: Number of candles to read
+        :type period: int
+
+        :return: Bittrex candle objects, oldest first
+        :rtype: list
+        """
+        index = self.get_market_index(market)
+        if index is None:
+            return []
+
+        def read(offset, header):
+            head, count = header[7], header[8]
+            period_count = min(period, count)
+            candles = []
+            for position in range(head - period_count, head):
+                candle = CANDLE.unpack_from(
+                    self.buffer, offset + MARKET_HEADER.size + (position % self.candle_capacity) * CANDLE.size
+                )
+                candles.append({
+                    "T": to_bittrex_time(candle[0]), "O": candle[1], "H": candle[2], "L": candle[3], "C": candle[4],
+                    "V": candle[5]
+                })
+            return candles
+
+        return self.read_market(index, read)
+
+    def close(self, unlink=False):
+        self.buffer = None
+        self.shared_memory.close()
+        if unlink:
+            self.shared_memory.unlink()
+
+
+class MarketDataPublisher(object):
+    """
+    Used for fetching Bittrex market data once and publishing it to local strategy processes
+    """
+
+    def __init__(self, secrets, settings):
+        from bittrex import Bittrex
+        from scheduler import Scheduler
+
+        self.market_data_params = get_market_data_params(settings)
+        self.ticker_interval = settings["tradeParameters"]["tickerInterval"]
+
+        self.Bittrex = Bittrex(secrets)
+        self.Scheduler = Scheduler(self.ticker_interval, settings.get("scheduleParameters"))
+        self.buffer = MarketDataBuffer(self.market_data_params["sharedMemoryName"], True,
+                                       self.market_data_params["candleCapacity"])
+
+        # Summaries and candles are published from their own threads, and only one of them writes at a time
+        self.buffer_lock = threading.Lock()
+        self.clients = []
+        self.clients_lock = threading.Lock()
+        self.server = None
+
+    def start_server(self):
+        """
+        Used to start accepting notification clients on the Unix socket
+        """
+        import os
+        if os.path.exists(self.market_data_params["socketPath"]):
+            os.remove(self.market_data_params["socketPath"])
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.market_data_params["socketPath"])
+        self.server.listen()
+
+        def accept_clients():
+            while True:
+                client, _ = self.server.accept()
+                client.setblocking(False)
+                with self.clients_lock:
+                    self.clients.append(client)
+
+        threading.Thread(target=accept_clients, daemon=True).start()
+
+    def notify(self, message):
+        """
+        Used to send a notification line to all the connected clients without blocking.
+        Clients that disconnected or stopped reading (their socket buffer is full) are dropped, they reconnect on
+        their next wait.
+
+        :param message: The notification (ex: summaries, candles BTC-LTC)
+        :type message: str
+        """
+        line = (message + "\n").encode()
+        with self.clients_lock:
+            clients = list(self.clients)
+        dropped_clients = []
+        for client in clients:
+            try:
+                # A partly sent line would be mixed with the next one, so the client is dropped
+                if client.send(line) < len(line):
+                    dropped_clients.append(client)
+            except OSError:
+                dropped_clients.append(client)
+        if len(dropped_clients) > 0:
+            with self.clients_lock:
+                for client in dropped_clients:
+                    client.close()
+                    self.clients.remove(client)
+
+    def publish_summaries(self):
+        summaries = self.Bittrex.get_market_summaries()
+        if not summaries["success"]:
+            return logger.error("Failed to fetch Bittrex market summaries for the market data service.")
+        with self.buffer_lock:
+            self.buffer.write_summaries(summaries["result"])
+            self.notify("summaries")
+
+    def publish_candles(self):
+        with self.buffer_lock:
+            markets = self.buffer.get_market_names()
+        for market in markets:
+            if not self.Scheduler.is_due("candles", market):
+                continue
+            candles = self.Bittrex.get_historical_data(market, self.buffer.candle_capacity, self.ticker_interval)
+            if len(candles) > 0:
+                with self.buffer_lock:
+                    self.buffer.write_candles(market, candles)
+                    self.notify("candles {}".format(market))
+            self.Scheduler.mark_done("candles", market)
+
+    def run_cycles(self, name, publish, interval):
+        """
+        Used to run a publish cycle every interval seconds until the process is stopped.
+        A cycle that fails (ex: Bittrex is unreachable) is logged and retried after a backoff that doubles with every
+        consecutive failure, instead of stopping the service.
+
+        :param name: The name of the published data (ex: summaries, candles)
+        :type name: str
+        :param publish: The function publishing the data
+        :type publish: function
+        :param interval: The amount of seconds between the start of consecutive cycles
+        :type interval: float
+        """
+        failure_count = 0
+        while True:
+            start_time = time.time()
+            try:
+                publish()
+            except Exception:
+                failure_count += 1
+                backoff = get_backoff(failure_count, 1, 60)
+                logger.exception("The market data {} cycle failed, backing off for {} seconds".format(name, backoff))
+                time.sleep(backoff)
+                continue
+            failure_count = 0
+            time.sleep(max(interval - (time.time() - start_time), 0))
+
+    def run(self):
+        """
+        Used to publish market data until the process is stopped.
+        Candles are fetched on their own thread, so the candle sweep at every candle boundary doesn't hold up the
+        summaries.
+        """
+        self.start_server()
+        threading.Thread(target=self.run_cycles, args=("candles", self.publish_candles, 1), daemon=True).start()
+        try:
+            self.run_cycles("summaries", self.publish_summaries, self.market_data_params["summaryInterval"])
+        finally:
+            self.server.close()
+            self.buffer.close(True)
+
+
+class MarketDataClient(object):
+    """
+    Used for reading the published market data in the same response format as the Bittrex client.
+    Requests the service doesn't publish fall back to the Bittrex client, and so does everything while the published
+    data is older than maxDataAge (ex: the service stopped), until the service publishes again.
+    """
+
+    def __init__(self, settings, bittrex):
+        self.market_data_params = get_market_data_params(settings)
+        self.ticker_interval = settings["tradeParameters"]["tickerInterval"]
+        self.Bittrex = bittrex
+        self.buffer = MarketDataBuffer(self.market_data_params["sharedMemoryName"])
+        self.last_attach_time = time.time()
+        self.socket = None
+
+    def is_fresh(self):
+        """
+        Used to check whether the service is still publishing. Once the data is stale the buffer is reopened every
+        summaryInterval, since a restarted service publishes to a new buffer.
+
+        :return: Whether the published summaries are newer than maxDataAge
+        :rtype: bool
+        """
+        if time.time() - self.buffer.get_header()[2] <= self.market_data_params["maxDataAge"]:
+            return True
+        if time.time() - self.last_attach_time < self.market_data_params["summaryInterval"]:
+            return False
+        self.last_attach_time = time.time()
+        try:
+            buffer = MarketDataBuffer(self.market_data_params["sharedMemoryName"])
+        except (FileNotFoundError, ValueError):
+            return False
+        self.buffer.close()
+        self.buffer = buffer
+        return time.time() - self.buffer.get_header()[2] <= self.market_data_params["maxDataAge"]
+
+    def get_markets(self):
+        if not self.is_fresh():
+            return self.Bittrex.get_markets()
+        return {
+            "success": True,
+            "message": "",
+            "result": [{"MarketName": market} for market in self.buffer.get_market_names()]
+        }
+
+    def get_market_summaries(self):
+        if not self.is_fresh():
+            return self.Bittrex.get_market_summaries()
+        try:
+            summaries = [self.buffer.read_summary(market) for market in self.buffer.get_market_names()]
+        except TimeoutError as exception:
+            logger.warning(exception)
+            return self.Bittrex.get_market_summaries()
+        return {"success": True, "message": "", "result": summaries}
+
+    def get_market_summary(self, market):
+        if not self.is_fresh():
+            return self.Bittrex.get_market_summary(market)
+        try:
+            summary = self.buffer.read_summary(market)
+        except TimeoutError as exception:
+            logger.warning(exception)
+            summary = None
+        if summary is None:
+            return self.Bittrex.get_market_summary(market)
+        return {"success": True, "message": "", "result": [summary]}
+
+    def get_historical_data(self, market, period, unit):
+        if unit != self.ticker_interval or period > self.buffer.candle_capacity or not self.is_fresh():
+            return self.Bittrex.get_historical_data(market, period, unit)
+        try:
+            candles = self.buffer.read_candles(market, period)
+        except TimeoutError as exception:
+            logger.warning(exception)
+            candles = []
+        # The service fetches every candle once it closes, so a latest candle more than two candles old is stale
+        stale_time = time.time() - 2 * TICKER_INTERVAL_SECONDS[unit] - self.market_data_params["maxDataAge"]
+        if len(candles) < 1 or to_timestamp(candles[-1]["T"]) < stale_time:
+            return self.Bittrex.get_historical_data(market, period, unit)
+        return candles
+
+    def wait_for_update(self, timeout):
+        """
+        Used to wait until the service publishes new data
+
+        :param timeout: The maximum amount of seconds to wait
+        :type timeout: float
+
+        :return: The notifications received (ex: summaries, candles BTC-LTC)
+        :rtype: list
+        """
+        if self.socket is None:
+            try:
+                self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.socket.connect(self.market_data_params["socketPath"])
+            except OSError as exception:
+                logger.exception(exception)
+                self.socket = None
+                time.sleep(timeout)
+                return []
+
+        readable, _, _ = select.select([self.socket], [], [], timeout)
+        if not readable:
+            return []
+        data = self.socket.recv(65536)
+        if not data:
+            self.socket.close()
+            self.socket = None
+            return []
+        return data.decode().splitlines()
+
+
+if __name__ == "__main__":
+    from app import get_secrets, get_settings
+    from logger import configure_logger
+
+    service_settings = get_settings()
+    configure_logger(service_settings.get("logParameters", {}), "market-data")
+    MarketDataPublisher(get_secrets(), service_settings).run()
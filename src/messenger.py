@@ -1,21 +1,41 @@
-import smtplib
 import time
-from slackclient import SlackClient
-from termcolor import cprint
 from math import floor, ceil
 
+from metrics import metrics
+
 try:
     import winsound
 except ImportError:
     winsound = None
 
 
+def cprint(text, color=None, attrs=None, quiet=False):
+    """
+    Used to print coloured text. termcolor is imported on the first print instead of at start up
+
+    :param text: The text to print
+    :type text: str
+    :param color: The text colour (ex: red)
+    :type color: str
+    :param attrs: The text attributes (ex: bold)
+    :type attrs: list
+    :param quiet: Whether printing is turned off
+    :type quiet: bool
+    """
+    if quiet:
+        return
+    from termcolor import cprint as termcolor_cprint
+    termcolor_cprint(text, color, attrs=attrs)
+
+
 class Messenger(object):
     """
     Used for handling messaging functionality
     """
 
-    def __init__(self, secrets, settings):
+    def __init__(self, secrets, settings, quiet=False):
+        self.quiet = quiet
+
         self.gmail = False
         if "gmail" in secrets:
             self.gmail = True
@@ -30,7 +50,8 @@ class Messenger(object):
         if "slack" in secrets:
             self.slack = True
             self.slack_channel = secrets["slack"]["channel"]
-            self.slack_client = SlackClient(secrets["slack"]["token"])
+            self.slack_token = secrets["slack"]["token"]
+            self.slack_client = None
 
         self.sound = False
         if "sound" in settings:
@@ -38,12 +59,19 @@ class Messenger(object):
 
         self.header_str = "\nTracking {} Bittrex Markets\n"
 
+        self.screening_str = ("Buy screening: {} markets\t->\t\t{} passed volume and price\t->\t\t{} with RSI"
+                              "\t->\t\t{} buy signals\t\t({} deferred)")
+        self.exit_latency_str = ("Exit checks: {} checks\t\tMean Interval: {:.1f}s\t\tMax Interval: {:.1f}s"
+                                 "\t\tMean Sell Cycle: {:.2f}s")
+
+        self.slippage_str = "Skip {} on {:<10}\t->\t\tSlippage: {}\t\tMax Slippage: {}%"
+
         self.bittrex_url = "https://bittrex.com/Market/Index?MarketName={}"
 
         self.console_str = {
             "buy": {
                 "pause": "Pause buy tracking on {} with a high RSI of {} and a 24 hour volume of {} {} for {} minutes.",
-                "resume": "Resuming tracking on all {} markets.",
+                "resume": "Resume buy tracking on {}.",
                 "message": "Buy on {:<10}\t->\t\tRSI: {:>2}\t\t24 Hour Volume: {:>5} {}\t\tBuy Price: {:.8f}\t\tURL: {}"
             },
             "sell": {
@@ -91,7 +119,10 @@ class Messenger(object):
 
         self.error_str = {
             "market": "Failed to fetch Bittrex markets.",
+            "marketSummaries": "Failed to fetch Bittrex market summaries.",
             "coinMarket": "Failed to fetch Bittrex market summary for the {} market.",
+            "orderBook": "Failed to fetch Bittrex order book for the {} market.",
+            "coinPair": "Failed to analyse the {} market. Skipping it for {} seconds.",
             "sell": "Failed to sell on {} market. Bittrex error message: {}",
             "buy": "Failed to buy on {} market. Bittrex error message: {}",
             "order": "Failed to complete order with UUID {} within {} seconds on {} market. URL: {}",
@@ -129,11 +160,17 @@ class Messenger(object):
         header += "Subject: %s\n\n" % subject
         message = header + message
 
-        server = smtplib.SMTP(self.smtp_server_address)
-        server.starttls()
-        server.login(self.login, self.password)
-        errors = server.sendmail(self.from_address, self.to_address_list, message)
-        server.quit()
+        import smtplib
+
+        metrics.increment("notifications_in_flight", channel="email")
+        try:
+            server = smtplib.SMTP(self.smtp_server_address)
+            server.starttls()
+            server.login(self.login, self.password)
+            errors = server.sendmail(self.from_address, self.to_address_list, message)
+            server.quit()
+        finally:
+            metrics.increment("notifications_in_flight", -1, channel="email")
 
         return errors
 
@@ -146,12 +183,19 @@ class Messenger(object):
         """
         if not self.slack:
             return
-
-        self.slack_client.api_call(
-            "chat.postMessage",
-            channel=self.slack_channel,
-            text=message
-        )
+        if self.slack_client is None:
+            from slackclient import SlackClient
+            self.slack_client = SlackClient(self.slack_token)
+
+        metrics.increment("notifications_in_flight", channel="slack")
+        try:
+            self.slack_client.api_call(
+                "chat.postMessage",
+                channel=self.slack_channel,
+                text=message
+            )
+        finally:
+            metrics.increment("notifications_in_flight", -1, channel="slack")
 
     def send_buy_gmail(self, order, stats, recipient_name=None):
         """
@@ -165,6 +209,8 @@ class Messenger(object):
         :param recipient_name: Name of the email"s recipient (ex: John)
         :type recipient_name: str
         """
+        if not self.gmail:
+            return
         if recipient_name is None:
             recipient_name = self.recipient_name
         main_market, coin = order["Exchange"].split("-")
@@ -187,6 +233,8 @@ class Messenger(object):
         :param recipient_name: Name of the email's recipient (ex: John)
         :type recipient_name: str
         """
+        if not self.gmail:
+            return
         if recipient_name is None:
             recipient_name = self.recipient_name
 
@@ -206,7 +254,7 @@ class Messenger(object):
         """
         Used to send a user balance Slack message
 
-        :param balance_items: A list containing all the user's correctly formatted coin balance objects
+        :param balance_items: A list containing all the user's coin balances
         :type balance_items: list
         :param previous_total_balance: The previous total balance's BTC value
         :type previous_total_balance: float
@@ -220,16 +268,16 @@ class Messenger(object):
 
         for balance in balance_items:
             sub_header = self.slack_str["balance"]["subHeader"]
-            if not balance["IsTracked"] and balance["Currency"] != "BTC":
+            if not balance.is_tracked and balance.currency != "BTC":
                 sub_header = self.slack_str["balance"]["subHeaderUntracked"]
-            slack_message += sub_header.format(balance["Currency"])
+            slack_message += sub_header.format(balance.currency)
 
-            if balance["Currency"] != "BTC":
-                slack_message += self.slack_str["balance"]["balance"].format(balance["Balance"], balance["Currency"])
+            if balance.currency != "BTC":
+                slack_message += self.slack_str["balance"]["balance"].format(balance.balance, balance.currency)
 
-            slack_message += self.slack_str["balance"]["btcValue"].format(balance["BtcValue"])
+            slack_message += self.slack_str["balance"]["btcValue"].format(balance.btc_value)
 
-            total_balance += balance["BtcValue"]
+            total_balance += balance.btc_value
 
         total_balance = round(total_balance, 8)
         percentage_change_str = ""
@@ -291,7 +339,7 @@ class Messenger(object):
         :param num_of_coin_pairs: Number of available Bittrex market pairs
         :type num_of_coin_pairs: int
         """
-        cprint(self.header_str.format(num_of_coin_pairs), attrs=["bold", "underline"])
+        cprint(self.header_str.format(num_of_coin_pairs), attrs=["bold", "underline"], quiet=self.quiet)
 
     def print_buy(self, coin_pair, current_buy_price, rsi, day_volume):
         """
@@ -310,7 +358,7 @@ class Messenger(object):
         message = self.console_str["buy"]["message"].format(
             coin_pair, ceil(rsi), floor(day_volume), main_market, current_buy_price, self.get_bittrex_url(coin_pair)
         )
-        cprint(message, "blue", attrs=["bold"])
+        cprint(message, "blue", attrs=["bold"], quiet=self.quiet)
 
     def print_sell(self, coin_pair, current_sell_price, rsi, profit_margin):
         """
@@ -331,7 +379,32 @@ class Messenger(object):
         color = "green"
         if profit_margin <= 0:
             color = "red"
-        cprint(message, color, attrs=["bold"])
+        cprint(message, color, attrs=["bold"], quiet=self.quiet)
+
+    def print_buy_screening(self, stage_counts):
+        """
+        Used to print the amount of coin pairs that passed each buy screening stage
+
+        :param stage_counts: The amount of screened coin pairs, the amount that passed each stage
+            and the amount deferred to the next scan
+        :type stage_counts: list
+        """
+        cprint(self.screening_str.format(*stage_counts), "cyan", quiet=self.quiet)
+
+    def print_exit_check_latency(self, exit_check_latency, sell_cycle_duration):
+        """
+        Used to print the open trade exit check latency stats
+
+        :param exit_check_latency: Summary of the intervals between consecutive exit checks on an open trade
+        :type exit_check_latency: dict
+        :param sell_cycle_duration: Summary of the sell cycle durations
+        :type sell_cycle_duration: dict
+        """
+        if exit_check_latency["count"] < 1:
+            return
+        cprint(self.exit_latency_str.format(exit_check_latency["count"], exit_check_latency["mean"],
+                                            exit_check_latency["max"], sell_cycle_duration["mean"]),
+               "cyan", quiet=self.quiet)
 
     def print_pause(self, coin_pair, data, pause_time, pause_type):
         """
@@ -353,12 +426,12 @@ class Messenger(object):
             print_str = self.console_str[pause_type]["pause"].format(
                 coin_pair, data[0], data[1], main_market, round(pause_time)
             )
-            cprint(print_str, "yellow")
+            cprint(print_str, "yellow", quiet=self.quiet)
         elif pause_type == "sell":
             data[0] = round(data[0], 2)
             data[1] = floor(data[1])
             print_str = self.console_str[pause_type]["pause"].format(coin_pair, data[0], data[1], round(pause_time))
-            cprint(print_str, "yellow")
+            cprint(print_str, "yellow", quiet=self.quiet)
 
     def print_no_buy(self, coin_pair, rsi, day_volume, current_buy_price):
         """
@@ -377,7 +450,7 @@ class Messenger(object):
         print_str = "No " + self.console_str["buy"]["message"].format(
             coin_pair, ceil(rsi), floor(day_volume), main_market, current_buy_price, self.get_bittrex_url(coin_pair)
         )
-        cprint(print_str, "grey")
+        cprint(print_str, "grey", quiet=self.quiet)
 
     def print_no_sell(self, coin_pair, rsi, profit_margin, current_sell_price):
         """
@@ -400,29 +473,45 @@ class Messenger(object):
             if profit_margin <= 0:
                 color = "red"
             self.console_str["sell"]["previousMessage"] = print_str
-            cprint(print_str, color)
+            cprint(print_str, color, quiet=self.quiet)
+
+    def print_slippage(self, coin_pair, trade_type, slippage, max_slippage):
+        """
+        Used to print a skipped trade's expected slippage to the console
+
+        :param coin_pair: String literal for the market (ex: BTC-LTC)
+        :type coin_pair: str
+        :param trade_type: Type of trade (one of: 'buy', 'sell')
+        :type trade_type: str
+        :param slippage: The expected slippage percentage, None if the order book isn't deep enough
+        :type slippage: float
+        :param max_slippage: The maximum allowed slippage percentage
+        :type max_slippage: float
+        """
+        slippage_str = "{}%".format(round(slippage, 2)) if slippage is not None else "order book too shallow"
+        cprint(self.slippage_str.format(trade_type, coin_pair, slippage_str, max_slippage), "yellow", quiet=self.quiet)
 
     def print_resume_pause(self, data, pause_type):
         """
         Used to print coin pause resume info to the console
 
-        :param data: Relevant resume value
-        :type data: float
+        :param data: The resumed coin pair (ex: BTC-LTC)
+        :type data: str
         :param pause_type: Type of pause (one of: 'buy', 'sell')
         :type pause_type: str
         """
         print_str = self.console_str[pause_type]["resume"].format(data)
-        cprint(print_str, "yellow", attrs=["bold"])
+        cprint(print_str, "yellow", attrs=["bold"], quiet=self.quiet)
 
     def print_error(self, error_type, data=None, will_exit=False):
         """
         Prints the error type message to the console
 
         :param error_type: The error type
-            (one of: 'market', 'coinMarket', 'sell', 'buy', 'order', 'connection', 'SSL', 'JSONDecode', 'keyError',
-            'valueError', 'typeError', 'unknown')
+            (one of: 'market', 'marketSummaries', 'coinMarket', 'orderBook', 'coinPair', 'sell', 'buy', 'order',
+            'connection', 'SSL', 'JSONDecode', 'keyError', 'valueError', 'typeError', 'unknown')
         :type error_type: str
-        :param data: Relevant error information
+        :param data: Relevant error information (the retry delay in seconds for the main loop errors)
         :type data: list
         :param will_exit: Whether the program is exiting or not
         :type will_exit: bool
@@ -434,12 +523,12 @@ class Messenger(object):
         if will_exit:
             suffix = " Exiting program."
         elif error_type in ['connection', 'SSL', 'JSONDecode', 'keyError', 'valueError', 'typeError', 'unknown']:
-            suffix = " Waiting 10 seconds and then retrying."
+            suffix = " Waiting {} seconds and then retrying.".format(data[0] if data else 10)
 
         error_str = self.error_str[error_type]
-        if error_type == "coinMarket":
+        if error_type in ["coinMarket", "orderBook"]:
             error_str = error_str.format(data[0])
-        elif error_type in ["sell", "buy"]:
+        elif error_type in ["sell", "buy", "coinPair"]:
             error_str = error_str.format(data[0], data[1])
         elif error_type == "order":
             error_str = error_str.format(data[0], data[1], data[2], self.get_bittrex_url(data[2]))
@@ -0,0 +1,246 @@
+import time
+import json
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+METRIC_DEFINITIONS = OrderedDict([
+    ("trader_phase_seconds", ("histogram", "Duration of each trader phase")),
+    ("exit_check_interval_seconds", ("histogram", "Interval between consecutive exit checks on an open trade")),
+    ("bittrex_request_seconds", ("histogram", "Latency of Bittrex requests by endpoint")),
+    ("bittrex_request_errors_total", ("counter", "Failed or unsuccessful Bittrex requests by endpoint")),
+    ("database_write_seconds", ("histogram", "Latency of database file writes")),
+    ("database_write_bytes_total", ("counter", "Bytes written to database files")),
+    ("notifications_in_flight", ("gauge", "Slack and email notifications currently being sent")),
+    ("circuit_breaker_trips_total", ("counter", "Coin pairs or endpoints backed off after repeated failures")),
+    ("paper_orders_total", ("counter", "Simulated orders placed in paper trading mode by type")),
+    ("paper_order_seconds", ("histogram", "Time from placing to closing simulated orders by type"))
+])
+
+
+class LatencyStats(object):
+    """
+    Used for accumulating latency samples in seconds
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.last = 0
+
+    def record(self, seconds):
+        """
+        Used to add a latency sample
+
+        :param seconds: The sample's latency in seconds
+        :type seconds: float
+        """
+        with self.lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            self.last = seconds
+
+    def get_mean(self):
+        """
+        Used to get the mean latency of all the samples
+
+        :return: Mean latency in seconds
+        :rtype: float
+        """
+        if self.count < 1:
+            return 0
+        return self.total / self.count
+
+    def reset(self):
+        """
+        Used to remove all the samples and return a summary of them
+
+        :return: The sample count, mean, max and last latency
+        :rtype: dict
+        """
+        with self.lock:
+            summary = {"count": self.count, "mean": self.get_mean(), "max": self.max, "last": self.last}
+            self.count = 0
+            self.total = 0
+            self.max = 0
+            self.last = 0
+        return summary
+
+
+class MetricsRegistry(object):
+    """
+    Used for collecting counters, gauges and histograms and exporting them as Prometheus text or JSON
+    """
+
+    def __init__(self, definitions=METRIC_DEFINITIONS, buckets=DEFAULT_BUCKETS):
+        self.lock = threading.Lock()
+        self.buckets = buckets
+        self.metrics = OrderedDict()
+        for name, (metric_type, description) in definitions.items():
+            self.metrics[name] = {"type": metric_type, "help": description, "samples": OrderedDict()}
+        self.server = None
+
+    def increment(self, name, value=1, **labels):
+        """
+        Used to increment a counter or gauge
+
+        :param name: The metric's name (ex: bittrex_request_errors_total)
+        :type name: str
+        :param value: The amount to increment by
+        :type value: float
+        """
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            samples = self.metrics[name]["samples"]
+            samples[key] = samples.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """
+        Used to set a gauge
+
+        :param name: The metric's name (ex: notifications_in_flight)
+        :type name: str
+        :param value: The gauge's value
+        :type value: float
+        """
+        with self.lock:
+            self.metrics[name]["samples"][tuple(sorted(labels.items()))] = value
+
+    def observe(self, name, value, **labels):
+        """
+        Used to add a sample to a histogram
+
+        :param name: The metric's name (ex: bittrex_request_seconds)
+        :type name: str
+        :param value: The sample's value
+        :type value: float
+        """
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            samples = self.metrics[name]["samples"]
+            if key not in samples:
+                samples[key] = {"buckets": [0] * len(self.buckets), "sum": 0, "count": 0}
+            histogram = samples[key]
+            for index, bucket in enumerate(self.buckets):
+                if value <= bucket:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Used to observe the duration of a block of code on a histogram
+        """
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.observe(name, time.time() - start_time, **labels)
+
+    def to_prometheus(self):
+        """
+        Used to export all the metrics in the Prometheus text format
+
+        :return: Prometheus text
+        :rtype: str
+        """
+        lines = []
+        with self.lock:
+            for name, metric in self.metrics.items():
+                lines.append("# HELP {} {}".format(name, metric["help"]))
+                lines.append("# TYPE {} {}".format(name, metric["type"]))
+                for key, sample in metric["samples"].items():
+                    if metric["type"] != "histogram":
+                        lines.append("{}{} {}".format(name, self.format_labels(key), sample))
+                        continue
+                    for index, bucket in enumerate(self.buckets):
+                        lines.append("{}_bucket{} {}".format(
+                            name, self.format_labels(key + (("le", bucket),)), sample["buckets"][index]
+                        ))
+                    lines.append("{}_bucket{} {}".format(name, self.format_labels(key + (("le", "+Inf"),)),
+                                                         sample["count"]))
+                    lines.append("{}_sum{} {}".format(name, self.format_labels(key), sample["sum"]))
+                    lines.append("{}_count{} {}".format(name, self.format_labels(key), sample["count"]))
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def format_labels(key):
+        if len(key) < 1:
+            return ""
+        return "{" + ",".join('{}="{}"'.format(label, value) for label, value in key) + "}"
+
+    def to_json(self):
+        """
+        Used to export all the metrics as a JSON serialisable object
+
+        :return: The metrics keyed by name
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                name: {
+                    "type": metric["type"],
+                    "buckets": list(self.buckets) if metric["type"] == "histogram" else None,
+                    "samples": [
+                        {"labels": dict(key), "value": sample} for key, sample in metric["samples"].items()
+                    ]
+                }
+                for name, metric in self.metrics.items()
+            }
+
+    def write_json(self, file_string):
+        """
+        Used to dump all the metrics to a JSON file
+
+        :param file_string: The relative file directory string (ex: ../logs/metrics.json)
+        :type file_string: str
+        """
+        from directory_utilities import validate_or_make_directory
+
+        validate_or_make_directory(file_string)
+        content = self.to_json()
+        with open(file_string, "w") as file:
+            json.dump(content, file, indent=4)
+
+    def start_server(self, port, host="127.0.0.1"):
+        """
+        Used to serve the metrics in the Prometheus text format on http://host:port/metrics
+
+        :param port: The port to listen on
+        :type port: int
+        :param host: The host to listen on, only local by default
+        :type host: str
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,170 @@
+import bisect
+
+
+class OrderBookSide(object):
+    """
+    Used for keeping one side of an order book as sorted price levels.
+    Rates are kept ascending and found by bisection, with the quantity of every level in a dict.
+
+    Finding a level is O(log n), but adding or removing one shifts the list, so level updates are O(n). With order
+    books of at most a few hundred levels, that shift is a single short memory move and costs less than a balanced
+    tree or a heap with lazy deletes would, and the list can be walked in price order without sorting.
+    """
+
+    def __init__(self, descending):
+        self.descending = descending
+        self.rates = []
+        self.quantities = {}
+
+    def update(self, rate, quantity):
+        """
+        Used to set the quantity of a price level, a zero quantity removes the level.
+        Changing a level's quantity is O(1), adding or removing a level is O(n) (see the class docstring).
+
+        :param rate: The level's price
+        :type rate: float
+        :param quantity: The level's total quantity
+        :type quantity: float
+        """
+        if quantity <= 0:
+            if self.quantities.pop(rate, None) is not None:
+                del self.rates[bisect.bisect_left(self.rates, rate)]
+            return
+        if rate not in self.quantities:
+            bisect.insort(self.rates, rate)
+        self.quantities[rate] = quantity
+
+    def get_levels(self):
+        """
+        Used to iterate the price levels from the best price outwards
+
+        :return: The (rate, quantity) levels
+        :rtype: generator
+        """
+        rates = reversed(self.rates) if self.descending else self.rates
+        return ((rate, self.quantities[rate]) for rate in rates)
+
+    def get_best_rate(self):
+        if len(self.rates) < 1:
+            return None
+        return self.rates[-1] if self.descending else self.rates[0]
+
+
+class OrderBook(object):
+    """
+    Used for keeping a local replica of a market's order book up to date from snapshots and deltas
+    """
+
+    def __init__(self, coin_pair):
+        self.coin_pair = coin_pair
+        self.sides = {
+            "buy": OrderBookSide(descending=True),
+            "sell": OrderBookSide(descending=False)
+        }
+
+    def apply_snapshot(self, order_book):
+        """
+        Used to bring the replica up to date with a Bittrex getorderbook result.
+        Only the levels that changed since the previous snapshot are updated.
+
+        :param order_book: The order book with `buy` and/or `sell` lists of Quantity and Rate levels
+        :type order_book: dict
+
+        :return: The applied deltas as (side, rate, quantity) tuples
+        :rtype: list
+        """
+        deltas = self.get_deltas(order_book)
+        for delta in deltas:
+            self.apply_delta(*delta)
+        return deltas
+
+    def get_deltas(self, order_book):
+        """
+        Used to get the level changes between the replica and an order book snapshot
+
+        :param order_book: The order book with `buy` and/or `sell` lists of Quantity and Rate levels
+        :type order_book: dict
+
+        :return: The deltas as (side, rate, quantity) tuples, removed levels have a zero quantity
+        :rtype: list
+        """
+        deltas = []
+        for side_name in ("buy", "sell"):
+            if order_book.get(side_name) is None:
+                continue
+            side = self.sides[side_name]
+            levels = {level["Rate"]: level["Quantity"] for level in order_book[side_name]}
+            for rate, quantity in levels.items():
+                if side.quantities.get(rate) != quantity:
+                    deltas.append((side_name, rate, quantity))
+            for rate in side.rates:
+                if rate not in levels:
+                    deltas.append((side_name, rate, 0))
+        return deltas
+
+    def apply_delta(self, side, rate, quantity):
+        """
+        Used to set the quantity of a single price level
+
+        :param side: The order book side (one of: 'buy', 'sell')
+        :type side: str
+        :param rate: The level's price
+        :type rate: float
+        :param quantity: The level's total quantity, zero removes the level
+        :type quantity: float
+        """
+        self.sides[side].update(rate, quantity)
+
+    def get_best_price(self, side):
+        """
+        Used to get the best price on a side of the book (the highest bid or the lowest ask)
+
+        :param side: The order book side (one of: 'buy', 'sell')
+        :type side: str
+
+        :return: The best price, or None if the side is empty
+        :rtype: float
+        """
+        return self.sides[side].get_best_rate()
+
+    def get_average_fill_price(self, side, btc_amount):
+        """
+        Used to get the average price an order of btc_amount would fill at when it takes liquidity from a side.
+        Buys take from the `sell` side and sells take from the `buy` side.
+
+        :param side: The order book side the order fills against (one of: 'buy', 'sell')
+        :type side: str
+        :param btc_amount: The BTC value of the order
+        :type btc_amount: float
+
+        :return: The average fill price, or None if the replica isn't deep enough
+        :rtype: float
+        """
+        remaining_btc = btc_amount
+        filled_quantity = 0
+        for rate, quantity in self.sides[side].get_levels():
+            level_btc = rate * quantity
+            if level_btc >= remaining_btc:
+                filled_quantity += remaining_btc / rate
+                return btc_amount / filled_quantity
+            remaining_btc -= level_btc
+            filled_quantity += quantity
+        return None
+
+    def get_slippage(self, side, btc_amount):
+        """
+        Used to get the percentage an order of btc_amount would fill away from the best price
+
+        :param side: The order book side the order fills against (one of: 'buy', 'sell')
+        :type side: str
+        :param btc_amount: The BTC value of the order
+        :type btc_amount: float
+
+        :return: The slippage percentage, or None if the replica isn't deep enough
+        :rtype: float
+        """
+        best_price = self.get_best_price(side)
+        average_price = self.get_average_fill_price(side, btc_amount)
+        if best_price is None or average_price is None:
+            return None
+        return abs(average_price - best_price) / best_price * 100
@@ -0,0 +1,190 @@
+import uuid
+import threading
+
+from candle_store import to_bittrex_time
+from clock import wall_clock
+from metrics import metrics
+from trade_checks import bittrex_trade_commission
+
+# Bittrex rejects orders worth less than this amount of BTC
+MIN_TRADE_BTC = 0.0005
+
+
+def get_response(result, message=""):
+    """
+    Used to wrap a result in the Bittrex response shape, failing if an error message is given
+    """
+    return {"success": message == "", "message": message, "result": result}
+
+
+class PaperExchange(object):
+    """
+    Used as a simulated stand-in for the Bittrex order endpoints (buy_limit, sell_limit, get_order and cancel).
+
+    Orders can only fill once the configured latency has passed after they were placed. Every time an open order is
+    checked, it fills against the current order book levels at or better than its limit, taking at most depthShare
+    of every level's quantity, so large orders fill partially over several checks. The quantity taken from every
+    level is remembered until the level's quantity changes in the order book, so polling an order again (or placing
+    several orders) doesn't take the same liquidity twice. Order objects have the Bittrex getorder shape, so filled
+    orders are stored in the normal database format.
+    """
+
+    def __init__(self, get_order_book, paper_params=None, clock=wall_clock):
+        if paper_params is None:
+            paper_params = {}
+
+        self.get_order_book = get_order_book
+        self.latency = paper_params.get("latency", 1)
+        self.depth_share = paper_params.get("depthShare", 1)
+        self.depth = paper_params.get("depth", 50)
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.orders = {}
+        self.placed_times = {}
+        # The (level quantity, consumed quantity) of the levels filled against, keyed by (market, side) and rate
+        self.consumed = {}
+
+    def place_order(self, order_type, market, quantity, rate):
+        if quantity * rate < MIN_TRADE_BTC:
+            return get_response(None, "MIN_TRADE_REQUIREMENT_NOT_MET")
+        order_uuid = str(uuid.uuid4())
+        now = self.clock.time()
+        order = {
+            "OrderUuid": order_uuid,
+            "Exchange": market,
+            "Type": order_type,
+            "Quantity": quantity,
+            "QuantityRemaining": quantity,
+            "Limit": rate,
+            "CommissionPaid": 0,
+            "Price": 0,
+            "PricePerUnit": None,
+            "Opened": to_bittrex_time(now),
+            "Closed": None,
+            "IsOpen": True,
+            "CancelInitiated": False,
+            "ImmediateOrCancel": False,
+            "IsConditional": False
+        }
+        with self.lock:
+            self.orders[order_uuid] = order
+            self.placed_times[order_uuid] = now
+        metrics.increment("paper_orders_total", type=order_type)
+        return get_response({"uuid": order_uuid})
+
+    def buy_limit(self, market, quantity, rate):
+        """
+        Used to place a simulated buy order
+
+        :param market: String literal for the market (ex: BTC-LTC)
+        :type market: str
+        :param quantity: The quantity to purchase
+        :type quantity: float
+        :param rate: The highest rate the order may fill at
+        :type rate: float
+
+        :return: The order's UUID in the Bittrex response shape
+        :rtype: dict
+        """
+        return self.place_order("LIMIT_BUY", market, quantity, rate)
+
+    def sell_limit(self, market, quantity, rate):
+        """
+        Used to place a simulated sell order
+
+        :param market: String literal for the market (ex: BTC-LTC)
+        :type market: str
+        :param quantity: The quantity to sell
+        :type quantity: float
+        :param rate: The lowest rate the order may fill at
+        :type rate: float
+
+        :return: The order's UUID in the Bittrex response shape
+        :rtype: dict
+        """
+        return self.place_order("LIMIT_SELL", market, quantity, rate)
+
+    def get_order(self, order_uuid):
+        """
+        Used to fill a simulated order as far as the order book allows and get its details
+
+        :param order_uuid: The order's UUID
+        :type order_uuid: str
+
+        :return: The order in the Bittrex getorder response shape
+        :rtype: dict
+        """
+        with self.lock:
+            if order_uuid not in self.orders:
+                return get_response(None, "INVALID_ORDER")
+            self.fill(self.orders[order_uuid])
+            return get_response(dict(self.orders[order_uuid]))
+
+    def cancel(self, order_uuid):
+        """
+        Used to cancel a simulated order, keeping what it has filled so far
+
+        :param order_uuid: The order's UUID
+        :type order_uuid: str
+
+        :return: The Bittrex cancel response shape
+        :rtype: dict
+        """
+        with self.lock:
+            order = self.orders.get(order_uuid)
+            if order is None or not order["IsOpen"]:
+                return get_response(None, "ORDER_NOT_OPEN")
+            order["CancelInitiated"] = True
+            self.close(order)
+        return get_response(None)
+
+    def fill(self, order):
+        """
+        Used to fill an open order against the levels of the order book at or better than its limit
+        """
+        if not order["IsOpen"] or self.clock.time() < self.placed_times[order["OrderUuid"]] + self.latency:
+            return
+        order_book = self.get_order_book(order["Exchange"], self.depth)
+        if order_book is None:
+            return
+
+        is_buy = order["Type"] == "LIMIT_BUY"
+        # Buys take from the `sell` side and sells take from the `buy` side
+        side_key = (order["Exchange"], "sell" if is_buy else "buy")
+        side = order_book.sides[side_key[1]]
+        # Levels whose quantity changed have been refreshed, so what was taken from them before is forgotten
+        consumed = {
+            rate: level for rate, level in self.consumed.get(side_key, {}).items()
+            if side.quantities.get(rate) == level[0]
+        }
+        self.consumed[side_key] = consumed
+        filled_quantity = 0
+        filled_btc = 0
+        for rate, quantity in side.get_levels():
+            if (is_buy and rate > order["Limit"]) or (not is_buy and rate < order["Limit"]):
+                break
+            consumed_quantity = consumed.get(rate, (quantity, 0))[1]
+            level_quantity = min(quantity * self.depth_share - consumed_quantity,
+                                 order["QuantityRemaining"] - filled_quantity)
+            if level_quantity <= 0:
+                continue
+            consumed[rate] = (quantity, consumed_quantity + level_quantity)
+            filled_quantity += level_quantity
+            filled_btc += level_quantity * rate
+            if filled_quantity >= order["QuantityRemaining"]:
+                break
+        if filled_quantity <= 0:
+            return
+
+        order["QuantityRemaining"] = max(round(order["QuantityRemaining"] - filled_quantity, 8), 0)
+        order["Price"] = round(order["Price"] + filled_btc, 8)
+        order["CommissionPaid"] = round(order["Price"] * bittrex_trade_commission, 8)
+        order["PricePerUnit"] = round(order["Price"] / (order["Quantity"] - order["QuantityRemaining"]), 8)
+        if order["QuantityRemaining"] == 0:
+            self.close(order)
+
+    def close(self, order):
+        now = self.clock.time()
+        order["IsOpen"] = False
+        order["Closed"] = to_bittrex_time(now)
+        metrics.observe("paper_order_seconds", now - self.placed_times[order["OrderUuid"]], type=order["Type"])
@@ -0,0 +1,60 @@
+VALUATION_CURRENCY = "BTC"
+
+
+class Portfolio(object):
+    """
+    Used for valuing coin balances in BTC from a single market summaries snapshot.
+
+    Coins without a BTC market are valued through one other market (ex: a coin only quoted in ETH is sold for ETH,
+    which is sold for BTC). Coins are sold at the bid, and quote currencies (ex: USDT) buy BTC at the ask.
+    """
+
+    def __init__(self, market_summaries):
+        self.rates = {}
+        for market_name, summary in market_summaries.items():
+            base_currency, market_currency = market_name.split("-", 1)
+            if summary.bid:
+                self.rates.setdefault(market_currency, {})[base_currency] = summary.bid
+            if summary.ask:
+                self.rates.setdefault(base_currency, {})[market_currency] = 1 / summary.ask
+        self.btc_prices = {VALUATION_CURRENCY: 1}
+
+    def get_btc_price(self, currency):
+        """
+        Used to get the BTC value of one unit of the currency, through its best market path of at most two markets
+
+        :param currency: The currency to value (ex: LTC)
+        :type currency: str
+
+        :return: The currency's BTC price, or None if it can't be exchanged for BTC
+        :rtype: float
+        """
+        if currency not in self.btc_prices:
+            rates = self.rates.get(currency, {})
+            btc_price = rates.get(VALUATION_CURRENCY)
+            if btc_price is None:
+                prices = [
+                    rate * self.rates.get(intermediate_currency, {}).get(VALUATION_CURRENCY, 0)
+                    for intermediate_currency, rate in rates.items()
+                ]
+                btc_price = max(prices, default=0) or None
+            self.btc_prices[currency] = btc_price
+        return self.btc_prices[currency]
+
+    def get_btc_value(self, currency, balance):
+        """
+        Used to get the BTC value of a coin balance
+
+        :param currency: The currency of the balance (ex: LTC)
+        :type currency: str
+        :param balance: The amount of the currency held
+        :type balance: float
+
+        :return: The balance's BTC value, or None if the currency can't be exchanged for BTC
+        :rtype: float
+        """
+        btc_price = self.get_btc_price(currency)
+        if btc_price is None:
+            return None
+        return round(btc_price * balance, 8)
+
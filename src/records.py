@@ -0,0 +1,167 @@
+class Record(object):
+    """
+    Used as the base of the compact record types.
+
+    Fields are kept in __slots__, and JSON_KEYS holds the JSON key of every slot in the same order, so records convert
+    to and from the existing JSON shapes. Unknown JSON keys are ignored. Fields that were never set read as None.
+    When OMIT_UNSET is True they are left out of the JSON (ex: the `sell` order of an open trade), otherwise they
+    default to None.
+    """
+
+    __slots__ = ()
+    JSON_KEYS = ()
+    NESTED_RECORDS = {}
+    OMIT_UNSET = True
+
+    def __init__(self, **fields):
+        if not self.OMIT_UNSET:
+            for slot in self.__slots__:
+                setattr(self, slot, None)
+        for slot, value in fields.items():
+            setattr(self, slot, value)
+
+    def __getattr__(self, name):
+        # Only called when normal lookup fails, which for a slot means it was never set
+        if name in self.__slots__:
+            return None
+        raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, name))
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__ if self.is_set(slot)}
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+    def is_set(self, slot):
+        """
+        Used to check if a field has been set, even if it was set to None
+
+        :param slot: The field's slot name (ex: sell)
+        :type slot: str
+
+        :return: Boolean indicating if the field has been set
+        :rtype: bool
+        """
+        try:
+            getattr(type(self), slot).__get__(self, type(self))
+        except AttributeError:
+            return False
+        return True
+
+    def to_json(self):
+        """
+        Used to convert the record to its JSON shape
+
+        :return: The record's JSON content
+        :rtype: dict
+        """
+        content = {}
+        for slot, key in zip(self.__slots__, self.JSON_KEYS):
+            if not self.is_set(slot):
+                continue
+            value = getattr(self, slot)
+            content[key] = value.to_json() if isinstance(value, Record) else value
+        return content
+
+    @classmethod
+    def from_json(cls, content):
+        """
+        Used to create a record from its JSON shape
+
+        :param content: The record's JSON content
+        :type content: dict
+
+        :return: The record
+        :rtype: Record
+        """
+        record = cls()
+        for slot, key in zip(cls.__slots__, cls.JSON_KEYS):
+            if key not in content:
+                continue
+            value = content[key]
+            if slot in cls.NESTED_RECORDS and value is not None:
+                value = cls.NESTED_RECORDS[slot].from_json(value)
+            setattr(record, slot, value)
+        return record
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_json() == other.to_json()
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, self.to_json())
+
+
+class Order(Record):
+    """
+    Used for a trade's buy or sell order, as stored in the database
+    """
+
+    __slots__ = ("order_uuid", "date_opened", "date_closed", "price", "unit_price", "commission_paid", "stats")
+    JSON_KEYS = ("orderUuid", "dateOpened", "dateClosed", "price", "unitPrice", "commissionPaid", "stats")
+
+    @classmethod
+    def from_bittrex(cls, bittrex_order, stats=None):
+        """
+        Used to create an order from a Bittrex order object and add stats to it if they are provided
+
+        :param bittrex_order: Bittrex order object
+        :type bittrex_order: dict
+        :param stats: The order stats to store
+        :type stats: dict
+
+        :return: The order
+        :rtype: Order
+        """
+        order = cls(
+            order_uuid=bittrex_order["OrderUuid"],
+            date_opened=bittrex_order["Opened"],
+            date_closed=bittrex_order["Closed"],
+            price=bittrex_order["Price"],
+            unit_price=bittrex_order["PricePerUnit"],
+            commission_paid=bittrex_order["CommissionPaid"]
+        )
+        if stats is not None:
+            order.stats = stats
+        return order
+
+
+class Trade(Record):
+    """
+    Used for a trade on a coin pair, from its buy order to its sell order
+    """
+
+    __slots__ = ("coin_pair", "quantity", "buy", "sell")
+    JSON_KEYS = ("coinPair", "quantity", "buy", "sell")
+    NESTED_RECORDS = {"buy": Order, "sell": Order}
+
+    def is_open(self):
+        """
+        Used to check if the trade hasn't been sold yet
+
+        :return: Boolean indicating if the trade is open
+        :rtype: bool
+        """
+        return not self.is_set("sell")
+
+
+class MarketSummary(Record):
+    """
+    Used for a Bittrex market summary
+    """
+
+    __slots__ = ("market_name", "high", "low", "volume", "last", "base_volume", "time_stamp", "bid", "ask",
+                 "open_buy_orders", "open_sell_orders", "prev_day", "created")
+    JSON_KEYS = ("MarketName", "High", "Low", "Volume", "Last", "BaseVolume", "TimeStamp", "Bid", "Ask",
+                 "OpenBuyOrders", "OpenSellOrders", "PrevDay", "Created")
+    OMIT_UNSET = False
+
+
+class Balance(Record):
+    """
+    Used for a coin balance and its BTC value
+    """
+
+    __slots__ = ("currency", "balance", "btc_value", "is_tracked")
+    JSON_KEYS = ("Currency", "Balance", "BtcValue", "IsTracked")
+    OMIT_UNSET = False
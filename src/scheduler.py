@@ -0,0 +1,117 @@
+import zlib
+
+from clock import wall_clock
+
+# Candle lengths in seconds for every Bittrex ticker interval.
+# Candle boundaries are aligned to the UTC epoch, so `week` and `month` boundaries are approximations.
+TICKER_INTERVAL_SECONDS = {
+    "oneMin": 60,
+    "fiveMin": 5 * 60,
+    "thirtyMin": 30 * 60,
+    "hour": 60 * 60,
+    "day": 24 * 60 * 60,
+    "week": 7 * 24 * 60 * 60,
+    "month": 30 * 24 * 60 * 60
+}
+
+
+class Scheduler(object):
+    """
+    Used for aligning indicator work to candle closes and pacing the main loop
+    """
+
+    def __init__(self, ticker_interval, schedule_params=None, clock=wall_clock):
+        if schedule_params is None:
+            schedule_params = {}
+
+        self.candle_length = TICKER_INTERVAL_SECONDS[ticker_interval]
+        self.price_check_interval = schedule_params.get("priceCheckInterval", 10)
+        self.indicator_jitter = min(schedule_params.get("indicatorJitter", 30), self.candle_length)
+        self.buy_scan_budget = schedule_params.get("buyScanBudget", 60)
+        self.market_refresh_interval = schedule_params.get("marketRefreshInterval", 60 * 60)
+
+        self.clock = clock
+        self.completed = {}
+        self.last_ticks = {}
+
+    def get_jitter(self, coin_pair):
+        """
+        Used to get the coin pair's fixed delay after a candle close, spreading work across markets
+
+        :param coin_pair: String literal for the market (ex: BTC-LTC)
+        :type coin_pair: str
+
+        :return: The coin pair's delay in seconds
+        :rtype: float
+        """
+        return (zlib.crc32(coin_pair.encode()) % 1000) / 1000 * self.indicator_jitter
+
+    def get_candle_start(self, coin_pair):
+        """
+        Used to get the start time of the coin pair's current candle, shifted by the coin pair's jitter
+
+        :param coin_pair: String literal for the market (ex: BTC-LTC)
+        :type coin_pair: str
+
+        :return: The current candle's start time
+        :rtype: float
+        """
+        now = self.clock.time() - self.get_jitter(coin_pair)
+        return now - now % self.candle_length
+
+    def is_due(self, task, coin_pair):
+        """
+        Used to check if a task hasn't been run on the coin pair since its last candle closed
+
+        :param task: The name of the task (ex: rsi, buyScan)
+        :type task: str
+        :param coin_pair: String literal for the market (ex: BTC-LTC)
+        :type coin_pair: str
+
+        :return: Boolean indicating if the task is due
+        :rtype: bool
+        """
+        return self.completed.get((task, coin_pair)) != self.get_candle_start(coin_pair)
+
+    def mark_done(self, task, coin_pair):
+        """
+        Used to mark a task as run on the coin pair for its current candle
+
+        :param task: The name of the task (ex: rsi, buyScan)
+        :type task: str
+        :param coin_pair: String literal for the market (ex: BTC-LTC)
+        :type coin_pair: str
+        """
+        self.completed[(task, coin_pair)] = self.get_candle_start(coin_pair)
+
+    def get_state(self):
+        """
+        Used to get the completed tasks, so they can be restored after a restart
+
+        :return: The candle length and the completed tasks
+        :rtype: dict
+        """
+        return {"candleLength": self.candle_length, "completed": dict(self.completed)}
+
+    def load_state(self, state):
+        """
+        Used to restore the completed tasks, if they were recorded with the same candle length
+
+        :param state: The candle length and the completed tasks
+        :type state: dict
+        """
+        if state.get("candleLength") == self.candle_length:
+            self.completed.update(state["completed"])
+
+    def wait_for_next_tick(self, loop="main"):
+        """
+        Used to sleep until the loop's next price check is due
+
+        :param loop: The name of the loop that is waiting (ex: buy, sell)
+        :type loop: str
+        """
+        next_tick = self.last_ticks.get(loop, self.clock.time()) + self.price_check_interval
+        sleep_time = next_tick - self.clock.time()
+        if sleep_time > 0:
+            self.clock.sleep(sleep_time)
+        self.last_ticks[loop] = max(next_tick, self.clock.time())
@@ -0,0 +1,193 @@
+import bisect
+import hashlib
+import multiprocessing
+
+from queue import Empty
+
+from logger import logger
+
+
+class ConsistentHashRing(object):
+    """
+    Used for assigning keys to nodes so that adding or removing a node only moves that node's keys
+    """
+
+    def __init__(self, nodes, replicas=100):
+        self.replicas = replicas
+        self.ring = []
+        for node in nodes:
+            self.add_node(node)
+
+    @staticmethod
+    def get_hash(key):
+        """
+        Used to hash a key onto the ring
+
+        :param key: The key to hash
+        :type key: str
+
+        :return: The key's position on the ring
+        :rtype: int
+        """
+        return int(hashlib.md5(str(key).encode()).hexdigest()[:16], 16)
+
+    def add_node(self, node):
+        """
+        Used to add a node and its virtual replicas to the ring
+
+        :param node: The node to add
+        :type node: int
+        """
+        for replica in range(self.replicas):
+            bisect.insort(self.ring, (self.get_hash("{}-{}".format(node, replica)), node))
+
+    def remove_node(self, node):
+        """
+        Used to remove a node and its virtual replicas from the ring
+
+        :param node: The node to remove
+        :type node: int
+        """
+        self.ring = [point for point in self.ring if point[1] != node]
+
+    def get_node(self, key):
+        """
+        Used to get the node a key is assigned to
+
+        :param key: The key to look up (ex: BTC-LTC)
+        :type key: str
+
+        :return: The key's node
+        :rtype: int
+        """
+        index = bisect.bisect(self.ring, (self.get_hash(key),)) % len(self.ring)
+        return self.ring[index][1]
+
+
+def run_shard_worker(secrets, settings, worker, command_queue, signal_queue):
+    """
+    Runs a shard worker process. The worker scans the coin pairs it receives from the coordinator
+    for buy and pause signals and sends them back to the coordinator. It never places orders or writes
+    to the database.
+
+    :param secrets: The user's secrets
+    :type secrets: dict
+    :param settings: The user's settings
+    :type settings: dict
+    :param worker: The worker's index
+    :type worker: int
+    :param command_queue: Queue the coordinator sends the worker's coin pairs on
+    :type command_queue: multiprocessing.Queue
+    :param signal_queue: Queue the worker sends its signals on
+    :type signal_queue: multiprocessing.Queue
+    """
+    import signal
+    import threading
+    from app import run_loop
+    from trader import Trader
+    from tracing import tracer
+    from logger import configure_logger
+
+    # Ctrl-C reaches the whole process group, the coordinator stops the workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    configure_logger(settings.get("logParameters", {}), "shard-{}".format(worker + 1))
+    tracer.configure(settings.get("traceParameters", {}))
+    trader = Trader(secrets, settings)
+    stop_event = threading.Event()
+    shard = {"coinPairs": []}
+
+    def scan_shard():
+        while True:
+            try:
+                command, coin_pairs = command_queue.get_nowait()
+            except Empty:
+                break
+            if command == "stop":
+                stop_event.set()
+                return
+            shard["coinPairs"] = coin_pairs
+        for signal in trader.scan_buys(shard["coinPairs"]):
+            signal_queue.put(signal)
+
+    run_loop(trader.Messenger, scan_shard, lambda: trader.Scheduler.wait_for_next_tick("buy"), stop_event)
+
+
+class ShardCoordinator(object):
+    """
+    Used for splitting buy scans across worker processes by consistent hashing of the coin pairs.
+    The coordinator owns the database, order placement and the open trade budget.
+    """
+
+    def __init__(self, trader, secrets, settings, worker_count):
+        self.Trader = trader
+        self.secrets = secrets
+        self.settings = settings
+        self.worker_count = worker_count
+
+        self.ring = ConsistentHashRing(range(worker_count))
+        self.context = multiprocessing.get_context("spawn")
+        self.signal_queue = self.context.Queue()
+        self.workers = []
+        self.shards = {}
+
+    def start(self):
+        """
+        Used to start the shard worker processes
+        """
+        for worker in range(self.worker_count):
+            command_queue = self.context.Queue()
+            process = self.context.Process(
+                target=run_shard_worker,
+                args=(self.secrets, self.settings, worker, command_queue, self.signal_queue),
+                daemon=True
+            )
+            process.start()
+            self.workers.append({"process": process, "commandQueue": command_queue})
+
+    def stop(self):
+        """
+        Used to stop the shard worker processes
+        """
+        for worker in self.workers:
+            worker["commandQueue"].put(("stop", None))
+        for worker in self.workers:
+            worker["process"].join(30)
+        self.workers = []
+
+    def sync_shards(self):
+        """
+        Used to send every worker its share of the un-paused coin pairs.
+        Workers receive no coin pairs while the open trade budget is exhausted.
+        """
+        shards = {worker: [] for worker in range(self.worker_count)}
+        if self.Trader.is_buy_budget_available():
+            for coin_pair in self.Trader.Database.app_data["coinPairs"]:
+                if (coin_pair not in self.Trader.Database.trades["trackedCoinPairs"] and
+                        coin_pair not in self.Trader.Database.app_data["pausedCoinPairs"]):
+                    shards[self.ring.get_node(coin_pair)].append(coin_pair)
+
+        for worker, coin_pairs in shards.items():
+            if self.shards.get(worker) != coin_pairs:
+                self.workers[worker]["commandQueue"].put(("coinPairs", coin_pairs))
+                self.shards[worker] = coin_pairs
+
+    def process_signals(self, timeout):
+        """
+        Used to apply the signals received from the workers, waiting up to timeout seconds for the first one
+
+        :param timeout: The maximum amount of seconds to wait for a signal
+        :type timeout: float
+        """
+        try:
+            signal = self.signal_queue.get(timeout=timeout)
+        except Empty:
+            return
+        while True:
+            if signal["type"] == "pause" or self.Trader.is_buy_budget_available():
+                self.Trader.apply_buy_signal(signal)
+            else:
+                logger.info("Dropped the {} buy signal, the open trade budget is exhausted.".format(signal["coinPair"]))
+            try:
+                signal = self.signal_queue.get_nowait()
+            except Empty:
+                return
@@ -0,0 +1,329 @@
+"""
+   Synthetic BTC markets for stress testing. Log prices follow geometric Brownian motion or mean reversion
+   (Ornstein-Uhlenbeck), both with Poisson jumps, and are generated for every market at once with NumPy.
+
+   A SyntheticMarket answers Bittrex public requests in the Bittrex response shapes, so it can be used as a Bittrex
+   dispatch (ex: Bittrex(secrets, dispatch=SyntheticMarket(synthetic_params)))
+"""
+import math
+import time
+from urllib.parse import urlsplit, parse_qsl
+
+import numpy
+
+from candle_store import COLUMNS, to_bittrex_time, get_candle_store
+from scheduler import TICKER_INTERVAL_SECONDS
+
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+SECONDS_PER_DAY = 24 * 60 * 60
+
+DEFAULT_SYNTHETIC_PARAMS = {
+    "marketCount": 1000,
+    "tickerInterval": "oneMin",
+    "historyLength": 1440,
+    "seed": 0,
+    # Share of the markets whose log price reverts to its starting level
+    "meanReversionShare": 0.5,
+    # Yearly rates, the drift and volatility of every market are drawn around them
+    "drift": 0,
+    "volatility": 0.8,
+    "reversionRate": 50,
+    "jumpIntensity": 20,
+    "jumpSize": 0.05,
+    # Median 24 hour BTC volume and bid-ask spread
+    "baseVolume": 50,
+    "spread": 0.002,
+    # Price steps simulated per candle, their minimum and maximum become the candle's low and high
+    "subSteps": 4
+}
+
+
+def get_reverting_paths(start, increments, decay):
+    """
+    Used to solve y[t] = decay * y[t - 1] + increments[t] for every row at once.
+    Uses y[t] = decay^t * (y[0] + sum(decay^-k * increments[k])), in blocks short enough for decay^-k to stay exact.
+
+    :param start: The value of every row before the first increment
+    :type start: numpy.ndarray
+    :param increments: The increments of every row, one row per market
+    :type increments: numpy.ndarray
+    :param decay: The factor the previous value decays by every step
+    :type decay: float
+
+    :return: The paths after every increment
+    :rtype: numpy.ndarray
+    """
+    block_length = increments.shape[1] if decay >= 1 else max(int(5 / -math.log(decay)), 1)
+    powers = decay ** numpy.arange(1, min(block_length, increments.shape[1]) + 1)
+    paths = numpy.empty_like(increments)
+    for block_start in range(0, increments.shape[1], block_length):
+        block = increments[:, block_start:block_start + block_length]
+        block_powers = powers[:block.shape[1]]
+        paths[:, block_start:block_start + block.shape[1]] = block_powers * (
+            start[:, None] + numpy.cumsum(block / block_powers, axis=1)
+        )
+        start = paths[:, block_start + block.shape[1] - 1]
+    return paths
+
+
+class SyntheticMarket(object):
+    """
+    Used for generating synthetic markets and serving them as Bittrex responses.
+
+    Every market keeps its own drift, volatility, starting price and volume. The latest historyLength candles are kept
+    to answer requests, generate() produces candles without keeping them, so long histories can be generated in
+    chunks of a bounded size.
+    """
+
+    def __init__(self, synthetic_params=None):
+        params = dict(DEFAULT_SYNTHETIC_PARAMS, **(synthetic_params or {}))
+
+        self.seed = params["seed"]
+        self.random = numpy.random.default_rng(self.seed)
+        self.market_count = params["marketCount"]
+        self.interval = params["tickerInterval"]
+        self.interval_length = TICKER_INTERVAL_SECONDS[self.interval]
+        self.history_length = params["historyLength"]
+        self.sub_steps = params["subSteps"]
+        self.reversion_rate = params["reversionRate"]
+        self.jump_intensity = params["jumpIntensity"]
+        self.jump_size = params["jumpSize"]
+        self.spread = params["spread"]
+
+        count = self.market_count
+        self.market_names = ["BTC-S{:04d}".format(index) for index in range(count)]
+        self.market_indexes = {market_name: index for index, market_name in enumerate(self.market_names)}
+        # The first markets revert to their mean, so both kinds are contiguous slices of the arrays
+        self.reverting_count = int(round(count * params["meanReversionShare"]))
+        self.drift = self.random.normal(params["drift"], 0.2, count)
+        self.volatility = self.random.lognormal(math.log(params["volatility"]), 0.3, count)
+        self.mean_log_prices = self.random.normal(math.log(1e-4), 1.5, count)
+        self.base_volumes = self.random.lognormal(math.log(params["baseVolume"]), 1.5, count)
+        self.log_prices = self.mean_log_prices.copy()
+
+        self.time = params.get("startTime")
+        if self.time is None:
+            now = time.time()
+            self.time = now - now % self.interval_length - self.history_length * self.interval_length
+        self.history = {column: numpy.empty((count, 0)) for column in COLUMNS + ("BV",)}
+        self.summaries = None
+        self.advance(self.history_length)
+
+    def generate(self, count):
+        """
+        Used to generate the next candles of every market, moving the markets forward without keeping the candles.
+        The kept history isn't updated, use advance() to serve the new candles.
+
+        :param count: The amount of candles to generate per market
+        :type count: int
+
+        :return: The candle times (count,) and the other GetTicks columns (market count, count), keyed by their
+            GetTicks key
+        :rtype: dict
+        """
+        market_count = self.market_count
+        steps = count * self.sub_steps
+        step_length = self.interval_length / self.sub_steps / SECONDS_PER_YEAR
+
+        increments = self.random.standard_normal((market_count, steps))
+        increments *= (self.volatility * math.sqrt(step_length))[:, None]
+        # Jumps are rare, only the steps that jump are drawn
+        jump_count = self.random.poisson(self.jump_intensity * step_length * increments.size)
+        increments.flat[self.random.integers(0, increments.size, jump_count)] += self.random.normal(
+            0, self.jump_size, jump_count
+        )
+
+        reverting = slice(0, self.reverting_count)
+        trending = slice(self.reverting_count, market_count)
+        log_prices = numpy.empty((market_count, steps))
+        increments[trending] += ((self.drift - self.volatility ** 2 / 2) * step_length)[trending, None]
+        log_prices[trending] = self.log_prices[trending, None] + numpy.cumsum(increments[trending], axis=1)
+        log_prices[reverting] = self.mean_log_prices[reverting, None] + get_reverting_paths(
+            (self.log_prices - self.mean_log_prices)[reverting], increments[reverting],
+            math.exp(-self.reversion_rate * step_length)
+        )
+
+        # The high, low and close are picked from the log prices, only the picked prices are exponentiated
+        steps_per_candle = log_prices.reshape(market_count, count, self.sub_steps)
+        log_opens = numpy.empty((market_count, count))
+        log_opens[:, 0] = self.log_prices
+        log_opens[:, 1:] = steps_per_candle[:, :-1, -1]
+        log_highs = log_opens.copy()
+        log_lows = log_opens.copy()
+        # Element-wise over the few sub steps, reducing along a short axis is far slower
+        for sub_step in range(self.sub_steps):
+            numpy.maximum(log_highs, steps_per_candle[:, :, sub_step], out=log_highs)
+            numpy.minimum(log_lows, steps_per_candle[:, :, sub_step], out=log_lows)
+        opens = numpy.exp(log_opens)
+        highs = numpy.exp(log_highs)
+        lows = numpy.exp(log_lows)
+        closes = numpy.exp(steps_per_candle[:, :, -1])
+
+        # Volume rises with the size of the candle's move
+        btc_volumes = (self.base_volumes * self.interval_length / SECONDS_PER_DAY)[:, None] * self.random.lognormal(
+            0, 0.5, (market_count, count)
+        ) * (1 + 20 * numpy.abs(closes / opens - 1))
+
+        candles = {
+            "T": self.time + numpy.arange(count) * self.interval_length,
+            "O": opens, "H": highs, "L": lows, "C": closes, "V": btc_volumes / closes, "BV": btc_volumes
+        }
+        self.log_prices = log_prices[:, -1]
+        self.time += count * self.interval_length
+        return candles
+
+    def iterate_candles(self, count, chunk_length=1440):
+        """
+        Used to generate a long history in chunks, so only one chunk is held in memory at a time
+
+        :param count: The amount of candles to generate per market
+        :type count: int
+        :param chunk_length: The amount of candles per chunk
+        :type chunk_length: int
+
+        :return: The chunks of candles, in the shape returned by generate()
+        :rtype: generator
+        """
+        while count > 0:
+            chunk = self.generate(min(chunk_length, count))
+            count -= len(chunk["T"])
+            yield chunk
+
+    def advance(self, count=1):
+        """
+        Used to move the markets forward, keeping the latest historyLength candles for requests
+
+        :param count: The amount of candles to move forward
+        :type count: int
+        """
+        candles = self.generate(count)
+        for column in self.history:
+            values = numpy.broadcast_to(candles[column], (self.market_count, count))
+            self.history[column] = numpy.concatenate((self.history[column], values), axis=1)[:, -self.history_length:]
+        self.summaries = None
+
+    def write_candle_stores(self, count, directory="../database/candles/", chunk_length=1440):
+        """
+        Used to generate candles straight into candle stores, for backtests over long histories
+
+        :param count: The amount of candles to generate per market
+        :type count: int
+        :param directory: The directory the candle stores are kept in
+        :type directory: str
+        :param chunk_length: The amount of candles per chunk
+        :type chunk_length: int
+        """
+        for chunk in self.iterate_candles(count, chunk_length):
+            for index, market_name in enumerate(self.market_names):
+                columns = {"T": chunk["T"]}
+                for column in COLUMNS[1:]:
+                    columns[column] = numpy.ascontiguousarray(chunk[column][index])
+                get_candle_store(market_name, self.interval, directory).append_columns(columns)
+
+    def get_summaries(self):
+        """
+        Used to get the market summaries of the last 24 hours of history
+
+        :return: Market summaries in the Bittrex shape
+        :rtype: list
+        """
+        if self.summaries is not None:
+            return self.summaries
+        day_length = min(SECONDS_PER_DAY // self.interval_length, self.history_length) or 1
+        lasts = self.history["C"][:, -1]
+        columns = {
+            "High": self.history["H"][:, -day_length:].max(axis=1),
+            "Low": self.history["L"][:, -day_length:].min(axis=1),
+            "Volume": self.history["V"][:, -day_length:].sum(axis=1),
+            "Last": lasts,
+            "BaseVolume": self.history["BV"][:, -day_length:].sum(axis=1),
+            "Bid": lasts * (1 - self.spread / 2),
+            "Ask": lasts * (1 + self.spread / 2),
+            "PrevDay": self.history["O"][:, -day_length]
+        }
+        columns = {key: values.tolist() for key, values in columns.items()}
+        time_stamp = to_bittrex_time(self.time)
+        self.summaries = [
+            dict(
+                {key: values[index] for key, values in columns.items()},
+                MarketName=market_name, TimeStamp=time_stamp, OpenBuyOrders=100, OpenSellOrders=100,
+                Created="2017-01-01T00:00:00"
+            )
+            for index, market_name in enumerate(self.market_names)
+        ]
+        return self.summaries
+
+    def get_order_book(self, index, depth_type, depth):
+        """
+        Used to get a market's order book, with depth falling away from the bid and ask.
+        The order book is the same for every request until the markets move forward.
+
+        :return: The order book in the Bittrex shape
+        :rtype: dict, list
+        """
+        random = numpy.random.default_rng([self.seed, index, int(self.time)])
+        summary = self.get_summaries()[index]
+        level_volume = self.base_volumes[index] / 100
+        order_book = {}
+        for side, price, direction in (("buy", summary["Bid"], -1), ("sell", summary["Ask"], 1)):
+            rates = price * (1 + direction * self.spread * numpy.arange(depth))
+            quantities = level_volume * random.lognormal(0, 0.7, depth) * (1 + numpy.arange(depth) / 5) / rates
+            order_book[side] = [
+                {"Quantity": quantity, "Rate": rate} for quantity, rate in zip(quantities.tolist(), rates.tolist())
+            ]
+        if depth_type == "both":
+            return order_book
+        return order_book[depth_type]
+
+    def get_candles(self, index):
+        columns = {column: values[index].tolist() for column, values in self.history.items()}
+        times = [to_bittrex_time(timestamp) for timestamp in columns["T"]]
+        return [
+            {
+                "T": times[candle], "O": columns["O"][candle], "H": columns["H"][candle], "L": columns["L"][candle],
+                "C": columns["C"][candle], "V": columns["V"][candle], "BV": columns["BV"][candle]
+            }
+            for candle in range(len(times))
+        ]
+
+    def __call__(self, request_url, api_sign, max_result_items=None):
+        url = urlsplit(request_url)
+        method = url.path.rsplit("/", 1)[-1]
+        query = dict(parse_qsl(url.query))
+        market = query.get("market", query.get("marketName"))
+
+        if method == "getmarkets":
+            return get_response([
+                {
+                    "MarketCurrency": market_name[4:], "BaseCurrency": "BTC", "MarketCurrencyLong": market_name[4:],
+                    "BaseCurrencyLong": "Bitcoin", "MinTradeSize": 1e-8, "MarketName": market_name, "IsActive": True,
+                    "Created": "2017-01-01T00:00:00"
+                }
+                for market_name in self.market_names
+            ])
+        if method == "getmarketsummaries":
+            return get_response(self.get_summaries())
+        if method not in ("getmarketsummary", "getticker", "getorderbook", "GetTicks"):
+            return get_response(None, "NOT_SIMULATED")
+        if market not in self.market_indexes:
+            return get_response(None, "INVALID_MARKET")
+
+        index = self.market_indexes[market]
+        if method == "getmarketsummary":
+            return get_response([self.get_summaries()[index]])
+        if method == "getticker":
+            summary = self.get_summaries()[index]
+            return get_response({"Bid": summary["Bid"], "Ask": summary["Ask"], "Last": summary["Last"]})
+        if method == "getorderbook":
+            return get_response(self.get_order_book(index, query.get("type", "both"), int(query.get("depth", 20))))
+        if query.get("tickInterval") != self.interval:
+            return get_response(None, "INVALID_TICK_INTERVAL")
+        candles = self.get_candles(index)
+        return get_response(candles[-max_result_items:] if max_result_items is not None else candles)
+
+
+def get_response(result, message=""):
+    """
+    Used to wrap a result in the Bittrex response shape, failing if an error message is given
+    """
+    return {"success": message == "", "message": message, "result": result}
@@ -0,0 +1,200 @@
+import os
+import math
+import array
+import bisect
+import threading
+
+import json_codec
+from clock import wall_clock
+from directory_utilities import validate_or_make_directory
+
+# (resolution, retention) in seconds of every tier, finest first: raw samples for a day, one sample per minute for a
+# month and one sample per hour after that
+DEFAULT_TIERS = ((0, 24 * 60 * 60), (60, 30 * 24 * 60 * 60), (60 * 60, None))
+
+
+class TimeSeriesTier(object):
+    """
+    Used for the samples of one resolution, as a sorted column of times and a column per field
+    """
+
+    def __init__(self, resolution, retention, fields):
+        self.resolution = resolution
+        self.retention = retention
+        self.times = array.array("d")
+        self.columns = {field: array.array("d") for field in fields}
+
+    def add(self, timestamp, values):
+        """
+        Used to add a sample, keeping only the last sample of every resolution bucket.
+        Samples older than the newest sample are ignored.
+
+        :param timestamp: The sample's time
+        :type timestamp: float
+        :param values: The sample's values, in field order
+        :type values: list
+        """
+        if self.resolution > 0:
+            timestamp -= timestamp % self.resolution
+        if len(self.times) > 0 and timestamp < self.times[-1]:
+            return
+        if len(self.times) > 0 and timestamp == self.times[-1]:
+            for column, value in zip(self.columns.values(), values):
+                column[-1] = value
+            return
+        self.times.append(timestamp)
+        for column, value in zip(self.columns.values(), values):
+            column.append(value)
+
+    def remove_before(self, timestamp):
+        """
+        Used to remove the samples older than a time
+
+        :return: The removed samples, as (time, values) pairs
+        :rtype: list
+        """
+        cut = bisect.bisect_left(self.times, timestamp)
+        removed = [
+            (self.times[index], [column[index] for column in self.columns.values()]) for index in range(cut)
+        ]
+        del self.times[:cut]
+        for column in self.columns.values():
+            del column[:cut]
+        return removed
+
+
+class TimeSeriesStore(object):
+    """
+    Used for keeping sampled values over time in tiers of decreasing resolution, so the store's size stays bounded.
+
+    Samples are appended to a journal file as they are recorded. Once the finest tier holds samples older than its
+    retention for compact_interval seconds, expired samples are downsampled into the next tier and the tiers are
+    written to the snapshot file, after which the journal starts over.
+    """
+
+    def __init__(self, file_string, fields, tiers=DEFAULT_TIERS, clock=wall_clock, compact_interval=60 * 60):
+        self.file_string = file_string
+        self.journal_file_string = os.path.splitext(file_string)[0] + ".journal.jsonl"
+        self.fields = tuple(fields)
+        self.tiers = [TimeSeriesTier(resolution, retention, self.fields) for resolution, retention in tiers]
+        self.clock = clock
+        self.compact_interval = compact_interval
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """
+        Used to read the snapshot and the samples journaled after it
+        """
+        if os.path.exists(self.file_string):
+            with open(self.file_string, "rb") as file:
+                snapshot = json_codec.loads(file.read())
+            resolutions = {tier.resolution: tier for tier in self.tiers}
+            for snapshot_tier in snapshot["tiers"]:
+                tier = resolutions.get(snapshot_tier["resolution"])
+                if tier is None:
+                    continue
+                tier.times = array.array("d", snapshot_tier["T"])
+                for field in self.fields:
+                    values = snapshot_tier["values"].get(field, [None] * len(tier.times))
+                    tier.columns[field] = array.array("d", (math.nan if value is None else value for value in values))
+
+        if os.path.exists(self.journal_file_string):
+            with open(self.journal_file_string) as file:
+                for line in file:
+                    try:
+                        sample = json_codec.loads(line)
+                    except json_codec.JSONDecodeError:
+                        # A line cut short by a crash
+                        continue
+                    self.tiers[0].add(sample[0], [math.nan if value is None else value for value in sample[1:]])
+
+    def record(self, values):
+        """
+        Used to add a sample of the fields at the current time
+
+        :param values: The sample's values keyed by their field. Missing or None values are stored as unknown
+        :type values: dict
+        """
+        timestamp = self.clock.time()
+        sample = [math.nan if values.get(field) is None else values[field] for field in self.fields]
+        line = json_codec.dumps([timestamp] + [None if math.isnan(value) else value for value in sample]) + "\n"
+        with self.lock:
+            self.tiers[0].add(timestamp, sample)
+            validate_or_make_directory(self.journal_file_string)
+            with open(self.journal_file_string, "a") as file:
+                file.write(line)
+            finest_tier = self.tiers[0]
+            if (finest_tier.retention is not None and len(finest_tier.times) > 0 and
+                    finest_tier.times[0] < timestamp - finest_tier.retention - self.compact_interval):
+                self.compact(timestamp)
+
+    def compact(self, timestamp):
+        """
+        Used to downsample the expired samples of every tier into the next tier and write the snapshot
+        """
+        for index, tier in enumerate(self.tiers):
+            if tier.retention is None:
+                continue
+            expired = tier.remove_before(timestamp - tier.retention)
+            if index + 1 < len(self.tiers):
+                for sample_time, values in expired:
+                    self.tiers[index + 1].add(sample_time, values)
+
+        snapshot = {"fields": self.fields, "tiers": [
+            {
+                "resolution": tier.resolution,
+                "T": tier.times.tolist(),
+                "values": {
+                    field: [None if math.isnan(value) else value for value in column]
+                    for field, column in tier.columns.items()
+                }
+            }
+            for tier in self.tiers
+        ]}
+        temporary_file_string = self.file_string + ".tmp"
+        with open(temporary_file_string, "w") as file:
+            file.write(json_codec.dumps(snapshot))
+        os.replace(temporary_file_string, self.file_string)
+        open(self.journal_file_string, "w").close()
+
+    def query(self, start_time=None, end_time=None, resolution=None):
+        """
+        Used to get the samples within a time range, from the finest tier that holds them
+
+        :param start_time: The earliest sample time to include
+            Not required. If not passed in the range starts at the oldest sample
+        :type start_time: float
+        :param end_time: The latest sample time to include
+            Not required. If not passed in the range ends at the newest sample
+        :type end_time: float
+        :param resolution: Keep only the last sample of every resolution bucket (in seconds)
+            Not required. If not passed in every stored sample in the range is returned
+        :type resolution: float
+
+        :return: The sample times (T) and a list of values per field, oldest first. Unknown values are None
+        :rtype: dict
+        """
+        result = {"T": []}
+        result.update({field: [] for field in self.fields})
+        with self.lock:
+            # Coarser tiers hold older samples, so they are read first
+            for tier in reversed(self.tiers):
+                start = 0 if start_time is None else bisect.bisect_left(tier.times, start_time)
+                end = len(tier.times) if end_time is None else bisect.bisect_right(tier.times, end_time)
+                if len(result["T"]) > 0:
+                    start = max(start, bisect.bisect_right(tier.times, result["T"][-1]))
+                if start >= end:
+                    continue
+                result["T"].extend(tier.times[start:end])
+                for field, column in tier.columns.items():
+                    result[field].extend(None if math.isnan(value) else value for value in column[start:end])
+
+        if resolution is None or len(result["T"]) < 1:
+            return result
+        indexes = [
+            index for index in range(len(result["T"]))
+            if index + 1 == len(result["T"]) or
+            result["T"][index + 1] // resolution != result["T"][index] // resolution
+        ]
+        return {key: [values[index] for index in indexes] for key, values in result.items()}
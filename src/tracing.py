@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import threading
+
+
+class NullSpan(object):
+    """
+    Used as the span of a disabled tracer, so tracing costs a single function call when disabled
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span(object):
+    """
+    Used for timing a block of code as a Chrome trace event
+    """
+
+    __slots__ = ("tracer", "name", "category", "args", "start_time")
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start_time = 0
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception_info):
+        end_time = time.perf_counter()
+        self.tracer.add_event({
+            "name": self.name,
+            "cat": self.category,
+            "ph": "X",
+            "ts": (self.start_time - self.tracer.origin) * 1e6,
+            "dur": (end_time - self.start_time) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": self.args
+        })
+        return False
+
+
+class Tracer(object):
+    """
+    Used for recording spans and writing them as Chrome/Perfetto trace event JSON files.
+    Each file holds at most max_events_per_file events and only the newest max_files files are kept.
+
+    Files use the JSON array trace format, which trace viewers accept without the closing bracket,
+    so every flush only appends the new events.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = "../logs/traces/"
+        self.max_events_per_file = 100000
+        self.max_files = 10
+
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.pending_events = []
+        self.file_event_count = 0
+        self.file_string = None
+
+    def configure(self, trace_params):
+        """
+        Used to enable or disable tracing
+
+        :param trace_params: The trace settings (enabled, directory, maxEventsPerFile, maxFiles)
+        :type trace_params: dict
+        """
+        self.enabled = trace_params.get("enabled", False)
+        self.directory = trace_params.get("directory", self.directory)
+        self.max_events_per_file = trace_params.get("maxEventsPerFile", self.max_events_per_file)
+        self.max_files = trace_params.get("maxFiles", self.max_files)
+
+    def span(self, name, category="bot", **args):
+        """
+        Used to trace a block of code (ex: `with tracer.span("rsi", coinPair=coin_pair):`)
+
+        :param name: The span's name
+        :type name: str
+        :param category: The span's category
+        :type category: str
+
+        :return: The span context manager
+        :rtype: Span
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, category, args)
+
+    def add_event(self, event):
+        with self.lock:
+            self.pending_events.append(event)
+
+    def flush(self):
+        """
+        Used to append the recorded spans to the current trace file, rotating it once it is full
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            if len(self.pending_events) < 1:
+                return
+            events, self.pending_events = self.pending_events, []
+
+            # Another process may have pruned the current file, which is then started again
+            if (self.file_string is None or self.file_event_count >= self.max_events_per_file or
+                    not os.path.exists(self.file_string)):
+                self.rotate()
+            with open(self.file_string, "a") as file:
+                for event in events:
+                    file.write(json.dumps(event) + ",\n")
+            self.file_event_count += len(events)
+
+    def rotate(self):
+        """
+        Used to start a new trace file and remove the least recently written ones, including the files other processes
+        (ex: shard workers, earlier runs) left behind, but never the file this process has just started
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.file_string = os.path.join(self.directory, "trace-{}-{}.json".format(os.getpid(), int(time.time() * 1000)))
+        self.file_event_count = 0
+        with open(self.file_string, "w") as file:
+            file.write("[\n")
+
+        trace_files = []
+        for file_name in os.listdir(self.directory):
+            file_string = os.path.join(self.directory, file_name)
+            if not file_name.startswith("trace-") or not file_name.endswith(".json") or file_string == self.file_string:
+                continue
+            try:
+                trace_files.append((os.path.getmtime(file_string), file_string))
+            except FileNotFoundError:
+                continue
+        trace_files.sort()
+        for _, file_string in trace_files[:max(len(trace_files) + 1 - self.max_files, 0)]:
+            try:
+                os.remove(file_string)
+            except FileNotFoundError:
+                pass
+
+
+tracer = Tracer()
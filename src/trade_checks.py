@@ -0,0 +1,129 @@
+"""
+   The buy and sell checks of the trade parameters, shared by the Trader and the backtests.
+   The checks work on single values and element-wise on NumPy arrays alike.
+"""
+
+bittrex_trade_commission = 0.0025
+
+
+def check_buy_parameters(trade_params, rsi, day_volume, current_buy_price):
+    """
+    Used to check if the buy conditions have been met
+
+    :param trade_params: The `tradeParameters` settings
+    :type trade_params: dict
+    :param rsi: The coin pair's current RSI
+    :type rsi: float
+    :param day_volume: The coin pair's current 24 hour volume
+    :type day_volume: float
+    :param current_buy_price: The coin pair's current price
+    :type current_buy_price: float
+
+    :return: Boolean indicating if the buy conditions have been met
+    :rtype: bool
+    """
+    rsi_check = rsi <= trade_params["buy"]["rsiThreshold"]
+
+    return rsi_check & check_buy_volume_and_price(trade_params, day_volume, current_buy_price)
+
+
+def check_buy_volume_and_price(trade_params, day_volume, current_buy_price):
+    """
+    Used to check if the 24 hour volume and unit price buy conditions have been met
+
+    :param trade_params: The `tradeParameters` settings
+    :type trade_params: dict
+    :param day_volume: The coin pair's current 24 hour volume
+    :type day_volume: float
+    :param current_buy_price: The coin pair's current price
+    :type current_buy_price: float
+
+    :return: Boolean indicating if the volume and unit price buy conditions have been met
+    :rtype: bool
+    """
+    day_volume_check = day_volume >= trade_params["buy"]["24HourVolumeThreshold"]
+    current_buy_price_check = current_buy_price >= trade_params["buy"]["minimumUnitPrice"]
+
+    return day_volume_check & current_buy_price_check
+
+
+def check_sell_parameters(trade_params, rsi, profit_margin):
+    """
+    Used to check if the sell conditions have been met
+
+    :param trade_params: The `tradeParameters` settings
+    :type trade_params: dict
+    :param rsi: The coin pair's current RSI
+    :type rsi: float
+    :param profit_margin: The coin pair's current profit margin
+    :type profit_margin: float
+
+    :return: Boolean indicating if the sell conditions have been met
+    :rtype: bool
+    """
+    rsi_check = rsi >= trade_params["sell"]["rsiThreshold"]
+    lower_profit_check = profit_margin >= trade_params["sell"]["minProfitMarginThreshold"]
+    upper_profit_check = profit_margin >= trade_params["sell"]["profitMarginThreshold"]
+    loss_check = False
+    if "lossMarginThreshold" in trade_params["sell"] and trade_params["sell"]["lossMarginThreshold"] < 0:
+        loss_check = trade_params["sell"]["lossMarginThreshold"] >= profit_margin
+
+    return (rsi_check & lower_profit_check) | upper_profit_check | (rsi_check & loss_check)
+
+
+def calculate_profit(buy_price, quantity, current_price):
+    """
+    Used to calculate a trade's profit in BTC after the Bittrex commission on both orders
+
+    :param buy_price: The BTC paid for the trade's buy order, without its commission
+    :type buy_price: float
+    :param quantity: The amount of coins bought
+    :type quantity: float
+    :param current_price: The market's current price
+    :type current_price: float
+
+    :return: Profit in BTC
+    :rtype: float
+    """
+    buy_btc_quantity = round(buy_price / (1 - bittrex_trade_commission), 8)
+    sell_btc_quantity = round(quantity * current_price * (1 - bittrex_trade_commission), 8)
+
+    return sell_btc_quantity - buy_btc_quantity
+
+
+def calculate_profit_margin(buy_price, quantity, current_price):
+    """
+    Used to calculate a trade's profit margin after the Bittrex commission on both orders
+
+    :param buy_price: The BTC paid for the trade's buy order, without its commission
+    :type buy_price: float
+    :param quantity: The amount of coins bought
+    :type quantity: float
+    :param current_price: The market's current price
+    :type current_price: float
+
+    :return: Profit margin
+    :rtype: float
+    """
+    buy_btc_quantity = round(buy_price / (1 - bittrex_trade_commission), 8)
+
+    return 100 * calculate_profit(buy_price, quantity, current_price) / buy_btc_quantity
+
+
+def calculate_trigger_price(buy_price, quantity, profit_margin):
+    """
+    Used to calculate the price at which a trade reaches a profit margin, the inverse of `calculate_profit_margin`
+
+    :param buy_price: The BTC paid for the trade's buy order, without its commission
+    :type buy_price: float
+    :param quantity: The amount of coins bought
+    :type quantity: float
+    :param profit_margin: The profit margin to reach
+    :type profit_margin: float
+
+    :return: Price
+    :rtype: float
+    """
+    buy_btc_quantity = round(buy_price / (1 - bittrex_trade_commission), 8)
+
+    return buy_btc_quantity * (1 + profit_margin / 100) / (quantity * (1 - bittrex_trade_commission))
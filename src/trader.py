@@ -1,10 +1,25 @@
 import pydash as py_
-import time
+from requests.exceptions import RequestException
 
-from bittrex import Bittrex
+from bittrex import Bittrex, BOTH_ORDER_BOOK
+from cassette import get_dispatch
+from cache import Cache
+from clock import wall_clock
 from messenger import Messenger
 from database import Database
-from logger import logger
+from scheduler import Scheduler
+from order_book import OrderBook
+from paper_trading import PaperExchange
+from portfolio import Portfolio
+from timeseries import TimeSeriesStore
+from circuit_breaker import CircuitBreaker
+from exit_index import ExitIndex, get_exit_band
+from records import MarketSummary, Balance
+from trade_checks import check_buy_parameters, check_buy_volume_and_price, check_sell_parameters, calculate_profit
+from candle_store import get_candle_store
+from metrics import LatencyStats, metrics
+from tracing import tracer
+from logger import logger, set_log_context
 
 
 class Trader(object):
@@ -12,13 +27,45 @@ class Trader(object):
     Used for handling all trade functionality
     """
 
-    def __init__(self, secrets, settings):
+    def __init__(self, secrets, settings, name=None, cache=None, clock=wall_clock, quiet=False):
+        self.clock = clock
         self.trade_params = settings["tradeParameters"]
         self.pause_params = settings["pauseParameters"]
 
-        self.Bittrex = Bittrex(secrets)
-        self.Messenger = Messenger(secrets, settings)
-        self.Database = Database()
+        self.Bittrex = Bittrex(secrets, dispatch=get_dispatch(settings.get("cassetteParameters")),
+                               cache=cache if cache is not None else Cache(clock=clock),
+                               breaker_params=settings.get("circuitBreakerParameters"), clock=clock)
+        self.MarketData = self.Bittrex
+        if settings.get("marketDataParameters", {}).get("useService", False):
+            # Imported here, shared memory needs Python 3.8 or newer
+            from market_data_service import MarketDataClient
+            self.MarketData = MarketDataClient(settings, self.Bittrex)
+        self.Messenger = Messenger(secrets, settings, quiet)
+        paper_params = settings.get("paperTradingParameters", {})
+        if paper_params.get("enabled", False):
+            # Paper trades are kept apart from the strategy's real trades
+            name = paper_params.get("database", "paper" if name is None else "{}-paper".format(name))
+        self.Database = Database(name, clock)
+        self.EquityHistory = TimeSeriesStore(self.Database.directory + "timeseries/equity.json",
+                                             ("totalBalance", "unrealisedProfit", "realisedProfit"), clock=clock)
+        self.total_balance = self.Database.get_previous_total_balance()
+        self.Scheduler = Scheduler(self.trade_params["tickerInterval"], settings.get("scheduleParameters"), clock)
+        self.order_books = {}
+        self.CircuitBreaker = CircuitBreaker("coinPair", settings.get("circuitBreakerParameters"), clock)
+        self.candle_store_params = settings.get("candleStoreParameters", {})
+        self.Exchange = self.Bittrex
+        if paper_params.get("enabled", False):
+            self.Exchange = PaperExchange(self.get_order_book, paper_params, clock)
+
+        self.ExitIndex = ExitIndex()
+        for trade in self.Database.trades["trades"]:
+            if trade.is_open():
+                self.index_exit_band(trade)
+
+        self.last_exit_checks = {}
+        self.exit_check_latency = LatencyStats()
+        self.sell_cycle_duration = LatencyStats()
+        self.last_latency_report_time = clock.time()
 
     def initialise(self):
         """
@@ -26,7 +73,11 @@ class Trader(object):
         """
         try:
             if len(self.Database.app_data["coinPairs"]) < 1:
-                self.Database.store_coin_pairs(self.get_markets("BTC"))
+                markets = self.get_markets("BTC")
+                # There's nothing to trade on without the market list
+                if markets is None:
+                    exit()
+                self.Database.store_coin_pairs(markets)
             self.Messenger.print_header(len(self.Database.app_data["coinPairs"]))
         except ConnectionError as exception:
             self.Messenger.print_error("connection", [], True)
@@ -35,66 +86,343 @@ class Trader(object):
 
     def analyse_pauses(self):
         """
-        Checks all the paused buy and sell pairs and the balance notification timer and reactivate the necessary ones
-        """
-        if self.Database.check_resume(self.pause_params["buy"]["pauseTime"], "buy"):
-            self.Database.store_coin_pairs(self.get_markets("BTC"))
-            self.Messenger.print_resume_pause(len(self.Database.app_data["coinPairs"]), "buy")
-        if "sell" in self.pause_params and self.Database.check_resume(self.pause_params["sell"]["pauseTime"], "sell"):
-            self.Messenger.print_resume_pause(self.Database.app_data["pausedTrackedCoinPairs"], "sell")
-            self.Database.resume_sells()
-        if "balance" in self.pause_params and self.Database.check_resume(self.pause_params["balance"]["pauseTime"],
-                                                                         "balance"):
-            current_balance = self.Messenger.send_balance_slack(self.get_non_zero_balances(),
-                                                                self.Database.get_previous_total_balance())
-            self.Database.reset_balance_notifier(current_balance)
+        Checks all the paused buy and sell pairs and the balance notification timer and reactivate the necessary ones.
+        The market list is fetched again every `marketRefreshInterval` seconds.
+        """
+        with metrics.timer("trader_phase_seconds", phase="analyse_pauses"):
+            for pause_type, coin_pair in self.Database.resume_expired_pauses():
+                self.Messenger.print_resume_pause(coin_pair, pause_type)
+            coin_pairs_time = self.Database.app_data["coinPairsTime"]
+            if coin_pairs_time is None or self.clock.time() - coin_pairs_time >= self.Scheduler.market_refresh_interval:
+                markets = self.get_markets("BTC")
+                # The previous market list is kept until a fetch succeeds, it's retried on the next cycle
+                if markets is not None:
+                    self.Database.store_coin_pairs(markets)
+            if ("balance" in self.pause_params and
+                    self.Database.check_resume(self.pause_params["balance"]["pauseTime"], "balance")):
+                balances = self.get_non_zero_balances()
+                if balances is None:
+                    return
+                current_balance = self.Messenger.send_balance_slack(balances,
+                                                                    self.Database.get_previous_total_balance())
+                self.Database.reset_balance_notifier(current_balance)
+                self.total_balance = current_balance
 
     def analyse_buys(self):
         """
-        Analyse all the un-paused coin pairs for buy signals and apply buys
+        Analyse the un-paused coin pairs whose candles have closed since their last scan for buy signals and apply buys
+        """
+        with metrics.timer("trader_phase_seconds", phase="analyse_buys"):
+            if self.is_buy_budget_available():
+                tracked_coin_pairs = self.Database.trades["trackedCoinPairs"]
+                paused_coin_pairs = self.Database.app_data["pausedCoinPairs"]
+                coin_pairs = py_.filter_(self.Database.app_data["coinPairs"],
+                                         lambda coin_pair: (coin_pair not in tracked_coin_pairs and
+                                                            coin_pair not in paused_coin_pairs))
+                for buy_signal in self.scan_buys(coin_pairs):
+                    self.apply_buy_signal(buy_signal)
+
+    def is_buy_budget_available(self):
+        """
+        Used to check if new trades may be opened
+
+        :return: Boolean indicating if new trades may be opened
+        :rtype: bool
         """
         trade_len = len(self.Database.trades["trackedCoinPairs"])
         pause_trade_len = len(self.Database.app_data["pausedTrackedCoinPairs"])
-        if (trade_len < 1 or pause_trade_len == trade_len) and trade_len < self.trade_params["buy"]["maxOpenTrades"]:
-            for coin_pair in self.Database.app_data["coinPairs"]:
-                self.buy_strategy(coin_pair)
+        return (trade_len < 1 or pause_trade_len == trade_len) and trade_len < self.trade_params["buy"]["maxOpenTrades"]
+
+    def scan_buys(self, coin_pairs):
+        """
+        Scans the coin pairs whose candles have closed since their last scan for buy and pause signals
+
+        The coin pairs are screened in stages, from cheapest to most expensive:
+            1) Volume and unit price checks on a single bulk market summaries snapshot
+            2) Candle history and RSI fetches for the coin pairs that passed stage 1, highest volume first.
+               Coin pairs that don't fit in the scan's time budget are deferred to the next scan
+            3) The full buy parameter checks for the coin pairs that passed stage 2
+
+        :param coin_pairs: Coin pair markets to scan (ex: BTC-ETH, BTC-FCT)
+        :type coin_pairs: list
+
+        :return: The buy and pause signals found
+        :rtype: list
+        """
+        coin_pairs = py_.filter_(coin_pairs, lambda coin_pair: self.Scheduler.is_due("buyScan", coin_pair))
+        if len(coin_pairs) < 1:
+            return []
+        market_summaries = self.get_market_summaries()
+        if market_summaries is None:
+            return []
+
+        scan_deadline = self.clock.time() + self.Scheduler.buy_scan_budget
+        volume_candidates = py_.sort_by(self.screen_buy_candidates(coin_pairs, market_summaries),
+                                        lambda coin_pair: -market_summaries[coin_pair].base_volume)
+
+        rsi_candidates = []
+        deferred_coin_pairs = set()
+        for coin_pair in volume_candidates:
+            if self.clock.time() >= scan_deadline:
+                deferred_coin_pairs.add(coin_pair)
+                continue
+            set_log_context(coinPair=coin_pair)
+            with tracer.span("screen_coin_pair", coinPair=coin_pair):
+                rsi = self.run_isolated(coin_pair, self.get_rsi, coin_pair)
+            if rsi is not None:
+                rsi_candidates.append((coin_pair, rsi))
+
+        signals = []
+        for coin_pair, rsi in rsi_candidates:
+            set_log_context(coinPair=coin_pair)
+            with tracer.span("buy_strategy", coinPair=coin_pair):
+                signal = self.run_isolated(coin_pair, self.get_buy_signal, coin_pair, rsi, market_summaries[coin_pair])
+            if signal is not None:
+                signals.append(signal)
+
+        set_log_context(coinPair=None)
+        for coin_pair in coin_pairs:
+            if coin_pair not in deferred_coin_pairs:
+                self.Scheduler.mark_done("buyScan", coin_pair)
+
+        buy_signals = py_.filter_(signals, lambda signal: signal["type"] == "buy")
+        self.Messenger.print_buy_screening(
+            [len(coin_pairs), len(volume_candidates), len(rsi_candidates), len(buy_signals), len(deferred_coin_pairs)]
+        )
+        return signals
+
+    def screen_buy_candidates(self, coin_pairs, market_summaries):
+        """
+        Filters the coin pairs on the cheap buy checks (24 hour volume and unit price)
+
+        :param coin_pairs: Coin pair markets to screen (ex: BTC-ETH, BTC-FCT)
+        :type coin_pairs: list
+        :param market_summaries: Market summaries keyed by their coin pair
+        :type market_summaries: dict
+
+        :return: The coin pairs that passed the volume and unit price checks
+        :rtype: list
+        """
+        return py_.filter_(
+            coin_pairs,
+            lambda coin_pair: (
+                coin_pair in market_summaries and
+                self.check_buy_volume_and_price(market_summaries[coin_pair].base_volume,
+                                                market_summaries[coin_pair].ask)
+            )
+        )
 
     def analyse_sells(self):
         """
         Analyse all the un-paused tracked coin pairs for sell signals and apply sells
         """
-        for coin_pair in self.Database.trades["trackedCoinPairs"]:
-            if coin_pair not in self.Database.app_data["pausedTrackedCoinPairs"]:
-                self.sell_strategy(coin_pair)
+        cycle_start = self.clock.time()
+        with metrics.timer("trader_phase_seconds", phase="analyse_sells"):
+            market_summaries = self.get_market_summaries()
+            last_exit_checks = {}
+            for coin_pair in list(self.Database.trades["trackedCoinPairs"]):
+                if coin_pair not in self.Database.app_data["pausedTrackedCoinPairs"]:
+                    check_time = self.clock.time()
+                    if coin_pair in self.last_exit_checks:
+                        self.exit_check_latency.record(check_time - self.last_exit_checks[coin_pair])
+                        metrics.observe("exit_check_interval_seconds", check_time - self.last_exit_checks[coin_pair])
+                    last_exit_checks[coin_pair] = check_time
+                    if not self.is_exit_triggered(coin_pair, market_summaries):
+                        continue
+                    set_log_context(coinPair=coin_pair)
+                    with tracer.span("sell_strategy", coinPair=coin_pair):
+                        self.run_isolated(coin_pair, self.sell_strategy, coin_pair)
+            # Coin pairs that were sold or sell paused are forgotten, so they don't pile up
+            self.last_exit_checks = last_exit_checks
+            set_log_context(coinPair=None)
+            if market_summaries is not None:
+                self.record_equity(market_summaries)
+        self.sell_cycle_duration.record(self.clock.time() - cycle_start)
+        self.report_exit_check_latency()
+
+    def report_exit_check_latency(self):
+        """
+        Used to print the exit check latency and sell cycle duration once every candle
+        """
+        if self.clock.time() - self.last_latency_report_time < self.Scheduler.candle_length:
+            return
+        self.last_latency_report_time = self.clock.time()
+        self.Messenger.print_exit_check_latency(self.exit_check_latency.reset(), self.sell_cycle_duration.reset())
 
-    def buy_strategy(self, coin_pair):
+    def is_exit_triggered(self, coin_pair, market_summaries):
         """
-        Applies the buy checks on the coin pair and handles the results appropriately
+        Used to check if the coin pair's current bid is outside the exit band of its open trade, so its sell
+        conditions need checking. Coin pairs without an indexed exit band or a current bid are always checked.
 
         :param coin_pair: Coin pair market to check (ex: BTC-ETH, BTC-FCT)
         :type coin_pair: str
+        :param market_summaries: Market summaries keyed by their coin pair
+        :type market_summaries: dict
+
+        :return: Boolean indicating if the sell conditions need checking
+        :rtype: bool
         """
-        if (len(self.Database.trades["trackedCoinPairs"]) >= self.trade_params["buy"]["maxOpenTrades"] or
-                coin_pair in self.Database.trades["trackedCoinPairs"]):
+        if market_summaries is None or coin_pair not in market_summaries or market_summaries[coin_pair].bid is None:
+            return True
+        triggered = self.ExitIndex.get_triggered(coin_pair, market_summaries[coin_pair].bid)
+        return triggered is None or len(triggered) > 0
+
+    def index_exit_band(self, trade):
+        """
+        Used to index the exit band of an open trade. Trades without a filled buy are left out, so they go through
+        `sell_strategy`, which skips them until their buy is filled.
+
+        :param trade: The open trade
+        :type trade: Trade
+        """
+        if trade.buy.price is None or trade.buy.price <= 0 or trade.quantity <= 0:
             return
-        rsi = self.calculate_rsi(coin_pair=coin_pair, period=14, unit=self.trade_params["tickerInterval"])
-        day_volume = self.get_current_24hr_volume(coin_pair)
-        current_buy_price = self.get_current_price(coin_pair, "ask")
+        self.ExitIndex.add(trade.buy.order_uuid, trade.coin_pair,
+                           *get_exit_band(self.trade_params, self.pause_params, trade.buy.price, trade.quantity))
+
+    def record_equity(self, market_summaries):
+        """
+        Samples the last valued total balance and the unrealised and realised profit of the trades into the equity
+        history
+
+        :param market_summaries: Market summaries keyed by their coin pair
+        :type market_summaries: dict
+        """
+        unrealised_profit = 0
+        realised_profit = 0
+        for trade in self.Database.trades["trades"]:
+            # Buys that haven't been filled yet only hold their order UUID
+            if trade.buy.price is None:
+                continue
+            if trade.is_open():
+                if trade.coin_pair in market_summaries:
+                    unrealised_profit += calculate_profit(trade.buy.price, trade.quantity,
+                                                          market_summaries[trade.coin_pair].bid)
+            elif trade.sell.date_closed is not None:
+                realised_profit += calculate_profit(trade.buy.price, trade.quantity, trade.sell.unit_price)
+        self.EquityHistory.record({
+            "totalBalance": self.total_balance,
+            "unrealisedProfit": round(unrealised_profit, 8),
+            "realisedProfit": round(realised_profit, 8)
+        })
+
+    def run_isolated(self, coin_pair, analysis, *args):
+        """
+        Runs a coin pair's analysis so that any failure in it only skips that coin pair.
+        Coin pairs that keep failing are backed off by the circuit breaker, while the other coin pairs carry on.
+        Connection errors are left to the main loop, since they affect every coin pair.
+
+        :param coin_pair: Coin pair market being analysed (ex: BTC-ETH, BTC-FCT)
+        :type coin_pair: str
+        :param analysis: The analysis function to run
+        :type analysis: function
+
+        :return: The analysis result, or None if the coin pair is backed off or its analysis failed
+        :rtype: object
+        """
+        if not self.CircuitBreaker.allow(coin_pair):
+            return None
+        try:
+            result = analysis(*args)
+        except (RequestException, ConnectionError):
+            raise
+        except Exception:
+            backoff = self.CircuitBreaker.record_failure(coin_pair)
+            self.Messenger.print_error("coinPair", [coin_pair, backoff])
+            logger.exception("The {} analysis failed, backing off for {} seconds".format(coin_pair, backoff))
+            return None
+        self.CircuitBreaker.record_success(coin_pair)
+        return result
+
+    def buy_strategy(self, coin_pair, rsi=None, coin_summary=None):
+        """
+        Applies the buy checks on the coin pair and handles the results appropriately
+
+        :param coin_pair: Coin pair market to check (ex: BTC-ETH, BTC-FCT)
+        :type coin_pair: str
+        :param rsi: The coin pair's current RSI
+            Not required. If not passed in the function will calculate it
+        :type rsi: float
+        :param coin_summary: The coin pair's market summary
+            Not required. If not passed in the function will go fetch it
+        :type coin_summary: MarketSummary
 
+        :return: Boolean indicating if a buy was placed
+        :rtype: bool
+        """
         if rsi is None:
-            return
+            rsi = self.get_rsi(coin_pair)
+        signal = self.get_buy_signal(coin_pair, rsi, coin_summary)
+        if signal is None:
+            return False
+        return self.apply_buy_signal(signal)
 
-        if self.check_buy_parameters(rsi, day_volume, current_buy_price):
-            buy_stats = {
-                "rsi": rsi,
-                "24HrVolume": day_volume
-            }
-            self.buy(coin_pair, self.trade_params["buy"]["btcAmount"], current_buy_price, buy_stats)
-        elif "buy" in self.pause_params and rsi >= self.pause_params["buy"]["rsiThreshold"] > 0:
-            self.Messenger.print_pause(coin_pair, [rsi, day_volume], self.pause_params["buy"]["pauseTime"], "buy")
-            self.Database.pause_buy(coin_pair)
+    def get_buy_signal(self, coin_pair, rsi, coin_summary=None):
+        """
+        Applies the buy checks on the coin pair without acting on the results
+
+        :param coin_pair: Coin pair market to check (ex: BTC-ETH, BTC-FCT)
+        :type coin_pair: str
+        :param rsi: The coin pair's current RSI
+        :type rsi: float
+        :param coin_summary: The coin pair's market summary
+            Not required. If not passed in the function will go fetch it
+        :type coin_summary: MarketSummary
+
+        :return: A buy or pause signal, or None if there is neither
+        :rtype: dict
+        """
+        if rsi is None:
+            return None
+        if coin_summary is None:
+            day_volume = self.get_current_24hr_volume(coin_pair)
+            current_buy_price = self.get_current_price(coin_pair, "ask")
         else:
-            self.Messenger.print_no_buy(coin_pair, rsi, day_volume, current_buy_price)
+            day_volume = coin_summary.base_volume
+            current_buy_price = coin_summary.ask
+
+        signal = {
+            "coinPair": coin_pair,
+            "rsi": rsi,
+            "24HrVolume": day_volume,
+            "price": current_buy_price
+        }
+        if self.check_buy_parameters(rsi, day_volume, current_buy_price):
+            return py_.assign(signal, {"type": "buy"})
+        if "buy" in self.pause_params and rsi >= self.pause_params["buy"]["rsiThreshold"] > 0:
+            return py_.assign(signal, {"type": "pause"})
+        self.Messenger.print_no_buy(coin_pair, rsi, day_volume, current_buy_price)
+        return None
+
+    def apply_buy_signal(self, signal):
+        """
+        Places the buy or pauses the coin pair of a buy signal, as long as the open trade budget allows it
+
+        :param signal: The buy or pause signal
+        :type signal: dict
+
+        :return: Boolean indicating if a buy was placed
+        :rtype: bool
+        """
+        coin_pair = signal["coinPair"]
+        if signal["type"] == "pause":
+            if coin_pair not in self.Database.app_data["pausedCoinPairs"]:
+                pause_time = self.get_pause_time("buy", coin_pair)
+                self.Messenger.print_pause(coin_pair, [signal["rsi"], signal["24HrVolume"]], pause_time, "buy")
+                self.Database.pause_buy(coin_pair, pause_time)
+            return False
+
+        if (len(self.Database.trades["trackedCoinPairs"]) >= self.trade_params["buy"]["maxOpenTrades"] or
+                coin_pair in self.Database.trades["trackedCoinPairs"]):
+            return False
+        buy_stats = {
+            "rsi": signal["rsi"],
+            "24HrVolume": signal["24HrVolume"]
+        }
+        if not self.check_slippage(coin_pair, "buy", self.trade_params["buy"]["btcAmount"]):
+            return False
+        self.buy(coin_pair, self.trade_params["buy"]["btcAmount"], signal["price"], buy_stats)
+        return True
 
     def sell_strategy(self, coin_pair):
         """
@@ -106,25 +434,76 @@ class Trader(object):
         if (coin_pair in self.Database.app_data["pausedTrackedCoinPairs"] or
                 coin_pair not in self.Database.trades["trackedCoinPairs"]):
             return
-        rsi = self.calculate_rsi(coin_pair=coin_pair, period=14, unit=self.trade_params["tickerInterval"])
+        trade = self.Database.get_open_trade(coin_pair)
+        # Buys that haven't been filled yet only hold their order UUID
+        if trade is None or trade.buy.price is None:
+            return
+        rsi = self.get_rsi(coin_pair)
         current_sell_price = self.get_current_price(coin_pair, "bid")
-        profit_margin = self.Database.get_profit_margin(coin_pair, current_sell_price)
+        profit_margin = self.Database.get_profit_margin(coin_pair, current_sell_price, trade)
 
         if rsi is None:
             return
 
         if self.check_sell_parameters(rsi, profit_margin):
+            sell_btc_amount = trade.quantity * current_sell_price
+            if profit_margin > 0 and not self.check_slippage(coin_pair, "sell", sell_btc_amount):
+                return
             sell_stats = {
                 "rsi": rsi,
                 "profitMargin": profit_margin
             }
             self.sell(coin_pair, current_sell_price, sell_stats)
         elif "sell" in self.pause_params and profit_margin <= self.pause_params["sell"]["profitMarginThreshold"] < 0:
-            self.Messenger.print_pause(coin_pair, [profit_margin, rsi], self.pause_params["sell"]["pauseTime"], "sell")
-            self.Database.pause_sell(coin_pair)
+            pause_time = self.get_pause_time("sell", coin_pair)
+            self.Messenger.print_pause(coin_pair, [profit_margin, rsi], pause_time, "sell")
+            self.Database.pause_sell(coin_pair, pause_time)
         else:
             self.Messenger.print_no_sell(coin_pair, rsi, profit_margin, current_sell_price)
 
+    def get_pause_time(self, pause_type, coin_pair):
+        """
+        Gets the amount of minutes to pause the coin pair for, from its `coinPairPauseTimes` entry when it has one
+
+        :param pause_type: Type of pause (one of: 'buy', 'sell')
+        :type pause_type: str
+        :param coin_pair: Coin pair market to pause (ex: BTC-ETH, BTC-FCT)
+        :type coin_pair: str
+
+        :return: The pause time in minutes
+        :rtype: float
+        """
+        pause_params = self.pause_params[pause_type]
+        return pause_params.get("coinPairPauseTimes", {}).get(coin_pair, pause_params["pauseTime"])
+
+    def check_slippage(self, coin_pair, trade_type, btc_amount):
+        """
+        Used to check that an order won't fill further from the best price than the trade type's `maxSlippage`
+        percentage, using the coin pair's order book. Loss cutting sells are never held back by this check.
+
+        :param coin_pair: Coin pair market to check (ex: BTC-ETH, BTC-FCT)
+        :type coin_pair: str
+        :param trade_type: Type of trade (one of: 'buy', 'sell')
+        :type trade_type: str
+        :param btc_amount: The BTC value of the order
+        :type btc_amount: float
+
+        :return: Boolean indicating if the slippage is acceptable (always True without a `maxSlippage` setting)
+        :rtype: bool
+        """
+        max_slippage = self.trade_params[trade_type].get("maxSlippage")
+        if max_slippage is None:
+            return True
+        order_book = self.get_order_book(coin_pair)
+        if order_book is None:
+            return False
+        # Buys fill against the asks (`sell` side) and sells against the bids (`buy` side)
+        slippage = order_book.get_slippage("sell" if trade_type == "buy" else "buy", btc_amount)
+        if slippage is None or slippage > max_slippage:
+            self.Messenger.print_slippage(coin_pair, trade_type, slippage, max_slippage)
+            return False
+        return True
+
     def check_buy_parameters(self, rsi, day_volume, current_buy_price):
         """
         Used to check if the buy conditions have been met
@@ -139,11 +518,25 @@ class Trader(object):
         :return: Boolean indicating if the buy conditions have been met
         :rtype: bool
         """
-        rsi_check = rsi <= self.trade_params["buy"]["rsiThreshold"]
-        day_volume_check = day_volume >= self.trade_params["buy"]["24HourVolumeThreshold"]
-        current_buy_price_check = current_buy_price >= self.trade_params["buy"]["minimumUnitPrice"]
+        if day_volume is None or current_buy_price is None:
+            return False
+        return check_buy_parameters(self.trade_params, rsi, day_volume, current_buy_price)
 
-        return rsi_check and day_volume_check and current_buy_price_check
+    def check_buy_volume_and_price(self, day_volume, current_buy_price):
+        """
+        Used to check if the 24 hour volume and unit price buy conditions have been met
+
+        :param day_volume: The coin pair's current 24 hour volume
+        :type day_volume: float
+        :param current_buy_price: The coin pair's current price
+        :type current_buy_price: float
+
+        :return: Boolean indicating if the volume and unit price buy conditions have been met
+        :rtype: bool
+        """
+        if day_volume is None or current_buy_price is None:
+            return False
+        return check_buy_volume_and_price(self.trade_params, day_volume, current_buy_price)
 
     def check_sell_parameters(self, rsi, profit_margin):
         """
@@ -157,13 +550,7 @@ class Trader(object):
         :return: Boolean indicating if the sell conditions have been met
         :rtype: bool
         """
-        rsi_check = rsi >= self.trade_params["sell"]["rsiThreshold"]
-        lower_profit_check = profit_margin >= self.trade_params["sell"]["minProfitMarginThreshold"]
-        upper_profit_check = profit_margin >= self.trade_params["sell"]["profitMarginThreshold"]
-        loss_check = ("lossMarginThreshold" in self.trade_params["sell"] and
-                      0 > self.trade_params["sell"]["lossMarginThreshold"] >= profit_margin)
-
-        return (rsi_check and lower_profit_check) or upper_profit_check or (rsi_check and loss_check)
+        return check_sell_parameters(self.trade_params, rsi, profit_margin)
 
     def buy(self, coin_pair, btc_quantity, price, stats, trade_time_limit=2):
         """
@@ -182,7 +569,7 @@ class Trader(object):
         :type trade_time_limit: float
         """
         buy_quantity = round(btc_quantity / price, 8)
-        buy_data = self.Bittrex.buy_limit(coin_pair, buy_quantity, price)
+        buy_data = self.Exchange.buy_limit(coin_pair, buy_quantity, price)
         if not buy_data["success"]:
             error_str = self.Messenger.print_error("buy", [coin_pair, buy_data["message"]])
             logger.error(error_str)
@@ -191,6 +578,7 @@ class Trader(object):
 
         buy_order_data = self.get_order(buy_data["result"]["uuid"], trade_time_limit * 60)
         self.Database.store_buy(buy_order_data["result"], stats)
+        self.index_exit_band(self.Database.get_open_trade(coin_pair))
 
         self.Messenger.print_buy(coin_pair, price, stats["rsi"], stats["24HrVolume"])
         self.Messenger.send_buy_slack(coin_pair, stats["rsi"], stats["24HrVolume"])
@@ -212,7 +600,7 @@ class Trader(object):
         :type trade_time_limit: float
         """
         trade = self.Database.get_open_trade(coin_pair)
-        sell_data = self.Bittrex.sell_limit(coin_pair, trade["quantity"], price)
+        sell_data = self.Exchange.sell_limit(coin_pair, trade.quantity, price)
         if not sell_data["success"]:
             error_str = self.Messenger.print_error("sell", [coin_pair, sell_data["message"]])
             logger.error(error_str)
@@ -221,12 +609,35 @@ class Trader(object):
         sell_order_data = self.get_order(sell_data["result"]["uuid"], trade_time_limit * 60)
         # TODO: Handle partial/incomplete sales.
         self.Database.store_sell(sell_order_data["result"], stats)
+        self.ExitIndex.remove(trade.buy.order_uuid)
 
         self.Messenger.print_sell(coin_pair, price, stats["rsi"], stats["profitMargin"])
         self.Messenger.send_sell_slack(coin_pair, stats["rsi"], stats["profitMargin"])
         self.Messenger.send_sell_gmail(sell_order_data["result"], stats)
         self.Messenger.play_sw_theme()
 
+    def get_order_book(self, coin_pair, depth=50):
+        """
+        Gets the coin pair's local order book, brought up to date with the latest Bittrex order book
+
+        :param coin_pair: Coin pair market to get the order book of (ex: BTC-ETH, BTC-FCT)
+        :type coin_pair: str
+        :param depth: The amount of levels to fetch on each side
+        :type depth: int
+
+        :return: The coin pair's order book, or None if it couldn't be fetched
+        :rtype: OrderBook
+        """
+        order_book_data = self.Bittrex.get_order_book(coin_pair, BOTH_ORDER_BOOK, depth)
+        if not order_book_data["success"] or order_book_data["result"] is None:
+            error_str = self.Messenger.print_error("orderBook", [coin_pair])
+            logger.error(error_str)
+            return None
+        if coin_pair not in self.order_books:
+            self.order_books[coin_pair] = OrderBook(coin_pair)
+        self.order_books[coin_pair].apply_snapshot(order_book_data["result"])
+        return self.order_books[coin_pair]
+
     def get_markets(self, main_market_filter=None):
         """
         Gets all the Bittrex markets and filters them based on the main market filter
@@ -234,14 +645,14 @@ class Trader(object):
         :param main_market_filter: Main market to filter on (ex: BTC, ETH, USDT)
         :type main_market_filter: str
 
-        :return: All Bittrex markets (with filter applied, if any)
+        :return: All Bittrex markets (with filter applied, if any), or None if they couldn't be fetched
         :rtype: list
         """
-        markets = self.Bittrex.get_markets()
+        markets = self.MarketData.get_markets()
         if not markets["success"]:
-            error_str = self.Messenger.print_error("market", [], True)
+            error_str = self.Messenger.print_error("market")
             logger.error(error_str)
-            exit()
+            return None
 
         markets = markets["result"]
         if main_market_filter is not None:
@@ -250,6 +661,20 @@ class Trader(object):
         markets = py_.map_(markets, lambda market: market["MarketName"])
         return markets
 
+    def get_market_summaries(self):
+        """
+        Gets the market summaries of all Bittrex markets in a single request
+
+        :return: Market summaries keyed by their coin pair, or None if they couldn't be fetched
+        :rtype: dict
+        """
+        market_summaries = self.MarketData.get_market_summaries()
+        if not market_summaries["success"]:
+            error_str = self.Messenger.print_error("marketSummaries")
+            logger.error(error_str)
+            return None
+        return {summary["MarketName"]: MarketSummary.from_json(summary) for summary in market_summaries["result"]}
+
     def get_current_price(self, coin_pair, price_type):
         """
         Gets current market price for a coin pair
@@ -262,7 +687,7 @@ class Trader(object):
         :return: Coin pair's current market price
         :rtype: float
         """
-        coin_summary = self.Bittrex.get_market_summary(coin_pair)
+        coin_summary = self.MarketData.get_market_summary(coin_pair)
         if not coin_summary["success"]:
             error_str = self.Messenger.print_error("coinMarket", [coin_pair])
             logger.error(error_str)
@@ -283,7 +708,7 @@ class Trader(object):
         :return: Coin pair's current 24 hour market volume
         :rtype: float
         """
-        coin_summary = self.Bittrex.get_market_summary(coin_pair)
+        coin_summary = self.MarketData.get_market_summary(coin_pair)
         if not coin_summary["success"]:
             error_str = self.Messenger.print_error("coinMarket", [coin_pair])
             logger.error(error_str)
@@ -292,7 +717,9 @@ class Trader(object):
 
     def get_closing_prices(self, coin_pair, period, unit):
         """
-        Returns closing prices within a specified time frame for a coin pair
+        Returns closing prices within a specified time frame for a coin pair, including the candle that is still open.
+        With the candle store enabled, the fetched candles that have closed are appended to the store. They are
+        always fetched, since the store never holds the open candle and lags by the candle that just closed.
 
         :param coin_pair: String literal for the market (ex: BTC-LTC)
         :type coin_pair: str
@@ -304,7 +731,10 @@ class Trader(object):
         :return: Array of closing prices
         :rtype: list
         """
-        historical_data = self.Bittrex.get_historical_data(coin_pair, period, unit)
+        historical_data = self.MarketData.get_historical_data(coin_pair, period, unit)
+        if self.candle_store_params.get("enabled", False):
+            get_candle_store(coin_pair, unit, self.candle_store_params.get("directory", "../database/candles/"),
+                             self.clock).append(historical_data)
         closing_prices = []
         for i in historical_data:
             closing_prices.append(i["C"])
@@ -324,11 +754,11 @@ class Trader(object):
         :return: Order object
         :rtype: dict
         """
-        start_time = time.time()
-        order_data = self.Bittrex.get_order(order_uuid)
-        while time.time() - start_time <= trade_time_limit and order_data["result"]["IsOpen"]:
-            time.sleep(10)
-            order_data = self.Bittrex.get_order(order_uuid)
+        start_time = self.clock.time()
+        order_data = self.Exchange.get_order(order_uuid)
+        while self.clock.time() - start_time <= trade_time_limit and order_data["result"]["IsOpen"]:
+            self.clock.sleep(10)
+            order_data = self.Exchange.get_order(order_uuid)
 
         if order_data["result"]["IsOpen"]:
             error_str = self.Messenger.print_error(
@@ -336,10 +766,40 @@ class Trader(object):
             )
             logger.error(error_str)
             if order_data["result"]["Type"] == "LIMIT_BUY":
-                self.Bittrex.cancel(order_uuid)
+                self.Exchange.cancel(order_uuid)
 
         return order_data
 
+    def wait_for_market_data(self, loop):
+        """
+        Used to wait until the next tick, or until the market data service publishes new data
+
+        :param loop: The name of the loop that is waiting (ex: buy, sell)
+        :type loop: str
+        """
+        if self.MarketData is self.Bittrex:
+            return self.Scheduler.wait_for_next_tick(loop)
+        self.MarketData.wait_for_update(self.Scheduler.price_check_interval)
+
+    def get_rsi(self, coin_pair):
+        """
+        Gets the coin pair's RSI on the trade ticker interval, only recalculating it once the coin pair's
+        latest candle has closed. RSI values are stored in the Bittrex cache, so traders sharing a cache
+        share their RSI calculations.
+
+        :param coin_pair: String literal for the market (ex: BTC-LTC)
+        :type coin_pair: str
+
+        :return: RSI
+        :rtype: float
+        """
+        unit = self.trade_params["tickerInterval"]
+        return self.Bittrex.cache.get_or_fetch(
+            ("rsi", coin_pair, unit, self.Scheduler.get_candle_start(coin_pair)),
+            self.Scheduler.candle_length,
+            lambda: self.calculate_rsi(coin_pair=coin_pair, period=14, unit=unit)
+        )
+
     def calculate_rsi(self, coin_pair, period, unit):
         """
         Calculates the Relative Strength Index for a coin_pair
@@ -357,6 +817,20 @@ class Trader(object):
         :rtype: float
         """
         closing_prices = self.get_closing_prices(coin_pair, period * 3, unit)
+        with tracer.span("rsi", coinPair=coin_pair):
+            return self.calculate_rsi_from_closing_prices(closing_prices)
+
+    @staticmethod
+    def calculate_rsi_from_closing_prices(closing_prices):
+        """
+        Calculates the Relative Strength Index from a list of closing prices, oldest first
+
+        :param closing_prices: The closing prices
+        :type closing_prices: list
+
+        :return: RSI
+        :rtype: float
+        """
         count = 0
         change = []
         # Calculating price changes
@@ -401,37 +875,37 @@ class Trader(object):
 
     def get_non_zero_balances(self):
         """
-        Gets all non-zero user coin balances in the correct format
+        Gets all non-zero user coin balances in the correct format, valued from a single market summaries snapshot
         """
         balances_data = self.Bittrex.get_balances()
         if not balances_data["success"]:
             error_str = self.Messenger.print_error("balance")
             logger.error(error_str)
             return
+        market_summaries = self.get_market_summaries()
+        if market_summaries is None:
+            return
+        portfolio = Portfolio(market_summaries)
         non_zero_balances = py_.filter_(balances_data["result"], lambda balance_item: balance_item["Balance"] > 0)
-        return py_.map_(non_zero_balances, lambda balance: self.create_balance_object(balance))
+        return py_.map_(non_zero_balances, lambda balance: self.create_balance_object(balance, portfolio))
 
-    def create_balance_object(self, balance_item):
+    def create_balance_object(self, balance_item, portfolio):
         """
         Creates a new balance object containing only the relevant values and the BTC value of the coin's balance
 
         :param balance_item: The Bittrex user balance object for a coin
         :type balance_item: dict
-        """
-        btc_price = 1
-        is_tracked = False
-        if balance_item["Currency"] != "BTC":
-            coin_pair = "BTC-" + balance_item["Currency"]
-            is_tracked = coin_pair in self.Database.trades["trackedCoinPairs"]
-            btc_price = self.get_current_price(coin_pair, "bid")
+        :param portfolio: The portfolio valuing the balances
+        :type portfolio: Portfolio
 
-        try:
-            btc_value = round(btc_price * balance_item["Balance"], 8)
-        except TypeError as exception:
-            logger.exception(exception)
+        :return: The coin's balance
+        :rtype: Balance
+        """
+        is_tracked = "BTC-" + balance_item["Currency"] in self.Database.trades["trackedCoinPairs"]
+        btc_value = portfolio.get_btc_value(balance_item["Currency"], balance_item["Balance"])
+        if btc_value is None:
+            logger.warning("{} has no market to value it in BTC".format(balance_item["Currency"]))
             btc_value = 0
 
-        return py_.assign(
-            py_.pick(balance_item, "Currency", "Balance"),
-            {"BtcValue": btc_value, "IsTracked": is_tracked}
-        )
+        return Balance(currency=balance_item["Currency"], balance=balance_item["Balance"], btc_value=btc_value,
+                       is_tracked=is_tracked)
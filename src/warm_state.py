@@ -0,0 +1,67 @@
+import os
+import pickle
+
+from directory_utilities import validate_or_make_directory
+from logger import logger
+
+WARM_STATE_VERSION = 1
+
+
+def save_warm_state(file_string, cache, traders):
+    """
+    Used to write the shared cache (markets, market summaries and RSI values) and every trader's
+    completed scheduler tasks to a snapshot file, so a restarted bot doesn't have to recalculate them
+
+    :param file_string: The relative snapshot file directory string (ex: ../database/warm-state.pickle)
+    :type file_string: str
+    :param cache: The cache shared by the traders
+    :type cache: Cache
+    :param traders: The traders keyed by their strategy name
+    :type traders: dict
+    """
+    warm_state = {
+        "version": WARM_STATE_VERSION,
+        "cache": cache.get_snapshot(),
+        "schedulers": {name: trader.Scheduler.get_state() for name, trader in traders.items()}
+    }
+    validate_or_make_directory(file_string)
+    temporary_file_string = file_string + ".tmp"
+    try:
+        with open(temporary_file_string, "wb") as file:
+            pickle.dump(warm_state, file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_file_string, file_string)
+    except (OSError, pickle.PicklingError) as exception:
+        logger.exception(exception)
+
+
+def load_warm_state(file_string, cache, traders):
+    """
+    Used to restore a snapshot written by save_warm_state. Expired cache entries are skipped
+    and a missing or unreadable snapshot is ignored.
+
+    :param file_string: The relative snapshot file directory string (ex: ../database/warm-state.pickle)
+    :type file_string: str
+    :param cache: The cache shared by the traders
+    :type cache: Cache
+    :param traders: The traders keyed by their strategy name
+    :type traders: dict
+
+    :return: Boolean indicating if the snapshot was restored
+    :rtype: bool
+    """
+    if not os.path.exists(file_string) or os.path.getsize(file_string) < 1:
+        return False
+    try:
+        with open(file_string, "rb") as file:
+            warm_state = pickle.load(file)
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError) as exception:
+        logger.exception(exception)
+        return False
+    if warm_state.get("version") != WARM_STATE_VERSION:
+        return False
+
+    cache.load_snapshot(warm_state["cache"])
+    for name, trader in traders.items():
+        if name in warm_state["schedulers"]:
+            trader.Scheduler.load_state(warm_state["schedulers"][name])
+    return True
@@ -14,4 +14,4 @@ Database = Database()
 order = Bittrex.get_order(order_uuid)
 my_order = Database.convert_bittrex_order_object(order["result"])
 
-print(my_order)
+print(my_order.to_json())
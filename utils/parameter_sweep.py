@@ -0,0 +1,35 @@
+import time
+
+from backtest import run_sweep
+from directory_utilities import get_json_from_file
+
+# Add the settings to start from, the markets with stored candles and the values to try here
+settings_file_directory = "../database/settings.json"
+candle_store_directory = "../database/candles/"
+market_names = ["BTC-ETH", "BTC-LTC", "BTC-XRP"]
+sweep = {
+    "tradeParameters.tickerInterval": ["fiveMin", "thirtyMin"],
+    "tradeParameters.buy.rsiThreshold": [20, 25, 30],
+    "tradeParameters.buy.maxOpenTrades": [3, 5],
+    "tradeParameters.sell.profitMarginThreshold": [1.5, 2.5, 5],
+    "tradeParameters.sell.lossMarginThreshold": [-5, -10],
+    "pauseParameters.buy.pauseTime": [60, 240]
+}
+shown_configuration_count = 20
+
+# Worker processes import this file, the sweep only runs in the main process
+if __name__ == "__main__":
+    settings = get_json_from_file(settings_file_directory)
+
+    start_time = time.time()
+    rows = run_sweep(settings, sweep, market_names, candle_store_directory)
+    print("Backtested {} configurations in {:.2f} seconds.\n".format(len(rows), time.time() - start_time))
+
+    columns = [path.split(".", 1)[1] for path in sweep] + ["profit", "openProfit", "trades", "winRate", "maxDrawdown"]
+    print(" | ".join(columns))
+    for row in rows[:shown_configuration_count]:
+        values = [row[path] for path in sweep] + [
+            "{:.8f}".format(row["profit"]), "{:.8f}".format(row["openProfit"]), row["trades"],
+            "{:.1f}%".format(100 * row["winRate"]), "{:.8f}".format(row["maxDrawdown"])
+        ]
+        print(" | ".join("{:>{}}".format(str(value), len(column)) for value, column in zip(values, columns)))
@@ -0,0 +1,54 @@
+import os
+import time
+
+from cassette import CassetteMiss
+from clock import VirtualClock
+from trader import Trader
+from directory_utilities import get_json_from_file
+
+# Add the recorded cassette and the settings it was recorded with here
+cassette_file_directory = "../database/cassettes/session.jsonl.gz"
+settings_file_directory = "../database/settings.json"
+max_cycles = 10000
+
+# The replay stores its trades in its own database, so the live trade history is never touched
+replay_database_directory = "../database/replay/"
+for file_name in ["trades.json", "app-data.json"]:
+    if os.path.exists(replay_database_directory + file_name):
+        os.remove(replay_database_directory + file_name)
+
+settings = get_json_from_file(settings_file_directory)
+settings["cassetteParameters"] = {"mode": "replay", "file": cassette_file_directory}
+secrets = {"bittrex": {"bittrexKey": None, "bittrexSecret": None}}
+
+# Order timeouts are waited on a virtual clock, so the replay never sleeps
+trader = Trader(secrets, settings, "replay", clock=VirtualClock())
+player = trader.Bittrex.dispatch
+
+start_time = time.time()
+cycles = 0
+remaining_count = player.get_remaining_count()
+try:
+    trader.initialise()
+    while cycles < max_cycles:
+        # Every cycle replays its requests, instead of reusing values cached during earlier cycles
+        trader.Bittrex.cache.clear()
+        trader.Scheduler.completed.clear()
+        trader.analyse_pauses()
+        trader.analyse_buys()
+        trader.analyse_sells()
+        cycles += 1
+
+        previous_remaining_count, remaining_count = remaining_count, player.get_remaining_count()
+        if remaining_count == 0 or remaining_count == previous_remaining_count:
+            break
+except CassetteMiss as exception:
+    print("Stopped the replay: {}".format(exception))
+
+trades = trader.Database.trades["trades"]
+print("Replayed {} of {} requests in {} cycles in {:.2f} seconds.".format(
+    player.request_count - remaining_count, player.request_count, cycles, time.time() - start_time
+))
+print("{} buys and {} sells were placed, see {}trades.json".format(
+    len(trades), len([trade for trade in trades if not trade.is_open()]), replay_database_directory
+))
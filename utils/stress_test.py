@@ -0,0 +1,57 @@
+import os
+import time
+
+from clock import VirtualClock
+from synthetic_market import SyntheticMarket
+from trader import Trader
+from directory_utilities import get_json_from_file
+
+# Add the settings to stress test and the size of the synthetic market universe here
+settings_file_directory = "../database/settings.json"
+synthetic_params = {"marketCount": 5000, "tickerInterval": "oneMin", "historyLength": 1440, "seed": 0}
+cycle_count = 60
+
+# The stress test stores its trades in its own database, so the live trade history is never touched
+stress_database_directory = "../database/stress/"
+for file_name in ["trades.json", "app-data.json"]:
+    if os.path.exists(stress_database_directory + file_name):
+        os.remove(stress_database_directory + file_name)
+
+start_time = time.time()
+market = SyntheticMarket(synthetic_params)
+print("Generated {} markets with {} candles each in {:.2f} seconds.".format(
+    market.market_count, market.history_length, time.time() - start_time
+))
+
+settings = get_json_from_file(settings_file_directory)
+settings["tradeParameters"]["tickerInterval"] = market.interval
+settings.pop("marketDataParameters", None)
+settings.pop("cassetteParameters", None)
+# Orders are filled against the synthetic order books, so the whole buy and sell path is exercised
+settings["paperTradingParameters"] = {"enabled": True, "latency": 0, "database": "stress"}
+secrets = {"bittrex": {"bittrexKey": None, "bittrexSecret": None}}
+
+# Every cycle moves the markets and the virtual clock forward by one candle
+clock = VirtualClock(market.time)
+trader = Trader(secrets, settings, "stress", clock=clock, quiet=True)
+trader.Bittrex.dispatch = market
+trader.initialise()
+
+cycle_durations = []
+for cycle in range(cycle_count):
+    cycle_start = time.time()
+    trader.analyse_pauses()
+    trader.analyse_buys()
+    trader.analyse_sells()
+    cycle_durations.append(time.time() - cycle_start)
+    market.advance()
+    clock.advance(market.interval_length)
+
+cycle_durations.sort()
+print("Ran {} cycles over {} markets. Median cycle {:.3f} seconds, slowest cycle {:.3f} seconds.".format(
+    cycle_count, market.market_count, cycle_durations[len(cycle_durations) // 2], cycle_durations[-1]
+))
+order_count = len(trader.Exchange.orders)
+print("Placed {} paper orders, {:.1f} orders per second of trading time.".format(
+    order_count, order_count / max(sum(cycle_durations), 1e-9)
+))